@@ -0,0 +1,183 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Shows compiled cache hit rate and client-side cost of queries with
+ClickHouse clauses: FINAL, SAMPLE, LIMIT BY, ARRAY JOIN, WITH TOTALS and
+join flags, built with Core select() and ORM Query. Every query is built
+anew with different values on each execution, as applications do. No
+server is needed, the transport returns empty results::
+
+    python benchmarks/bench_compiled_cache.py --queries 2000
+"""
+
+import argparse
+from time import perf_counter
+
+from sqlalchemy import Column, MetaData, create_engine, event
+from sqlalchemy.dialects import registry
+from sqlalchemy.engine import default
+
+from bytehouse_sqlalchemy import Table, engines, select, types
+from bytehouse_sqlalchemy.drivers.native import connector
+from bytehouse_sqlalchemy.orm.session import make_session
+
+registry.register(
+    'bytehouse', 'bytehouse_sqlalchemy.drivers.native.base', 'dialect'
+)
+
+t1, t2 = [Table(
+    't{}'.format(i), MetaData(),
+    Column('x', types.Int32, primary_key=True),
+    Column('a', types.Array(types.Int32)),
+    engines.CnchMergeTree(order_by='x')
+) for i in range(1, 3)]
+
+
+class FakeWire(object):
+    is_query_executing = False
+
+
+class FakeTransport(object):
+    connection = FakeWire()
+    cancelled = None
+
+    def set_compression(self, compression=None, block_size=None):
+        pass
+
+    def start_query(self, deadline=None, listener=None):
+        pass
+
+    def execute(self, query, params=None, with_column_types=False,
+                **kwargs):
+        name = 't1_x' if 'AS t1_x' in query else 'x'
+        return [], [(name, 'Int32')]
+
+    def disconnect(self):
+        pass
+
+    def reset_last_query(self):
+        pass
+
+
+class FakeConnection(connector.Connection):
+    def __init__(self):
+        self.host = None
+        self.stream = None
+        self.hedge_transport = None
+        self.hedge = None
+        self.transport = FakeTransport()
+
+
+def core_queries(i):
+    x = t1.c.x
+    return {
+        'final': select(x).final().where(x > i),
+        'sample': select(x).sample(1.0 / (i % 10 + 1)),
+        'limit_by': select(x).limit_by([x], i % 10 + 1),
+        'array_join': select(x).array_join(t1.c.a).where(x > i),
+        'totals': select(x).group_by(x).with_totals().where(x > i),
+        'join': select(x).select_from(
+            t1.join(t2, x == t2.c.x, strictness='any')
+        ).where(x > i),
+    }
+
+
+def orm_queries(session, i):
+    x = t1.c.x
+    query = session.query(x)
+    return {
+        'final': query.final().filter(x > i),
+        'sample': query.sample(1.0 / (i % 10 + 1)),
+        'limit_by': query.limit_by([x], i % 10 + 1),
+        'array_join': query.array_join(t1.c.a).filter(x > i),
+        'totals': query.group_by(x).with_totals().filter(x > i),
+        'join': query.join(t2, x == t2.c.x, strictness='any')
+        .filter(x > i),
+    }
+
+
+def run(engine, api, n):
+    hits = {}
+    elapsed = {}
+    current = [None]
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        hit = context.cache_hit == default.CACHE_HIT
+        hits[current[0]] = hits.get(current[0], 0) + hit
+
+    session = make_session(engine)
+    with engine.connect() as connection:
+        for i in range(n):
+            if api == 'core':
+                queries = core_queries(i)
+            else:
+                queries = orm_queries(session, i)
+
+            for name, query in queries.items():
+                current[0] = name
+                start = perf_counter()
+                if api == 'core':
+                    connection.execute(query).fetchall()
+                else:
+                    query.all()
+                elapsed[name] = elapsed.get(name, 0) + perf_counter() - start
+
+    session.close()
+    event.remove(engine, 'after_cursor_execute', count)
+    return hits, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--queries', type=int, default=2000,
+        help='number of executions of each query'
+    )
+    args = parser.parse_args()
+    n = args.queries
+
+    print('%6s %6s %11s %9s %12s' % (
+        'api', 'cache', 'query', 'hit rate', 'us/query'
+    ))
+    for cache_size in (500, 0):
+        engine = create_engine(
+            'bytehouse://', creator=FakeConnection,
+            query_cache_size=cache_size
+        )
+        for api in ('core', 'orm'):
+            hits, elapsed = run(engine, api, n)
+            for name in sorted(elapsed):
+                print('%6s %6s %11s %8.1f%% %12.1f' % (
+                    api, 'on' if cache_size else 'off', name,
+                    100.0 * hits[name] / n, elapsed[name] * 1e6 / n
+                ))
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Measures throughput and client CPU cost of wire compression methods.
+
+Without ``--url`` a block of generated rows is written to memory and read
+back through the driver block streams for every method, which shows CPU
+cost and size on the wire. With ``--url`` SELECT and INSERT of the rows are
+run against a live server with ``compression`` execution option::
+
+    python benchmarks/bench_compression.py --rows 1000000
+    python benchmarks/bench_compression.py --rows 1000000 \
+        --url 'bytehouse://host:port/?user=...&password=...'
+
+Methods need ``lz4`` and ``zstd`` packages with ``clickhouse-cityhash``.
+"""
+
+import argparse
+from io import BytesIO
+from time import perf_counter, process_time
+
+from bytehouse_driver import defines
+from bytehouse_driver.block import ColumnOrientedBlock
+from bytehouse_driver.bufferedreader import BufferedSocketReader
+from bytehouse_driver.bufferedwriter import BufferedSocketWriter
+from bytehouse_driver.context import Context
+from bytehouse_driver.streams.native import (
+    BlockInputStream, BlockOutputStream
+)
+from sqlalchemy import create_engine, text
+
+methods = ('none', 'lz4', 'lz4hc', 'zstd')
+columns_with_types = [
+    ('x', 'UInt64'), ('y', 'Float64'), ('s', 'String')
+]
+
+
+class MemorySocket(object):
+    """
+    Socket writing to and reading from memory.
+    """
+
+    def __init__(self, data=b''):
+        self.sent = BytesIO()
+        self.received = BytesIO(data)
+
+    def sendall(self, data):
+        self.sent.write(data)
+
+    def recv_into(self, buf, size=0):
+        return self.received.readinto(memoryview(buf)[:size] if size else buf)
+
+
+class ServerInfo(object):
+    revision = defines.CLIENT_REVISION
+    timezone = 'UTC'
+
+
+def make_context():
+    context = Context()
+    context.server_info = ServerInfo()
+    context.settings = {}
+    context.client_settings = {
+        'insert_block_size': defines.DEFAULT_INSERT_BLOCK_SIZE,
+        'strings_as_bytes': False,
+        'strings_encoding': defines.STRINGS_ENCODING,
+        'use_numpy': False,
+        'input_format_null_as_default': False
+    }
+    return context
+
+
+def make_streams(method, fout, fin, context):
+    if method == 'none':
+        return BlockOutputStream(fout, context), BlockInputStream(fin, context)
+
+    from bytehouse_driver.compression import get_compressor_cls
+    from bytehouse_driver.streams.compressed import (
+        CompressedBlockInputStream, CompressedBlockOutputStream
+    )
+
+    out = CompressedBlockOutputStream(
+        get_compressor_cls(method), defines.DEFAULT_COMPRESS_BLOCK_SIZE,
+        fout, context
+    )
+    return out, CompressedBlockInputStream(fin, context)
+
+
+def bench_codec(n):
+    context = make_context()
+    data = [
+        list(range(n)),
+        [i / 7.0 for i in range(n)],
+        ['value %d' % (i % 1000) for i in range(n)]
+    ]
+    block = ColumnOrientedBlock(columns_with_types, data)
+
+    print('%8s %12s %10s %12s %12s' % (
+        'method', 'wire, MB', 'ratio', 'write, s', 'read, s'
+    ))
+    raw_size = None
+    for method in methods:
+        sock = MemorySocket()
+        fout = BufferedSocketWriter(sock, defines.BUFFER_SIZE)
+        try:
+            out, _ = make_streams(method, fout, None, context)
+        except Exception as e:
+            print('%8s %s' % (method, e))
+            continue
+
+        start = process_time()
+        out.write(block)
+        write_time = process_time() - start
+
+        sent = sock.sent.getvalue()
+        raw_size = raw_size or len(sent)
+
+        fin = BufferedSocketReader(MemorySocket(sent), defines.BUFFER_SIZE)
+        _, in_ = make_streams(method, None, fin, context)
+        start = process_time()
+        in_.read()
+        read_time = process_time() - start
+
+        print('%8s %12.2f %10.2f %12.4f %12.4f' % (
+            method, len(sent) / 1e6, raw_size / float(len(sent)),
+            write_time, read_time
+        ))
+
+
+def bench_server(url, n):
+    engine = create_engine(url)
+    select = text(
+        'SELECT number AS x, number / 7 AS y, '
+        "concat('value ', toString(number % 1000)) AS s "
+        'FROM system.numbers LIMIT {}'.format(n)
+    )
+
+    with engine.connect() as connection:
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS bench_compression '
+            '(x UInt64, y Float64, s String) '
+            'ENGINE = CnchMergeTree() ORDER BY tuple()'
+        ))
+        rows = connection.execute(select).fetchall()
+
+        print('%8s %10s %12s %12s %12s' % (
+            'method', 'query', 'seconds', 'cpu, s', 'MB/s'
+        ))
+        try:
+            for method in methods:
+                options = connection.execution_options(compression=method)
+                for name in ('select', 'insert'):
+                    start, cpu_start = perf_counter(), process_time()
+                    if name == 'select':
+                        options.execute(select).fetchall()
+                    else:
+                        options.execute(
+                            text('INSERT INTO bench_compression VALUES'),
+                            [dict(zip(('x', 'y', 's'), r)) for r in rows]
+                        )
+                    elapsed = perf_counter() - start
+                    cpu = process_time() - cpu_start
+
+                    # Approximate uncompressed size of the rows.
+                    size = n * (8 + 8 + 1 + 9)
+                    print('%8s %10s %12.4f %12.4f %12.1f' % (
+                        method, name, elapsed, cpu, size / elapsed / 1e6
+                    ))
+        finally:
+            connection.execute(text('DROP TABLE bench_compression'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--url')
+    args = parser.parse_args()
+
+    if args.url:
+        bench_server(args.url, args.rows)
+    else:
+        bench_codec(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Measures client-side drain time of a buffered (non-streaming) result through
+the native DB-API cursor. No server is needed: the transport returns a
+prebuilt result, so only the cursor's own fetch overhead is measured.
+
+Usage::
+
+    python benchmarks/bench_cursor_fetch.py --rows 10000,100000,1000000
+
+Time per row should stay flat as the number of rows grows.
+"""
+
+import argparse
+from time import perf_counter
+
+from bytehouse_sqlalchemy.drivers.native.connector import Cursor
+
+
+class FakeTransport(object):
+    cancelled = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def set_compression(self, compression=None, block_size=None):
+        pass
+
+    def start_query(self, deadline=None, listener=None):
+        pass
+
+    def execute(self, query, **kwargs):
+        return self.rows, [('x', 'UInt64'), ('y', 'String')]
+
+
+class FakeConnection(object):
+    stats = None
+
+    def __init__(self, rows):
+        self.transport = FakeTransport(rows)
+
+    def close_stream(self):
+        pass
+
+
+def drain(cursor, method, size):
+    if method == 'fetchone':
+        while cursor.fetchone() is not None:
+            pass
+    elif method == 'fetchmany':
+        while cursor.fetchmany(size):
+            pass
+    else:
+        cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--rows', default='10000,100000,1000000,10000000',
+        help='comma separated result sizes'
+    )
+    parser.add_argument('--fetchmany-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print('%10s %10s %12s %10s' % ('rows', 'method', 'seconds', 'ns/row'))
+    for n in [int(x) for x in args.rows.split(',')]:
+        rows = [(i, 'x') for i in range(n)]
+
+        for method in ('fetchone', 'fetchmany', 'fetchall'):
+            cursor = Cursor(FakeConnection(list(rows)))
+            cursor.execute('SELECT x, y FROM t')
+
+            start = perf_counter()
+            drain(cursor, method, args.fetchmany_size)
+            elapsed = perf_counter() - start
+
+            print('%10d %10s %12.4f %10.1f' % (
+                n, method, elapsed, elapsed * 1e9 / n
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Compares client-side cost of INSERT with row dicts and with column arrays
+through SQLAlchemy and the native DB-API cursor. No server is needed: the
+transport only counts rows, so serialization by the driver is not measured.
+
+Usage::
+
+    python benchmarks/bench_insert_columns.py --rows 100000,1000000
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy
+from sqlalchemy import Column, MetaData, create_engine
+from sqlalchemy.dialects import registry
+
+from bytehouse_sqlalchemy import Table, engines, types
+from bytehouse_sqlalchemy.drivers.native import connector
+
+registry.register(
+    'bytehouse', 'bytehouse_sqlalchemy.drivers.native.base', 'dialect'
+)
+
+
+class FakeWire(object):
+    is_query_executing = False
+    database = 'default'
+
+
+class FakeTransport(object):
+    connection = FakeWire()
+    cancelled = None
+
+    def set_compression(self, compression=None, block_size=None):
+        pass
+
+    def start_query(self, deadline=None, listener=None):
+        pass
+
+    def execute(self, query, params=None, columnar=False, **kwargs):
+        return len(params[0]) if columnar else len(params)
+
+    def disconnect(self):
+        pass
+
+    def reset_last_query(self):
+        pass
+
+
+class FakeConnection(connector.Connection):
+    def __init__(self):
+        self.host = None
+        self.stream = None
+        self.transport = FakeTransport()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--rows', default='100000,1000000',
+        help='comma separated numbers of rows'
+    )
+    args = parser.parse_args()
+
+    engine = create_engine('bytehouse://', creator=FakeConnection)
+    table = Table(
+        't', MetaData(),
+        Column('x', types.Int64, primary_key=True),
+        Column('y', types.Float64),
+        Column('s', types.String),
+        engines.CnchMergeTree(order_by='x')
+    )
+
+    print('%10s %10s %12s %10s' % ('rows', 'path', 'seconds', 'ns/row'))
+    for n in [int(x) for x in args.rows.split(',')]:
+        x = numpy.arange(n)
+        y = numpy.random.random(n)
+        s = ['value'] * n
+
+        with engine.connect() as connection:
+            rows = [
+                {'x': a, 'y': b, 's': c}
+                for a, b, c in zip(x.tolist(), y.tolist(), s)
+            ]
+            start = perf_counter()
+            connection.execute(table.insert(), rows)
+            elapsed = perf_counter() - start
+            print('%10d %10s %12.4f %10.1f' % (
+                n, 'rows', elapsed, elapsed * 1e9 / n
+            ))
+
+            start = perf_counter()
+            table.insert_columns({'x': x, 'y': y, 's': s}, bind=connection)
+            elapsed = perf_counter() - start
+            print('%10d %10s %12.4f %10.1f' % (
+                n, 'columns', elapsed, elapsed * 1e9 / n
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+"""
+Measures compile time and size of queries filtering IPv4 column by a large
+list of networks, e.g. a block list.
+
+Usage::
+
+    python benchmarks/bench_ip_filters.py --networks 50000
+
+Networks are collapsed into disjoint ranges. Short lists are compiled into
+range comparisons, long ones into lookups of network prefixes in sets.
+``chain`` forces range comparisons for any length to show the difference,
+``external`` sends the sets as external tables. Query size is measured
+after parameters are substituted by the driver, i.e. as sent to the
+server, external tables are sent separately in native form.
+"""
+
+import argparse
+import random
+from ipaddress import IPv4Network
+from time import perf_counter
+
+from bytehouse_driver.util.escape import escape_params
+from sqlalchemy import Column, MetaData, Table, select
+
+from bytehouse_sqlalchemy import types
+from bytehouse_sqlalchemy.drivers.native.base import dialect
+
+
+def make_networks(n, seed=0):
+    rnd = random.Random(seed)
+    networks = []
+    for _ in range(n):
+        prefix = rnd.choice([16, 20, 24, 24, 28, 32])
+        address = rnd.getrandbits(32) >> (32 - prefix) << (32 - prefix)
+        networks.append(str(IPv4Network((address, prefix))))
+
+    return networks
+
+
+def measure(table, networks, lookup_threshold, external_in_threshold=None):
+    comparator = types.IPv4.comparator_factory
+    default_threshold = comparator.lookup_threshold
+    comparator.lookup_threshold = lookup_threshold
+
+    compile_dialect = dialect()
+    compile_dialect.external_in_threshold = external_in_threshold
+    try:
+        start = perf_counter()
+        query = select(table.c.x).where(table.c.x.in_(networks))
+        compiled = query.compile(dialect=compile_dialect)
+        # Expanding parameters are rendered on execution.
+        state = compiled._process_parameters_for_postcompile()
+        elapsed = perf_counter() - start
+    finally:
+        comparator.lookup_threshold = default_threshold
+
+    params = escape_params(state.additional_parameters, None)
+    statement = state.statement % params
+    return elapsed, len(statement)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--networks', type=int, default=50000)
+    args = parser.parse_args()
+
+    table = Table('t', MetaData(), Column('x', types.IPv4))
+    networks = make_networks(args.networks)
+    default_threshold = types.IPv4.comparator_factory.lookup_threshold
+
+    modes = [
+        ('chain', float('inf'), None),
+        ('lookup', default_threshold, None),
+        ('external', default_threshold, 1000)
+    ]
+
+    print('%10s %12s %12s' % ('mode', 'compile, s', 'query, KB'))
+    for name, threshold, external_in_threshold in modes:
+        elapsed, size = measure(
+            table, networks, threshold, external_in_threshold
+        )
+        print('%10s %12.3f %12.1f' % (name, elapsed, size / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
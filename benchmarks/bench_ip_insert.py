@@ -0,0 +1,124 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Compares client-side cost of INSERT data of IPv4 and IPv6 columns given as
+strings. ``string`` path is the former one: addresses are formatted by bind
+processors and parsed by the driver column. ``native`` path converts the
+column in bulk to integers or 16-byte strings the driver writes as is. Both
+paths end with the column serialized into memory, no server is needed::
+
+    python benchmarks/bench_ip_insert.py --rows 10000000
+"""
+
+import argparse
+from ipaddress import IPv4Address, IPv6Address
+from random import getrandbits
+from time import perf_counter
+
+from bytehouse_driver.bufferedwriter import BufferedSocketWriter
+from bytehouse_driver.columns.service import write_column
+from bytehouse_driver.context import Context
+
+from bytehouse_sqlalchemy import types
+from bytehouse_sqlalchemy.types.ip import ipv4_column, ipv6_column
+
+columns = (
+    ('IPv4', types.IPv4(), IPv4Address, 32, ipv4_column),
+    ('IPv6', types.IPv6(), IPv6Address, 128, ipv6_column),
+)
+
+
+class NullSocket(object):
+    """
+    Socket counting sent bytes.
+    """
+
+    def __init__(self):
+        self.sent = 0
+
+    def sendall(self, data):
+        self.sent += len(data)
+
+
+def write(context, spec, data):
+    buf = BufferedSocketWriter(NullSocket(), 1048576)
+    write_column(context, 'x', spec, data, buf)
+    buf.flush()
+
+
+def make_context():
+    context = Context()
+    context.settings = {}
+    context.client_settings = {
+        'strings_as_bytes': False, 'strings_encoding': 'utf-8',
+        'use_numpy': False
+    }
+    return context
+
+
+def run_string(spec, type_, values, context):
+    process = type_.bind_processor(None)
+    data = [process(x) for x in values]
+    write(context, spec, data)
+
+
+def run_native(spec, column_processor, values, context):
+    data = column_processor(values)
+    write(context, spec, data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--rows', type=int, default=10000000, help='number of rows'
+    )
+    args = parser.parse_args()
+
+    context = make_context()
+    print('%6s %8s %12s %10s' % ('type', 'path', 'seconds', 'ns/row'))
+    for spec, type_, address_class, bits, column_processor in columns:
+        values = [
+            str(address_class(getrandbits(bits))) for _ in range(args.rows)
+        ]
+
+        start = perf_counter()
+        run_string(spec, type_, values, context)
+        elapsed = perf_counter() - start
+        print('%6s %8s %12.4f %10.1f' % (
+            spec, 'string', elapsed, elapsed * 1e9 / args.rows
+        ))
+
+        start = perf_counter()
+        run_native(spec, column_processor, values, context)
+        elapsed = perf_counter() - start
+        print('%6s %8s %12.4f %10.1f' % (
+            spec, 'native', elapsed, elapsed * 1e9 / args.rows
+        ))
+
+
+if __name__ == '__main__':
+    main()
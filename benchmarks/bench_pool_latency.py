@@ -0,0 +1,91 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Measures latency of short queries against a live server with connections
+reused from the pool and with a new connection for every query.
+
+Usage::
+
+    python benchmarks/bench_pool_latency.py \
+        --url 'bytehouse://host:port/?user=...&password=...' --queries 200
+
+Without reuse every query pays for TCP/TLS handshake and session setup.
+"""
+
+import argparse
+from time import perf_counter
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def run(engine, query, n):
+    timings = []
+    for _ in range(n):
+        start = perf_counter()
+        with engine.connect() as connection:
+            connection.execute(text(query)).fetchall()
+        timings.append(perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--query', default='SELECT 1')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    engines = [
+        ('reuse', create_engine(args.url, pool_pre_ping=True)),
+        ('no reuse', create_engine(args.url, poolclass=NullPool))
+    ]
+
+    print('%10s %10s %10s %10s' % ('pool', 'p50, ms', 'p99, ms', 'mean, ms'))
+    for name, engine in engines:
+        # Warm up: the first connection is made in both cases.
+        run(engine, args.query, 1)
+        timings = run(engine, args.query, args.queries)
+
+        print('%10s %10.2f %10.2f %10.2f' % (
+            name,
+            percentile(timings, 50) * 1e3,
+            percentile(timings, 99) * 1e3,
+            sum(timings) / len(timings) * 1e3
+        ))
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
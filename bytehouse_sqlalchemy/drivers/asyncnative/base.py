@@ -0,0 +1,103 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from . import connector
+from ..native import pool
+from ..native.base import ByteHouseDialect_native, ByteHouseExecutionContext
+
+
+async def prewarm(engine, size=None):
+    """
+    Opens connections of :class:`~sqlalchemy.ext.asyncio.AsyncEngine` in
+    advance. Connections can't be opened while engine is created outside
+    of event loop, so ``pool_prewarm`` URL parameter is applied here.
+
+    :param size: number of connections, ``pool_prewarm`` by default.
+    """
+    sync_engine = engine.sync_engine
+    if size is None:
+        size = sync_engine.dialect.pool_prewarm
+
+    await greenlet_spawn(pool.prewarm, sync_engine.pool, size)
+
+
+class ByteHouseAsyncExecutionContext(ByteHouseExecutionContext):
+    def create_server_side_cursor(self):
+        return self._dbapi_connection.cursor(server_side=True)
+
+
+class ByteHouseDialect_asyncnative(ByteHouseDialect_native):
+    driver = 'asyncnative'
+    execution_ctx_cls = ByteHouseAsyncExecutionContext
+
+    is_async = True
+    supports_server_side_cursors = True
+    supports_statement_cache = True
+
+    executor = None
+
+    @classmethod
+    def dbapi(cls):
+        return connector
+
+    @classmethod
+    def engine_created(cls, engine):
+        pass
+
+    @classmethod
+    def get_pool_class(cls, url):
+        return pool.AsyncQueuePool
+
+    def get_dialect_pool_class(self, url):
+        if self.host_pools:
+            return pool.AsyncHostPool
+
+        return self.get_pool_class(url)
+
+    def create_connect_args(self, url):
+        # Blocking driver calls of all engine connections are run in this
+        # executor. Number of threads is the limit of concurrent queries.
+        max_workers = url.query.get('executor_workers')
+        url = url.difference_update_query(['executor_workers'])
+
+        self.executor = connector.SharedExecutor(
+            max_workers=int(max_workers) if max_workers else None
+        )
+
+        cargs, cparams = super(
+            ByteHouseDialect_asyncnative, self
+        ).create_connect_args(url)
+        cparams['executor'] = self.executor
+
+        return cargs, cparams
+
+    def get_driver_connection(self, connection):
+        return connection._connection
+
+
+dialect = ByteHouseDialect_asyncnative
@@ -0,0 +1,357 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+try:
+    from contextvars import copy_context
+except ImportError:
+    # Python 3.6.
+    copy_context = None
+
+from sqlalchemy.engine import AdaptedConnection
+from sqlalchemy.util.concurrency import await_fallback, await_only
+
+from ..native import connector
+from ..native.buffer import RowBuffer
+from ..native.columnar import column_to_numpy
+# PEP 249 module globals
+from ..native.connector import (  # noqa: F401
+    Error, apilevel, paramstyle, threadsafety
+)
+
+
+class SharedExecutor(object):
+    """
+    Thread pool executor shared by connections of an engine. It is shut
+    down when the last connection is closed, e.g. on engine dispose, and
+    started again by the next connection.
+
+    :param max_workers: number of threads.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.executor = None
+        self.connections = 0
+        self._lock = Lock()
+        super(SharedExecutor, self).__init__()
+
+    def acquire(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='bytehouse'
+                )
+            self.connections += 1
+            return self.executor
+
+    def release(self):
+        with self._lock:
+            self.connections -= 1
+            if self.connections == 0:
+                executor, self.executor = self.executor, None
+                executor.shutdown(wait=False)
+
+
+def connect(*args, **kwargs):
+    """
+    Make new connection. Driver calls are run in ``executor``, connection
+    itself is established there too. :class:`SharedExecutor` is released
+    when the connection is closed.
+    """
+    shared = kwargs.pop('executor', None)
+    if kwargs.pop('async_fallback', False):
+        await_ = await_fallback
+    else:
+        await_ = await_only
+
+    executor = shared
+    if isinstance(shared, SharedExecutor):
+        executor = shared.acquire()
+    else:
+        shared = None
+
+    loop = asyncio.get_event_loop()
+    try:
+        connection = await_(loop.run_in_executor(
+            executor, partial(connector.Connection, *args, **kwargs)
+        ))
+    except BaseException:
+        if shared is not None:
+            shared.release()
+        raise
+
+    return Connection(connection, executor, await_, shared=shared)
+
+
+class Connection(AdaptedConnection):
+    """
+    Connection for asyncio engines. Wraps blocking
+    :class:`~bytehouse_sqlalchemy.drivers.native.connector.Connection`
+    and runs its I/O in thread pool executor, so event loop is not blocked.
+    """
+
+    def __init__(self, connection, executor=None, await_=await_only,
+                 shared=None):
+        self._connection = connection
+        self._executor = executor
+        self._shared = shared
+        self.await_ = await_
+        super(Connection, self).__init__()
+
+    @property
+    def host(self):
+        return self._connection.host
+
+    @property
+    def database(self):
+        return self._connection.database
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Runs ``fn`` in executor and waits for the result. Context variables,
+        e.g. current tracing span, are passed to executor thread.
+        """
+        return self.run_call(partial(fn, *args, **kwargs))
+
+    def run_call(self, call, on_cancel=None):
+        """
+        Runs ``call`` in executor and waits for the result. If the awaiting
+        task is cancelled, ``on_cancel`` is called and the call is still
+        waited for before :class:`asyncio.CancelledError` is raised: its
+        thread uses the connection, which must not be reset or returned to
+        the pool meanwhile.
+        """
+        if copy_context is not None:
+            call = partial(copy_context().run, call)
+
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(self._executor, call)
+        try:
+            return self.await_(asyncio.shield(future))
+
+        except asyncio.CancelledError:
+            if on_cancel is not None:
+                on_cancel()
+
+            while not future.done():
+                try:
+                    self.await_(asyncio.wait({future}))
+                except asyncio.CancelledError:
+                    continue
+
+            # Result of cancelled call is dropped.
+            future.exception()
+            raise
+
+    def close(self):
+        try:
+            self.run(self._connection.close)
+        finally:
+            shared, self._shared = self._shared, None
+            if shared is not None:
+                shared.release()
+
+    def ping(self):
+        return self.run(self._connection.ping)
+
+    def reset(self):
+        self.run(self._connection.reset)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def cursor(self, server_side=False):
+        cursor_cls = ServerSideCursor if server_side else Cursor
+        return cursor_cls(self)
+
+
+class Cursor(object):
+    """
+    Runs queries in executor. Result is received in full before
+    ``execute`` returns, so fetches don't wait for I/O.
+    """
+
+    def __init__(self, connection):
+        self._adapt_connection = connection
+        self._cursor = connection._connection.cursor()
+        super(Cursor, self).__init__()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def progress(self):
+        return self._cursor.progress
+
+    @property
+    def profile_info(self):
+        return self._cursor.profile_info
+
+    @property
+    def elapsed(self):
+        return self._cursor.elapsed
+
+    @property
+    def arraysize(self):
+        return self._cursor.arraysize
+
+    @arraysize.setter
+    def arraysize(self, value):
+        self._cursor.arraysize = value
+
+    def close(self):
+        self._cursor.close()
+
+    def cancel(self):
+        self._cursor.cancel()
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Runs cursor method in executor. Query is cancelled on the server
+        if the awaiting task is cancelled, e.g. by :func:`asyncio.wait_for`.
+        """
+        return self._adapt_connection.run_call(
+            partial(fn, *args, **kwargs), on_cancel=self._cursor.cancel
+        )
+
+    def execute(self, operation, parameters=None, context=None):
+        self.run(self._cursor.execute, operation, parameters, context=context)
+
+    def executemany(self, operation, seq_of_parameters, context=None):
+        self.run(
+            self._cursor.executemany, operation, seq_of_parameters,
+            context=context
+        )
+
+    def insert_columns(self, operation, columns, context=None):
+        self.run(
+            self._cursor.insert_columns, operation, columns, context=context
+        )
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetch_columns(self):
+        return self._cursor.fetch_columns()
+
+    def fetch_numpy(self):
+        return self._cursor.fetch_numpy()
+
+    def setinputsizes(self, sizes):
+        pass
+
+    def setoutputsize(self, size, column=None):
+        pass
+
+
+class ServerSideCursor(Cursor):
+    """
+    Cursor for ``stream_results`` execution option. Server blocks are
+    received in executor one at a time as rows are fetched.
+    ``fetchmany()`` without size returns one block.
+    """
+
+    def __init__(self, connection):
+        super(ServerSideCursor, self).__init__(connection)
+        self._rows = RowBuffer()
+
+    def close(self):
+        self._rows = RowBuffer()
+        self._adapt_connection.run(self._cursor.close)
+
+    def execute(self, operation, parameters=None, context=None):
+        self._rows = RowBuffer()
+        super(ServerSideCursor, self).execute(
+            operation, parameters, context=context
+        )
+
+    def fetchblock(self):
+        if self._rows:
+            return self._rows.popall()
+        return self.run(self._cursor.fetchblock)
+
+    def _fill_rows(self, size=None):
+        while size is None or len(self._rows) < size:
+            block = self.run(self._cursor.fetchblock)
+            if not block:
+                break
+            self._rows.append_block(block)
+
+    def fetchone(self):
+        self._fill_rows(1)
+        return self._rows.popone()
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self.fetchblock()
+
+        self._fill_rows(size)
+        return self._rows.popmany(size)
+
+    def fetchall(self):
+        self._fill_rows()
+        return self._rows.popall()
+
+    def fetch_columns(self):
+        rows = self._rows.popall()
+        columns = self.run(self._cursor.fetch_columns)
+        if not rows:
+            return columns
+
+        return [
+            list(head) + list(tail)
+            for head, tail in zip(zip(*rows), columns)
+        ]
+
+    def fetch_numpy(self):
+        return [
+            column_to_numpy(column, type_code)
+            for column, (_, type_code, _, _, _, _, _) in zip(
+                self.fetch_columns(), self.description
+            )
+        ]
@@ -67,6 +67,40 @@ class ByteHouseSQLCompiler(compiler.SQLCompiler):
             ),
         )
 
+    def get_external_in_table(self, parameter, size):
+        """
+        Returns name of external table sent instead of ``size`` values of
+        expanding IN ``parameter`` or None if values are rendered inline.
+        Lists longer than ``external_in_threshold`` of the dialect are
+        externalized.
+        """
+        threshold = getattr(self.dialect, 'external_in_threshold', None)
+        if threshold is None or size <= threshold or \
+                parameter.literal_execute:
+            return None
+
+        type_ = parameter.type._unwrapped_dialect_impl(self.dialect)
+        # Tuples and values of unknown type have no column structure.
+        if type_._is_tuple_type or type_._isnull or \
+                parameter.type._has_bind_expression:
+            return None
+
+        return '_ext_' + self.bind_names[parameter]
+
+    def _literal_execute_expanding_parameter(self, name, parameter, values):
+        table = self.get_external_in_table(parameter, len(values))
+        if table is None:
+            return super(
+                ByteHouseSQLCompiler, self
+            )._literal_execute_expanding_parameter(name, parameter, values)
+
+        # Values are still bound, so they are processed by the type. They
+        # are taken out of parameters by the execution context.
+        to_update = [
+            ('%s_%s' % (name, i), value) for i, value in enumerate(values, 1)
+        ]
+        return to_update, 'SELECT x FROM %s' % self.preparer.quote(table)
+
     def post_process_text(self, text):
         return text.replace('%', '%%')
 
@@ -270,6 +304,10 @@ class ByteHouseSQLCompiler(compiler.SQLCompiler):
     ):
         text += ", ".join(inner_columns)
 
+        # ORM compile state composes new statement, ClickHouse clauses are
+        # taken from the one being compiled.
+        clauses = getattr(compile_state, 'select_statement', select)
+
         if self.linting & COLLECT_CARTESIAN_PRODUCTS:
             from_linter = compiler.FromLinter({}, set())
             warn_linting = self.linting & WARN_LINTING
@@ -310,15 +348,15 @@ class ByteHouseSQLCompiler(compiler.SQLCompiler):
         else:
             text += self.default_from()
 
-        if getattr(select, '_array_join', None) is not None:
-            text += select._array_join._compiler_dispatch(self, **kwargs)
+        if getattr(clauses, '_array_join', None) is not None:
+            text += clauses._array_join._compiler_dispatch(self, **kwargs)
 
-        sample_clause = getattr(select, '_sample_clause', None)
+        sample_clause = getattr(clauses, '_sample_clause', None)
 
         if sample_clause is not None:
-            text += self.sample_clause(select, **kwargs)
+            text += self.sample_clause(clauses, **kwargs)
 
-        final_clause = getattr(select, '_final_clause', None)
+        final_clause = getattr(clauses, '_final_clause', None)
 
         if final_clause is not None:
             text += self.final_clause()
@@ -335,6 +373,8 @@ class ByteHouseSQLCompiler(compiler.SQLCompiler):
 
         if select._group_by_clauses:
             text += self.group_by_clause(select, **kwargs)
+            if getattr(clauses, '_with_totals', False):
+                text += " WITH TOTALS"
 
         if select._having_criteria:
             t = self._generate_delimited_and_list(
@@ -346,10 +386,10 @@ class ByteHouseSQLCompiler(compiler.SQLCompiler):
         if select._order_by_clauses:
             text += self.order_by_clause(select, **kwargs)
 
-        limit_by_clause = getattr(select, '_limit_by_clause', None)
+        limit_by_clause = getattr(clauses, '_limit_by_clause', None)
 
         if limit_by_clause is not None:
-            text += self.limit_by_clause(select, **kwargs)
+            text += self.limit_by_clause(clauses, **kwargs)
 
         if select._has_row_limiting_clause:
             text += self._row_limit_clause(select, **kwargs)
@@ -374,9 +414,6 @@ class ByteHouseSQLCompiler(compiler.SQLCompiler):
         if group_by:
             text = " GROUP BY " + group_by
 
-            if getattr(select, '_with_totals', False):
-                text += " WITH TOTALS"
-
         return text
 
     def visit_delete(self, delete_stmt, **kw):
@@ -0,0 +1,172 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+
+from .columnar import datetime64_units, unwrap_type
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError('Extras for Arrow must be installed')
+
+    return pyarrow
+
+
+# Types kept as their text representation.
+string_type_names = (
+    'String', 'FixedString', 'UUID', 'IPv4', 'IPv6', 'Enum8', 'Enum16',
+    'Int128', 'UInt128', 'Int256', 'UInt256'
+)
+
+
+def get_arrow_type(pa, spec):
+    """
+    Maps server type name to Arrow type. ``None`` means the type is
+    inferred from the values.
+    """
+    spec, _ = unwrap_type(spec)
+
+    pos = spec.find('(')
+    name = spec if pos == -1 else spec[:pos]
+    args = [] if pos == -1 else [
+        x.strip().strip("'") for x in spec[pos + 1:-1].split(',')
+    ]
+
+    simple_types = {
+        'Int8': pa.int8(), 'Int16': pa.int16(),
+        'Int32': pa.int32(), 'Int64': pa.int64(),
+        'UInt8': pa.uint8(), 'UInt16': pa.uint16(),
+        'UInt32': pa.uint32(), 'UInt64': pa.uint64(),
+        'Float32': pa.float32(), 'Float64': pa.float64(),
+        'Date': pa.date32(), 'Date32': pa.date32(),
+    }
+
+    if name in simple_types:
+        return simple_types[name]
+
+    elif name in string_type_names:
+        return pa.string()
+
+    elif name == 'DateTime':
+        return pa.timestamp('s', tz=args[0] if args else None)
+
+    elif name == 'DateTime64':
+        precision = int(args[0]) if args else 3
+        return pa.timestamp(
+            datetime64_units[precision], tz=args[1] if len(args) > 1 else None
+        )
+
+    elif name == 'Decimal':
+        precision, scale = int(args[0]), int(args[1])
+        if precision > 38:
+            return pa.decimal256(precision, scale)
+        return pa.decimal128(precision, scale)
+
+    return None
+
+
+def column_to_arrow(pa, values, spec):
+    """
+    Converts column values of the given server type to Arrow array.
+    ``LowCardinality`` columns are dictionary-encoded, nested ones like
+    ``Array(LowCardinality(String))`` keep plain values.
+    """
+    type_ = get_arrow_type(pa, spec)
+
+    if type_ == pa.string():
+        values = [None if x is None else str(x) for x in values]
+
+    rv = pa.array(values, type=type_)
+
+    outer = spec[9:-1] if spec.startswith('Nullable(') else spec
+    if outer.startswith('LowCardinality('):
+        rv = rv.dictionary_encode()
+
+    return rv
+
+
+def columns_to_batch(columns, columns_with_types):
+    """
+    Builds Arrow RecordBatch from column-oriented data.
+    """
+    pa = import_pyarrow()
+
+    arrays = [
+        column_to_arrow(pa, values, type_)
+        for values, (_, type_) in zip(columns, columns_with_types)
+    ]
+    names = [name for name, _ in columns_with_types]
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def empty_batch(columns_with_types):
+    return columns_to_batch([[] for _ in columns_with_types],
+                            columns_with_types)
+
+
+class ArrowFileWriter(object):
+    """
+    Writes record batches to Arrow IPC file.
+
+    Batches are written to a temporary file that is moved to ``path`` only
+    when all of them are written, so readers never see partial result.
+    Written file can be read zero-copy with :func:`open_arrow_file`.
+    """
+
+    def __init__(self, path, schema):
+        pa = import_pyarrow()
+
+        self.path = path
+        self.tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        self._sink = pa.OSFile(self.tmp_path, 'wb')
+        self._writer = pa.ipc.new_file(self._sink, schema)
+
+        super(ArrowFileWriter, self).__init__()
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._sink.close()
+        os.remove(self.tmp_path)
+
+
+def open_arrow_file(path):
+    """
+    Opens Arrow IPC file through memory map. Batches read from the returned
+    reader reference file pages directly, without copying.
+    """
+    pa = import_pyarrow()
+
+    return pa.ipc.open_file(pa.memory_map(path, 'r'))
@@ -0,0 +1,185 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from itertools import count
+from time import time
+
+
+class HostStats(object):
+    """
+    Query statistics and health of a host.
+
+    Host is ejected for ``eject_time`` seconds after ``max_failures``
+    consecutive connection failures. After that the next connection to it
+    probes the host: another failure ejects it for twice as long, up to
+    ``max_eject_time``, a successful query brings it back.
+
+    :param decay: weight of the last query latency in latency average.
+    """
+
+    def __init__(self, host, max_failures=3, eject_time=10.0,
+                 max_eject_time=300.0, decay=0.3):
+        self.host = host
+        self.max_failures = max_failures
+        self.eject_time = eject_time
+        self.max_eject_time = max_eject_time
+        self.decay = decay
+
+        self.queries = 0
+        self.errors = 0
+        self.latency = None
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+        self._lock = threading.Lock()
+
+        super(HostStats, self).__init__()
+
+    @property
+    def ejected(self):
+        return time() < self.ejected_until
+
+    def observe(self, elapsed):
+        """
+        Records successful query which took ``elapsed`` seconds.
+        """
+        with self._lock:
+            self.queries += 1
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += self.decay * (elapsed - self.latency)
+
+            self.failures = 0
+            self.ejections = 0
+
+    def record_failure(self):
+        """
+        Records failed connection or query because of network error.
+        """
+        with self._lock:
+            self.errors += 1
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                eject_time = min(
+                    self.eject_time * 2 ** self.ejections, self.max_eject_time
+                )
+                self.ejected_until = time() + eject_time
+                self.ejections += 1
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'errors': self.errors,
+            'latency': self.latency,
+            'ejected': self.ejected
+        }
+
+
+class Policy(object):
+    """
+    Chooses host pool for the next connection.
+    """
+
+    def choose(self, pools):
+        """
+        :param pools: list of :class:`.HostQueuePool` of available hosts.
+                      Each one has ``stats`` attribute with
+                      :class:`HostStats` of the host.
+        """
+        raise NotImplementedError
+
+
+class RoundRobinPolicy(Policy):
+    """
+    Takes hosts in turn preferring ones with idle connections.
+    """
+
+    def __init__(self):
+        self._counter = count()
+        super(RoundRobinPolicy, self).__init__()
+
+    def choose(self, pools):
+        start = next(self._counter)
+
+        for i in range(len(pools)):
+            pool = pools[(start + i) % len(pools)]
+            if pool.checkedin():
+                return pool
+
+        return pools[start % len(pools)]
+
+
+class LeastOutstandingPolicy(RoundRobinPolicy):
+    """
+    Takes host with the fewest checked out connections, i.e. queries in
+    flight. Ties are broken in turn.
+    """
+
+    def choose(self, pools):
+        start = next(self._counter)
+        pools = pools[start % len(pools):] + pools[:start % len(pools)]
+        return min(pools, key=lambda pool: pool.checkedout())
+
+
+class EWMAPolicy(RoundRobinPolicy):
+    """
+    Takes host with the lowest average query latency weighted by its
+    queries in flight. Hosts without queries yet are tried first.
+    """
+
+    def choose(self, pools):
+        start = next(self._counter)
+        pools = pools[start % len(pools):] + pools[:start % len(pools)]
+
+        def cost(pool):
+            latency = pool.stats.latency
+            if latency is None:
+                return -1.0
+            return latency * (pool.checkedout() + 1)
+
+        return min(pools, key=cost)
+
+
+policies = {
+    'round_robin': RoundRobinPolicy,
+    'least_outstanding': LeastOutstandingPolicy,
+    'ewma': EWMAPolicy
+}
+
+
+def get_policy(policy):
+    """
+    Returns policy instance by its name or the given instance.
+    """
+    if isinstance(policy, Policy):
+        return policy
+
+    try:
+        return policies[policy or 'round_robin']()
+    except KeyError:
+        raise ValueError('Unknown load balancing policy: {}'.format(policy))
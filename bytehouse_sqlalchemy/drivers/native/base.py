@@ -24,9 +24,20 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from sqlalchemy.util import asbool
+from collections import deque
+from weakref import WeakKeyDictionary
 
-from . import connector
+from sqlalchemy.engine import cursor as _cursor
+from sqlalchemy.engine import default
+from sqlalchemy.util import asbool, memoized_property
+
+from . import connector, metrics
+from .balancing import policies
+from .cache import DiskResultCache, ResultCache
+from .coalesce import SingleFlight
+from .events import QueryEventsTarget
+from .external import get_external_type
+from .pool import HostPool, QueuePool, get_connect_host, prewarm
 from ..base import (
     ByteHouseDialect, ByteHouseExecutionContextBase, ByteHouseSQLCompiler,
 )
@@ -34,15 +45,154 @@ from ..base import (
 # Export connector version
 VERSION = (0, 0, 2, None)
 
+cache_results = {
+    default.CACHE_HIT: 'hit',
+    default.CACHE_MISS: 'miss',
+    default.CACHING_DISABLED: 'disabled',
+    default.NO_CACHE_KEY: 'no_key',
+    default.NO_DIALECT_SUPPORT: 'unsupported'
+}
+
 
 class ByteHouseExecutionContext(ByteHouseExecutionContextBase):
+    # Column sequences of INSERT executed with insert_columns execution
+    # option.
+    insert_columns = None
+    # Time of query phases, see ext.timing.
+    timing = None
+    # External tables made of long IN lists.
+    external_in = None
+
+    @classmethod
+    def _init_compiled(cls, dialect, connection, dbapi_connection,
+                       execution_options, compiled, parameters, *args, **kw):
+        columns = None
+        if compiled.isinsert and \
+                execution_options.get('insert_columns', False) and parameters:
+            if len(parameters) > 1:
+                raise ValueError(
+                    'Columnar INSERT takes single dict of columns'
+                )
+
+            # Bind processors work on single values. Columns are passed
+            # to the driver as is.
+            columns = parameters[0]
+            parameters = [dict.fromkeys(columns)]
+
+        self = super(ByteHouseExecutionContext, cls)._init_compiled(
+            dialect, connection, dbapi_connection, execution_options,
+            compiled, parameters, *args, **kw
+        )
+        self.insert_columns = columns
+        if self._expanded_parameters:
+            self._make_external_in()
+        return self
+
+    def _make_external_in(self):
+        # Long IN lists are rendered as subqueries from external tables,
+        # see ByteHouseSQLCompiler.get_external_in_table().
+        compiled = self.compiled
+        parameters = self.parameters[0]
+        tables = []
+
+        for name, keys in self._expanded_parameters.items():
+            parameter = compiled.binds[name]
+            table = compiled.get_external_in_table(parameter, len(keys))
+            if table is None:
+                continue
+
+            structure = [
+                ('x', get_external_type(parameter.type, self.dialect))
+            ]
+            values = [parameters.pop(key) for key in keys]
+            tables.append((table, structure, {'x': values}))
+
+        self.external_in = tables or None
+
     def pre_exec(self):
         # Always do executemany on INSERT with VALUES clause.
         if self.isinsert and self.compiled.statement.select is None:
             self.executemany = True
 
+        if self.isinsert and self.insert_columns is None:
+            processors = self.compiled._column_processors
+            if processors:
+                self._process_columns(processors)
+
+    def _process_columns(self, processors):
+        # Values of each column are converted at once.
+        parameters = self.parameters
+        for key, process in processors.items():
+            values = process([params[key] for params in parameters])
+            for params, value in zip(parameters, values):
+                params[key] = value
+
+    def post_exec(self):
+        # Cached results of the table are stale after INSERT.
+        if self.isinsert:
+            table = self.compiled.statement.table
+            database = self._dbapi_connection.database
+            self.dialect.result_cache.invalidate(table, database=database)
+            cache = self.execution_options.get('result_cache')
+            if cache is not None:
+                cache.invalidate(table, database=database)
+
+        if self.execution_options.get('stream_results', False):
+            self.cursor_fetch_strategy = StreamFetchStrategy(
+                self.cursor, self.execution_options
+            )
+
+
+class StreamFetchStrategy(_cursor.BufferedRowCursorFetchStrategy):
+    """
+    Buffers up to ``max_row_buffer`` rows of streamed result like the base
+    class, but does not prefetch the first row on execute. So until rows
+    are fetched from the result, it can also be read from the cursor
+    directly, e.g. with fetch_arrow_batches().
+    """
+    __slots__ = ()
+
+    def __init__(self, dbapi_cursor, execution_options):
+        super(StreamFetchStrategy, self).__init__(
+            dbapi_cursor, execution_options, initial_buffer=deque()
+        )
+
 
 class ByteHouseNativeSQLCompiler(ByteHouseSQLCompiler):
+    # INSERT data is sent by the driver in native form rather than
+    # rendered into the query.
+    insert_data = False
+
+    @memoized_property
+    def _bind_processors(self):
+        processors = super(ByteHouseNativeSQLCompiler, self)._bind_processors
+        if not self.insert_data:
+            return processors
+
+        # Columns of these types are converted in bulk by the execution
+        # context instead.
+        return {
+            key: process for key, process in processors.items()
+            if key not in self._column_processors
+        }
+
+    @memoized_property
+    def _column_processors(self):
+        """
+        Functions converting whole columns of INSERT data by bind name, see
+        ``column_processor`` of :class:`~bytehouse_sqlalchemy.types.IPv4`.
+        """
+        if not self.insert_data:
+            return {}
+
+        rv = {}
+        for name, bindparam in self.binds.items():
+            get_processor = getattr(bindparam.type, 'column_processor', None)
+            process = get_processor(self.dialect) if get_processor else None
+            if process is not None:
+                rv[name] = process
+
+        return rv
 
     def visit_insert(self, insert_stmt, asfrom=False, **kw):
         rv = super(ByteHouseNativeSQLCompiler, self).visit_insert(
@@ -58,6 +208,7 @@ class ByteHouseNativeSQLCompiler(ByteHouseSQLCompiler):
         # Example: INSERT INTO test (x) VALUES (1), (2).
         if pos != -1:
             rv = rv[:pos + 6]
+            self.insert_data = True
         return rv
 
 
@@ -67,20 +218,167 @@ class ByteHouseDialect_native(ByteHouseDialect):
     statement_compiler = ByteHouseNativeSQLCompiler
 
     supports_statement_cache = True
+    poolclass = QueuePool
+
+    hosts = ()
+    host_pools = False
+    load_balancing = None
+    pool_prewarm = 0
+    external_in_threshold = None
+
+    def __init__(self, *args, **kwargs):
+        super(ByteHouseDialect_native, self).__init__(*args, **kwargs)
+        # Listeners of QueryEvents.
+        self.query_events = QueryEventsTarget()
+        # Results of queries executed with cache_ttl execution option.
+        self.result_cache = ResultCache()
+        # Queries executed with coalesce execution option.
+        self.single_flight = SingleFlight()
+        # Compiled structures of external tables.
+        self.external_structures = WeakKeyDictionary()
 
     @classmethod
     def dbapi(cls):
         return connector
 
+    @classmethod
+    def engine_created(cls, engine):
+        if engine.dialect.pool_prewarm:
+            prewarm(engine.pool, engine.dialect.pool_prewarm)
+
     def create_connect_args(self, url):
         url = url.set(drivername='bytehouse')
 
         self.engine_reflection = asbool(
             url.query.get('engine_reflection', 'true')
         )
+        self.host_pools = asbool(url.query.get('host_pools', 'false'))
+        self.load_balancing = url.query.get('load_balancing')
+        if self.load_balancing:
+            if self.load_balancing not in policies:
+                raise ValueError(
+                    'Unknown load balancing policy: {}'.format(
+                        self.load_balancing
+                    )
+                )
+            self.host_pools = True
+        self.pool_prewarm = int(url.query.get('pool_prewarm', 0))
+
+        external_in_threshold = url.query.get('external_in_threshold')
+        if external_in_threshold is not None:
+            self.external_in_threshold = int(external_in_threshold)
+
+        # Validated here, the driver takes unknown values for booleans.
+        compression = url.query.get('compression')
+        if compression is not None:
+            compression = connector.get_compression(compression)
+            url = url.update_query_dict(
+                {'compression': compression or 'false'}
+            )
+
+        result_cache_dir = url.query.get('result_cache_dir')
+        if result_cache_dir:
+            self.result_cache = DiskResultCache(result_cache_dir)
+
+        url = url.difference_update_query(
+            ['external_in_threshold', 'host_pools', 'load_balancing',
+             'pool_prewarm', 'result_cache_dir']
+        )
+
+        if url.host:
+            host = url.host
+            if url.port:
+                host = '%s:%s' % (host, url.port)
+
+            alt_hosts = url.query.get('alt_hosts')
+            self.hosts = [host] + (alt_hosts.split(',') if alt_hosts else [])
 
         return (str(url), ), {}
 
+    def get_dialect_pool_class(self, url):
+        if self.host_pools:
+            return HostPool
+
+        return super(ByteHouseDialect_native, self).get_dialect_pool_class(url)
+
+    def connect(self, *cargs, **cparams):
+        host = get_connect_host()
+        if host is not None:
+            cparams['host'] = host
+
+        return super(ByteHouseDialect_native, self).connect(*cargs, **cparams)
+
+    def _record_compile_cache(self, context):
+        if context is not None and context.compiled is not None:
+            metrics.compile_cache.inc(
+                labels=(cache_results.get(context.cache_hit, 'other'), )
+            )
+
+    def do_execute(self, cursor, statement, parameters, context=None):
+        self._record_compile_cache(context)
+        super(ByteHouseDialect_native, self).do_execute(
+            cursor, statement, parameters, context=context
+        )
+
+    def do_executemany(self, cursor, statement, parameters, context=None):
+        self._record_compile_cache(context)
+        columns = context.insert_columns if context else None
+        if columns is None:
+            return super(ByteHouseDialect_native, self).do_executemany(
+                cursor, statement, parameters, context=context
+            )
+
+        # Statement columns are in the order of parameters. Columns absent
+        # in data have defaults evaluated once.
+        parameters = context.compiled_parameters[0]
+
+        sizes = {len(columns[key]) for key in parameters if key in columns}
+        if len(sizes) > 1:
+            raise ValueError('Columns have different lengths')
+        size = sizes.pop() if sizes else 0
+
+        compiled = context.compiled
+        key_getter = compiled._within_exec_param_key_getter
+        prefetch = {key_getter(c): c for c in compiled.insert_prefetch}
+        processors = compiled._column_processors
+        data = []
+        for key, value in parameters.items():
+            if key in columns:
+                column = columns[key]
+            else:
+                column = self._default_column(
+                    context, prefetch.get(key), value, columns, size
+                )
+            if key in processors:
+                column = processors[key](column)
+            data.append(column)
+
+        cursor.insert_columns(statement, data, context=context)
+
+    def _default_column(self, context, column, value, columns, size):
+        default = column.default if column is not None else None
+        if default is None or default.is_scalar:
+            return [value] * size
+
+        # Python functions, e.g. uuid4, are called for each row as in
+        # row-wise INSERT.
+        rv = []
+        for i in range(size):
+            context.current_parameters = {
+                key: values[i] for key, values in columns.items()
+            }
+            rv.append(context._exec_default(column, default, column.type))
+        del context.current_parameters
+        return rv
+
+    def do_ping(self, dbapi_connection):
+        return dbapi_connection.ping()
+
+    def do_rollback(self, dbapi_connection):
+        # No support for transactions. Called when connection is returned
+        # to the pool as well.
+        dbapi_connection.reset()
+
     def _execute(self, connection, sql, scalar=False, **kwargs):
         f = connection.scalar if scalar else connection.execute
         return f(sql, **kwargs)
@@ -0,0 +1,110 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from collections import deque
+from itertools import islice
+
+
+class RowBuffer(object):
+    """
+    FIFO of fetched rows kept as a sequence of blocks.
+
+    Rows are handed out by advancing an offset into the head block, so
+    draining N rows costs O(N) regardless of how they are fetched. A block
+    is released as soon as its last row has been handed out.
+    """
+
+    def __init__(self, blocks=None):
+        self._blocks = deque()
+        self._offset = 0
+        self._size = 0
+
+        for block in blocks or ():
+            self.append_block(block)
+
+        super(RowBuffer, self).__init__()
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        while self._blocks:
+            yield self.popone()
+
+    def append_block(self, rows):
+        if not isinstance(rows, list):
+            rows = list(rows)
+
+        if rows:
+            self._blocks.append(rows)
+            self._size += len(rows)
+
+    def _advance(self, count):
+        self._offset += count
+        self._size -= count
+
+        if self._offset == len(self._blocks[0]):
+            self._blocks.popleft()
+            self._offset = 0
+
+    def popone(self):
+        if not self._blocks:
+            return None
+
+        row = self._blocks[0][self._offset]
+        self._advance(1)
+        return row
+
+    def popmany(self, size):
+        rv = []
+
+        while size > 0 and self._blocks:
+            block = self._blocks[0]
+            chunk = block[self._offset:self._offset + size]
+            self._advance(len(chunk))
+            size -= len(chunk)
+            rv.extend(chunk)
+
+        return rv
+
+    def popall(self):
+        if len(self._blocks) == 1 and not self._offset:
+            # Hand the only block over as is, without copying.
+            rv = self._blocks.popleft()
+        else:
+            rv = []
+            for i, block in enumerate(self._blocks):
+                if i == 0 and self._offset:
+                    block = islice(block, self._offset, None)
+                rv.extend(block)
+            self._blocks.clear()
+
+        self._offset = 0
+        self._size = 0
+        return rv
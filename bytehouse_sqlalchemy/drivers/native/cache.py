@@ -0,0 +1,557 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import hashlib
+import json
+import os
+import stat
+import sys
+import threading
+from collections import OrderedDict
+from copy import copy
+from time import time
+
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.expression import TableClause
+
+from . import metrics
+from .arrow import get_arrow_type, import_pyarrow
+
+# Rows, columns and column values sampled to estimate size of a result.
+SIZE_SAMPLE = 100
+
+# Result file is Arrow IPC file with JSON header in schema metadata.
+FILE_METADATA_KEY = b'bytehouse'
+FILE_SUFFIX = '.arrow'
+# Subdirectory with a directory per table holding an empty file named
+# after each result file which depends on the table.
+INDEX_DIRECTORY = 'tables'
+
+
+def get_table_name(table, database=None):
+    """
+    Returns name of the table used for cache invalidation: ``schema.name``
+    for tables with schema, ``database.name`` for others if connection's
+    default ``database`` is given.
+
+    :param table: :class:`~sqlalchemy.schema.Table` object or name.
+    """
+    if isinstance(table, TableClause):
+        schema, name = getattr(table, 'schema', None), table.name
+    else:
+        schema, _, name = table.rpartition('.')
+
+    schema = schema or database
+    return schema + '.' + name if schema else name
+
+
+def get_statement_tables(statement, database=None):
+    """
+    Returns names of all tables the statement reads from, see
+    :func:`get_table_name`.
+    """
+    return {
+        get_table_name(element, database=database)
+        for element in visitors.iterate(statement)
+        if isinstance(element, TableClause)
+    }
+
+
+def get_index_names(tables):
+    """
+    Returns names results of the tables are found by on invalidation:
+    the names themselves and names without database, so that tables
+    invalidated without knowing the database are found too.
+    """
+    rv = set(tables)
+    rv.update(table.rpartition('.')[2] for table in tables)
+    return rv
+
+
+def _estimate_items_size(items, estimate):
+    items = list(items)
+    if not items:
+        return 0
+
+    sample = items[:SIZE_SAMPLE]
+    return sum(estimate(x) for x in sample) * len(items) // len(sample)
+
+
+def estimate_size(response):
+    """
+    Estimates memory taken by query response, i.e. ``(rows, columns)`` or
+    ``(column_data, columns)`` pair, by sampling rows or column values.
+    """
+    def estimate(item):
+        return sys.getsizeof(item) + _estimate_items_size(item, sys.getsizeof)
+
+    data, _ = response
+    return _estimate_items_size(data, estimate)
+
+
+def copy_response(response):
+    """
+    Copies containers of the response, so callers can't change cached
+    data. Rows are tuples and are not copied.
+    """
+    data, columns_with_types = response
+    return [copy(x) for x in data], columns_with_types
+
+
+class CacheEntry(object):
+    def __init__(self, response, expires, size, tables):
+        self.response = response
+        self.expires = expires
+        self.size = size
+        self.tables = tables
+
+        super(CacheEntry, self).__init__()
+
+
+class ResultCache(object):
+    """
+    In-memory LRU cache of query results. Entries are evicted when they
+    expire or when the cache exceeds ``max_entries`` or ``max_bytes``.
+
+    :param max_entries: maximum number of cached results.
+    :param max_bytes: maximum estimated size of cached results.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._table_keys = {}
+
+        super(ResultCache, self).__init__()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns copy of cached response or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                metrics.result_cache.inc(labels=('miss', ))
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        metrics.result_cache.inc(labels=('hit', ))
+        return copy_response(entry.response)
+
+    def put(self, key, response, ttl, tables=(), columnar=False):
+        """
+        Caches copy of the response for ``ttl`` seconds.
+
+        :param tables: names of tables the result depends on, see
+                       :meth:`invalidate`.
+        :param columnar: response holds columns instead of rows.
+        """
+        size = estimate_size(response)
+        if size > self.max_bytes:
+            return
+
+        tables = get_index_names(tables)
+        entry = CacheEntry(copy_response(response), time() + ttl, size, tables)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = entry
+            self.size += size
+            for table in tables:
+                self._table_keys.setdefault(table, set()).add(key)
+
+            while len(self._entries) > self.max_entries or \
+                    self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tables, database=None):
+        """
+        Drops cached results of queries reading from the given tables.
+
+        :param tables: :class:`~sqlalchemy.schema.Table` objects or names,
+                       ``schema.name`` for tables with schema.
+        :param database: default database of the connection, tables
+                         without schema belong to it. Without it, such
+                         tables are matched in any database.
+        """
+        with self._lock:
+            for table in tables:
+                table = get_table_name(table, database=database)
+                keys = self._table_keys.pop(table, ())
+                for key in list(keys):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._table_keys.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+
+        for table in entry.tables:
+            keys = self._table_keys.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._table_keys[table]
+
+
+class DiskResultCache(object):
+    """
+    Result cache kept in files of ``directory``, so it can be shared by
+    processes of the host. Each result is stored as Arrow IPC file, which
+    is published atomically. Rows are built as Python values when the
+    result is read, like for in-memory cache. The oldest used results are
+    removed when files exceed ``max_bytes``.
+
+    Only results whose values are read back unchanged are stored, e.g.
+    numbers, strings, dates and decimals. Results with other columns, such
+    as arrays or UUIDs, are not cached.
+
+    Results are found for invalidation by table index kept in the
+    directory as well, so INSERT doesn't read headers of all results.
+
+    The directory is created accessible only by the current user. Directory
+    owned by another user or writable by others is refused.
+
+    :param directory: cache directory, created if missing.
+    :param max_bytes: maximum size of result files.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        import_pyarrow()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._check_directory()
+        self.index_directory = os.path.join(directory, INDEX_DIRECTORY)
+
+        super(DiskResultCache, self).__init__()
+
+    def __len__(self):
+        return len(self._list_files())
+
+    def get(self, key):
+        """
+        Returns cached response or None.
+        """
+        pa = import_pyarrow()
+        response = None
+        path = self._get_path(key)
+
+        try:
+            response = self._read(path, repr(key))
+        except (OSError, ValueError, pa.ArrowException):
+            # Removed by another process or written by an old version.
+            pass
+
+        if response is None:
+            self.misses += 1
+            metrics.result_cache.inc(labels=('miss', ))
+            return None
+
+        # Modification time orders results for eviction.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        metrics.result_cache.inc(labels=('hit', ))
+        return response
+
+    def put(self, key, response, ttl, tables=(), columnar=False):
+        """
+        Caches the response for ``ttl`` seconds.
+
+        :param tables: names of tables the result depends on, see
+                       :meth:`invalidate`.
+        :param columnar: response holds columns instead of rows.
+        """
+        pa = import_pyarrow()
+        tables = get_index_names(tables)
+        data, columns_with_types = response
+        columns = data if columnar else list(zip(*data))
+        if not columns:
+            columns = [[] for _ in columns_with_types]
+
+        arrays = []
+        for values, (_, spec) in zip(columns, columns_with_types):
+            array = self._to_array(pa, values, spec)
+            if array is None:
+                return
+            arrays.append(array)
+
+        header = {
+            'key': repr(key),
+            'expires': time() + ttl,
+            'tables': sorted(tables),
+            'columns_with_types': columns_with_types,
+            'columnar': columnar
+        }
+        schema = pa.schema(
+            [
+                pa.field('c{}'.format(i), array.type)
+                for i, array in enumerate(arrays)
+            ],
+            metadata={FILE_METADATA_KEY: json.dumps(header)}
+        )
+        batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        path = self._get_path(key)
+        tmp_path = '{}.{}.{}.tmp'.format(
+            path, os.getpid(), threading.get_ident()
+        )
+        with pa.OSFile(tmp_path, 'wb') as sink, \
+                pa.ipc.new_file(sink, schema) as writer:
+            writer.write_batch(batch)
+
+        # Indexed before it's published, so published result is always
+        # found by invalidate().
+        self._add_markers(path, tables)
+        os.replace(tmp_path, path)
+        # Markers may be removed along with expired result meanwhile.
+        self._add_markers(path, tables)
+        self._evict()
+
+    def invalidate(self, *tables, database=None):
+        """
+        Removes cached results of queries reading from the given tables.
+
+        :param tables: :class:`~sqlalchemy.schema.Table` objects or names,
+                       ``schema.name`` for tables with schema.
+        :param database: default database of the connection, tables
+                         without schema belong to it. Without it, such
+                         tables are matched in any database.
+        """
+        for table in tables:
+            table = get_table_name(table, database=database)
+            directory = self._get_index_path(table)
+            for name in self._listdir(directory):
+                if name.endswith(FILE_SUFFIX):
+                    self._remove(os.path.join(self.directory, name))
+                self._remove(os.path.join(directory, name))
+
+    def clear(self):
+        for path, _ in self._list_files():
+            self._remove(path)
+
+        for table in self._listdir(self.index_directory):
+            directory = os.path.join(self.index_directory, table)
+            for name in self._listdir(directory):
+                self._remove(os.path.join(directory, name))
+
+    def _check_directory(self):
+        # Cached results are returned as query results, others must not be
+        # able to plant them.
+        st = os.stat(self.directory)
+        if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+            raise ValueError(
+                'Result cache directory {} is owned by another '
+                'user'.format(self.directory)
+            )
+        if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise ValueError(
+                'Result cache directory {} is writable by other '
+                'users'.format(self.directory)
+            )
+
+    @staticmethod
+    def _to_array(pa, values, spec):
+        """
+        Converts column values to Arrow array. None if they would be read
+        back as different Python values.
+        """
+        values = list(values)
+        try:
+            array = pa.array(values, type=get_arrow_type(pa, spec))
+        except (pa.ArrowException, TypeError, ValueError):
+            return None
+
+        # E.g. bytes of strings_as_bytes or time zone aware datetimes.
+        if array.to_pylist() != values:
+            return None
+        return array
+
+    def _get_path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + FILE_SUFFIX)
+
+    def _get_index_path(self, table):
+        name = hashlib.sha1(table.encode('utf-8')).hexdigest()
+        return os.path.join(self.index_directory, name)
+
+    def _get_markers(self, path, tables):
+        name = os.path.basename(path)
+        return [
+            os.path.join(self._get_index_path(table), name)
+            for table in tables
+        ]
+
+    def _add_markers(self, path, tables):
+        for marker in self._get_markers(path, tables):
+            os.makedirs(os.path.dirname(marker), mode=0o700, exist_ok=True)
+            open(marker, 'ab').close()
+
+    @staticmethod
+    def _read_header(reader):
+        metadata = reader.schema.metadata or {}
+        if FILE_METADATA_KEY not in metadata:
+            raise ValueError('Not a result cache file')
+
+        return json.loads(metadata[FILE_METADATA_KEY].decode('utf-8'))
+
+    def _read(self, path, key):
+        pa = import_pyarrow()
+
+        file_stat = os.stat(path)
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            header = self._read_header(reader)
+            if header['key'] != key:
+                return None
+
+            expired = header['expires'] <= time()
+            if not expired:
+                table = reader.read_all()
+                columns = [column.to_pylist() for column in table.columns]
+
+        if expired:
+            self._remove_expired(path, file_stat, header['tables'])
+            return None
+
+        columns_with_types = [tuple(x) for x in header['columns_with_types']]
+        if header['columnar']:
+            return [tuple(x) for x in columns], columns_with_types
+
+        return list(zip(*columns)), columns_with_types
+
+    def _list_files(self):
+        rv = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(FILE_SUFFIX):
+                try:
+                    rv.append((entry.path, entry.stat()))
+                except OSError:
+                    pass
+
+        return rv
+
+    def _evict(self):
+        files = sorted(self._list_files(), key=lambda x: x[1].st_mtime)
+        size = sum(file_stat.st_size for _, file_stat in files)
+
+        for path, file_stat in files:
+            if size <= self.max_bytes:
+                break
+
+            self._remove_result(path)
+            size -= file_stat.st_size
+
+    def _remove_expired(self, path, file_stat, tables):
+        """
+        Removes expired result file unless fresh result of another process
+        or thread has replaced it since it was read.
+        """
+        # Renamed away first, so a result published meanwhile is either
+        # left in place or recognized by inode and put back.
+        tombstone = '{}.{}.{}.expired'.format(
+            path, os.getpid(), threading.get_ident()
+        )
+        try:
+            os.rename(path, tombstone)
+        except OSError:
+            return
+
+        try:
+            removed = os.stat(tombstone)
+            if (removed.st_dev, removed.st_ino) != \
+                    (file_stat.st_dev, file_stat.st_ino):
+                try:
+                    # Fails if even newer result is published already.
+                    os.link(tombstone, path)
+                except OSError:
+                    pass
+                return
+        finally:
+            self._remove(tombstone)
+
+        for marker in self._get_markers(path, tables):
+            self._remove(marker)
+
+    def _remove_result(self, path, tables=None):
+        """
+        Removes result file and its entries of the table index.
+        """
+        if tables is None:
+            pa = import_pyarrow()
+            try:
+                with pa.memory_map(path) as source:
+                    header = self._read_header(pa.ipc.open_file(source))
+                tables = header['tables']
+            except (OSError, ValueError, pa.ArrowException):
+                tables = ()
+
+        self._remove(path)
+        for marker in self._get_markers(path, tables):
+            self._remove(marker)
+
+    @staticmethod
+    def _listdir(path):
+        try:
+            return os.listdir(path)
+        except OSError:
+            return []
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,87 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from time import time
+
+from ...exceptions import QueryCancelledException
+from . import metrics
+from .cache import copy_response
+
+
+class Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+        super(Call, self).__init__()
+
+
+class SingleFlight(object):
+    """
+    Runs at most one query with the same key at a time. Callers arriving
+    while the query runs wait for it and get a copy of its response.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        super(SingleFlight, self).__init__()
+
+    def do(self, key, fn, deadline=None):
+        """
+        Returns response of ``fn()`` run by this or concurrent caller with
+        the same key. If the running query fails, waiting callers run it
+        again themselves.
+
+        :param deadline: :func:`time.time` value to stop waiting at.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = Call()
+                    break
+
+            timeout = None if deadline is None else deadline - time()
+            if not call.done.wait(timeout):
+                raise QueryCancelledException('Query deadline exceeded')
+
+            if call.response is not None:
+                metrics.coalesced_queries.inc()
+                return copy_response(call.response)
+
+        try:
+            response = fn()
+            # Response itself is handed to the caller and may be changed
+            # while waiting callers copy it.
+            call.response = copy_response(response)
+            return response
+
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
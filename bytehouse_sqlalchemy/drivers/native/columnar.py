@@ -0,0 +1,168 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from sqlalchemy.types import DATE, DATETIME, FLOAT
+
+from ... import types
+from ..base import ischema_names
+
+
+# NumPy dtypes for the types in ischema_names. Types that are absent are
+# returned as object arrays.
+numpy_dtypes = {
+    types.Int8: 'int8',
+    types.Int16: 'int16',
+    types.Int32: 'int32',
+    types.Int64: 'int64',
+    types.UInt8: 'uint8',
+    types.UInt16: 'uint16',
+    types.UInt32: 'uint32',
+    types.UInt64: 'uint64',
+    FLOAT: 'float64',
+    DATE: 'datetime64[D]',
+    DATETIME: 'datetime64[s]',
+}
+
+# ischema_names folds these into a wider type, keep their native width.
+numpy_dtypes_by_name = {
+    'Float32': 'float32',
+}
+
+datetime64_units = ['s', 'ms', 'ms', 'ms', 'us', 'us', 'us', 'ns', 'ns', 'ns']
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('Extras for NumPy must be installed')
+
+    return numpy
+
+
+def unwrap_type(spec):
+    """
+    Strips Nullable and LowCardinality wrappers from the server type name.
+
+    :return: tuple of inner type name and nullable flag.
+    """
+    nullable = False
+
+    while True:
+        if spec.startswith('Nullable('):
+            nullable = True
+            spec = spec[9:-1]
+        elif spec.startswith('LowCardinality('):
+            spec = spec[15:-1]
+        else:
+            return spec, nullable
+
+
+def get_numpy_dtype(spec):
+    """
+    Maps server type name to NumPy dtype.
+
+    :return: tuple of dtype and nullable flag.
+    """
+    spec, nullable = unwrap_type(spec)
+
+    pos = spec.find('(')
+    name = spec if pos == -1 else spec[:pos]
+    args = [] if pos == -1 else spec[pos + 1:-1].split(',')
+
+    if name == 'DateTime64':
+        if len(args) > 1:
+            # Timezone-aware values are kept as datetime objects.
+            return object, nullable
+
+        precision = int(args[0]) if args else 3
+        return 'datetime64[%s]' % datetime64_units[precision], nullable
+
+    elif name == 'DateTime' and args:
+        return object, nullable
+
+    dtype = numpy_dtypes_by_name.get(name)
+    if dtype is None:
+        dtype = numpy_dtypes.get(ischema_names.get(name), object)
+
+    return dtype, nullable
+
+
+def _object_array(numpy, values):
+    rv = numpy.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        rv[i] = value
+    return rv
+
+
+def column_to_numpy(values, spec):
+    """
+    Converts column values of the given server type to NumPy array.
+    Nullable columns are returned as masked arrays.
+    """
+    numpy = import_numpy()
+    dtype, nullable = get_numpy_dtype(spec)
+
+    if dtype is object:
+        return _object_array(numpy, values)
+
+    if not nullable:
+        if isinstance(values, numpy.ndarray):
+            return values.astype(dtype, copy=False)
+        return numpy.array(values, dtype=dtype)
+
+    mask = numpy.fromiter(
+        (x is None for x in values), dtype=bool, count=len(values)
+    )
+    if mask.any():
+        values = [0 if x is None else x for x in values]
+
+    data = numpy.array(values, dtype=dtype)
+    return numpy.ma.MaskedArray(data, mask=mask)
+
+
+def array_to_column(values):
+    """
+    Converts NumPy array to the list of Python values written by the driver.
+    Masked values become None. Other sequences are returned as is.
+    """
+    if not hasattr(values, 'dtype'):
+        return values
+
+    numpy = import_numpy()
+
+    if values.dtype.kind == 'M':
+        # tolist() turns values of higher precision into ints.
+        values = values.astype('datetime64[us]')
+
+    if numpy.ma.isMaskedArray(values):
+        mask = numpy.ma.getmaskarray(values).tolist()
+        return [
+            None if is_null else x
+            for x, is_null in zip(values.data.tolist(), mask)
+        ]
+
+    return values.tolist()
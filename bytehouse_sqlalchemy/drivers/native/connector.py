@@ -24,12 +24,39 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from itertools import islice
+import warnings
+from contextlib import contextmanager
+from functools import partial
+from math import ceil
+from time import time
+from urllib.parse import urlsplit, urlunsplit
+from uuid import uuid4
+from weakref import ref
 
 from bytehouse_driver import Client as DriverClient
-from bytehouse_driver.errors import Error as DriverError
-
-from ...exceptions import DatabaseException
+from bytehouse_driver.blockstreamprofileinfo import BlockStreamProfileInfo
+from bytehouse_driver.compression import get_compressor_cls
+from bytehouse_driver.defines import DEFAULT_COMPRESS_BLOCK_SIZE
+from bytehouse_driver.errors import (
+    Error as DriverError, NetworkError, SocketTimeoutError
+)
+from bytehouse_driver.progress import Progress
+from bytehouse_driver.protocol import (
+    Compression, CompressionMethod, ServerPacketTypes
+)
+from bytehouse_driver.result import QueryInfo as DriverQueryInfo
+
+from ...exceptions import DatabaseException, QueryCancelledException
+from . import metrics
+from .arrow import ArrowFileWriter, columns_to_batch, empty_batch
+from .buffer import RowBuffer
+from .cache import get_statement_tables
+from .columnar import array_to_column, column_to_numpy
+from .external import ExternalTables, get_structure
+from .hedging import (
+    HEDGE_INTERACTIVE_DELAY, Hedge, get_hedge_host, get_hedge_query_id
+)
+from .streaming import execute_blocks
 
 # PEP 249 module globals
 apilevel = '2.0'
@@ -38,6 +65,16 @@ threadsafety = 2
 # Python extended format codes, e.g. ...WHERE name=%(name)s
 paramstyle = 'pyformat'
 
+compression_methods = ('lz4', 'lz4hc', 'zstd')
+
+# Values of network_compression_method setting by driver compressor method.
+network_compression_methods = {
+    CompressionMethod.LZ4: 'LZ4',
+    CompressionMethod.ZSTD: 'ZSTD'
+}
+# Level of the driver ZSTD compressor.
+ZSTD_COMPRESSION_LEVEL = 3
+
 
 class Error(Exception):
     """
@@ -54,16 +91,393 @@ def connect(*args, **kwargs):
     return Connection(*args, **kwargs)
 
 
+def pin_host(url, host):
+    """
+    Replaces host and port of ``url`` with ``host`` and drops alternative
+    hosts, so all queries go to the same server.
+    """
+    parts = urlsplit(url)
+    userinfo, at, _ = parts.netloc.rpartition('@')
+
+    query = [
+        item for item in parts.query.split('&')
+        if item and item.split('=', 1)[0] not in ('alt_hosts', 'round_robin')
+    ]
+
+    return urlunsplit(parts._replace(
+        netloc=userinfo + at + host, query='&'.join(query)
+    ))
+
+
+def get_compression(compression):
+    """
+    Returns compression method or False for ``compression`` URL parameter
+    or execution option value: ``none``, ``lz4``, ``lz4hc``, ``zstd`` or
+    boolean, True means ``lz4``.
+    """
+    if isinstance(compression, str):
+        compression = compression.lower()
+        if compression in compression_methods:
+            return compression
+
+        elif compression in ('none', 'false', '0'):
+            return False
+
+        elif compression in ('true', '1'):
+            return 'lz4'
+
+        raise ValueError(
+            'Unknown compression method: {}'.format(compression)
+        )
+
+    return 'lz4' if compression else False
+
+
+def get_network_compression_method(compressor_cls):
+    """
+    Returns value of ``network_compression_method`` setting making the
+    server compress results like the driver compressor class.
+    """
+    # LZ4HC blocks are LZ4 on the wire, the compressor differs by mode.
+    if getattr(compressor_cls, 'mode', None) == 'high_compression':
+        return 'LZ4HC'
+    return network_compression_methods[compressor_cls.method]
+
+
+class QueryInfo(DriverQueryInfo):
+    """
+    Query info which passes progress and profile to the listener as soon
+    as they are received.
+    """
+
+    def __init__(self, listener=None):
+        self.listener = listener
+        super(QueryInfo, self).__init__()
+
+    def store_progress(self, progress):
+        metrics.read_rows.inc(progress.rows)
+        metrics.read_bytes.inc(progress.bytes)
+        super(QueryInfo, self).store_progress(progress)
+        if self.listener is not None:
+            self.listener._store_progress(self.progress)
+
+    def store_profile(self, profile_info):
+        super(QueryInfo, self).store_profile(profile_info)
+        if self.listener is not None:
+            self.listener._store_profile(profile_info)
+
+
+class Transport(DriverClient):
+    """
+    Driver client which cancels running query when it is requested from
+    another thread or when query deadline passes.
+
+    Cancel is sent by the thread reading the result before it receives the
+    next packet, so packets are never written to the socket concurrently.
+    Server sends progress packets periodically while the query runs.
+
+    Packets of INSERT are read by the driver from the connection directly,
+    so cancel and progress are handled by wrapping ``receive_packet`` of
+    each connection rather than of the client.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.deadline = None
+        self.listener = None
+        self.cancel_requested = False
+        self.cancelled = None
+        self.inserting = False
+        # Compression of the next queries and of the connection itself.
+        self.compression = self.default_compression = None
+        # Settings making the server compress results the same way.
+        self.compression_settings = {}
+        super(Transport, self).__init__(*args, **kwargs)
+
+        for connection in [self.connection] + list(self.connections):
+            self.watch_connection(connection)
+
+        connection = self.connection
+        self.default_compression = (
+            connection.compression, connection.compressor_cls,
+            connection.compress_block_size
+        )
+
+    def start_query(self, deadline=None, listener=None):
+        """
+        Resets cancel state before the next query.
+
+        :param deadline: :func:`time.time` value after which the query is
+                         cancelled.
+        :param listener: cursor notified about query progress and profile.
+        """
+        self.deadline = deadline
+        self.listener = listener
+        self.cancel_requested = False
+        self.cancelled = None
+
+    def set_compression(self, compression=None, block_size=None):
+        """
+        Sets compression of data sent and received by the next queries.
+        Compression is chosen by the client for each query. Connection
+        defaults are used when arguments are None.
+
+        It is applied when the query establishes connection, so with
+        ``alt_hosts`` the host which actually runs the query gets it.
+
+        :param compression: compression method, see
+                            :func:`get_compression`.
+        :param block_size: size of compressed blocks sent to the server.
+        """
+        state, compressor_cls, size = self.default_compression
+
+        if compression is not None:
+            method = get_compression(compression)
+            if method:
+                state = Compression.ENABLED
+                compressor_cls = get_compressor_cls(method)
+                size = size or DEFAULT_COMPRESS_BLOCK_SIZE
+            else:
+                state, compressor_cls, size = Compression.DISABLED, None, None
+
+        if block_size is not None and state == Compression.ENABLED:
+            size = block_size
+
+        self.compression = (state, compressor_cls, size)
+
+        # Server compresses results with its own method, LZ4 by default.
+        self.compression_settings = {}
+        if state == Compression.ENABLED:
+            self.compression_settings['network_compression_method'] = \
+                get_network_compression_method(compressor_cls)
+            if compressor_cls.method == CompressionMethod.ZSTD:
+                self.compression_settings[
+                    'network_zstd_compression_level'
+                ] = ZSTD_COMPRESSION_LEVEL
+
+    @staticmethod
+    def configure_compression(connection, compression):
+        if compression is None:
+            return
+
+        current = (
+            connection.compression, connection.compressor_cls,
+            connection.compress_block_size
+        )
+        if current == compression:
+            return
+
+        (
+            connection.compression, connection.compressor_cls,
+            connection.compress_block_size
+        ) = compression
+
+        # Streams of the established connection are built for its
+        # compression.
+        if connection.connected:
+            connection.block_in = connection.get_block_in_stream()
+            connection.block_out = connection.get_block_out_stream()
+
+    def make_query_settings(self, settings):
+        super(Transport, self).make_query_settings(settings)
+
+        # Query settings are built anew for each query, so values of the
+        # previous query don't stay. Settings passed with the query win.
+        context = self.connection.context
+        query_settings = context.settings
+        for name, value in self.compression_settings.items():
+            if name not in (settings or {}):
+                query_settings[name] = value
+        context.settings = query_settings
+
+    def establish_connection(self, settings):
+        previous = self.connection
+        try:
+            # Client may switch to another host here.
+            super(Transport, self).establish_connection(settings)
+        finally:
+            # Connections left for other hosts keep their defaults.
+            if self.connection is not previous:
+                self.configure_compression(
+                    previous, self.default_compression
+                )
+
+        self.configure_compression(self.connection, self.compression)
+        self.last_query = QueryInfo(self.listener)
+
+    def request_cancel(self):
+        """
+        Asks to cancel running query. Safe to call from any thread.
+        """
+        self.cancel_requested = True
+
+    def watch_connection(self, connection):
+        """
+        Wraps ``receive_packet`` of the driver connection, so running query
+        is cancelled and its progress is stored whichever client method
+        reads the packets.
+        """
+        receive_packet = connection.receive_packet
+
+        def receive_watched_packet():
+            self.check_cancel(connection)
+            packet = receive_packet()
+
+            last_query = self.last_query
+            if last_query is None:
+                pass
+            elif packet.type == ServerPacketTypes.PROGRESS:
+                last_query.store_progress(packet.progress)
+            elif packet.type == ServerPacketTypes.PROFILE_INFO:
+                last_query.store_profile(packet.profile_info)
+
+            return packet
+
+        connection.receive_packet = receive_watched_packet
+
+    def check_cancel(self, connection):
+        if self.cancelled is not None or not connection.is_query_executing:
+            return
+
+        if self.cancel_requested:
+            self.cancelled = 'Query was cancelled'
+        elif self.deadline is not None and time() >= self.deadline:
+            self.cancelled = 'Query deadline exceeded'
+        else:
+            return
+
+        # Server would still wait for INSERT data after cancel, so INSERT
+        # is aborted by closing the connection.
+        if self.inserting:
+            raise DriverError(self.cancelled)
+        connection.send_cancel()
+
+    def receive_packet(self):
+        # Progress and profile are already stored by the connection.
+        packet = self.connection.receive_packet()
+
+        if packet.type == ServerPacketTypes.EXCEPTION:
+            raise packet.exception
+
+        elif packet.type == ServerPacketTypes.END_OF_STREAM:
+            return False
+
+        elif packet.type in (
+                ServerPacketTypes.PROGRESS, ServerPacketTypes.DATA,
+                ServerPacketTypes.TOTALS, ServerPacketTypes.EXTREMES):
+            return packet
+
+        return True
+
+    def process_insert_query(self, *args, **kwargs):
+        self.inserting = True
+        try:
+            return super(Transport, self).process_insert_query(
+                *args, **kwargs
+            )
+        finally:
+            self.inserting = False
+
+
 class Connection(object):
-    transport_cls = DriverClient
+    transport_cls = Transport
+    # HostStats of the host set by HostPool.
+    stats = None
 
     def __init__(self, *args, **kwargs):
         url = args[0]
+
+        self.host = kwargs.get('host')
+        if self.host is not None:
+            url = pin_host(url, self.host)
+
+        self.url = args[0]
         self.transport = self.transport_cls.from_url(url)
+        # Streamed result which is being read from the wire.
+        self.stream = None
+        # Connection to another host for hedged queries and the last one.
+        self.hedge_transport = None
+        self.hedge = None
         super(Connection, self).__init__()
 
+    @property
+    def database(self):
+        """
+        Default database of the connection.
+        """
+        return self.transport.connection.database
+
     def close(self):
-        pass
+        if self.hedge is not None:
+            self.hedge.join()
+        if self.hedge_transport is not None:
+            self.hedge_transport.disconnect()
+        self.transport.disconnect()
+
+    def make_hedge(self, delay, execute):
+        """
+        Returns :class:`.Hedge` of the query sending it to the next host of
+        the URL, see ``hedge_after`` execution option.
+        """
+        if self.hedge is not None:
+            # The second query of the last hedge is already cancelled.
+            self.hedge.join()
+
+        if self.hedge_transport is None:
+            # Driver client connects when it's created.
+            current, _ = self.transport.connection.hosts[0]
+            host = get_hedge_host(self.url, current)
+            url = self.url if host is None else pin_host(self.url, host)
+            self.hedge_transport = self.transport_cls.from_url(url)
+
+        self.hedge = Hedge(
+            self.transport, self.hedge_transport, delay, execute
+        )
+        return self.hedge
+
+    def ping(self):
+        """
+        Checks that connection to the server is alive. Closed connection is
+        established again.
+
+        :return: False if server is unreachable.
+        """
+        connection = self.transport.connection
+        if connection.is_query_executing:
+            return False
+
+        try:
+            if not connection.connected:
+                connection.connect()
+                return True
+
+            return connection.ping()
+
+        except DriverError:
+            return False
+
+    def close_stream(self):
+        """
+        Cancels query of a partially read streamed result, e.g. left by a
+        garbage-collected cursor.
+        """
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.cancel()
+
+    def reset(self):
+        """
+        Gets connection ready for the next query. Query of a partially
+        read streamed result is cancelled. Connection is closed if other
+        result was left partially read, it is established again on the
+        next query.
+        """
+        self.close_stream()
+
+        transport = self.transport
+        if transport.connection.is_query_executing:
+            transport.disconnect_connection()
+
+        transport.reset_last_query()
 
     def commit(self):
         pass
@@ -102,6 +516,39 @@ class Cursor(object):
     def rowcount(self):
         return self._rowcount
 
+    @property
+    def progress(self):
+        """
+        Progress totals of the last query: ``rows`` and ``bytes`` read,
+        ``total_rows`` to read, ``written_rows`` and ``written_bytes``.
+        """
+        return self._progress
+
+    @property
+    def profile_info(self):
+        """
+        Result profile of the last SELECT: ``rows``, ``blocks``, ``bytes``,
+        ``applied_limit`` and ``rows_before_limit``.
+        """
+        return self._profile_info
+
+    @property
+    def elapsed(self):
+        """
+        Seconds the last query took till its result was received. For
+        streamed results till the first block was received.
+        """
+        return self._elapsed
+
+    @property
+    def query_id(self):
+        """
+        Query id of the last query sent to the server if it was passed with
+        ``query_id`` execution option or generated for tracing. For hedged
+        query taken from the second host it has ``-hedge`` suffix.
+        """
+        return self._query_id
+
     @property
     def description(self):
         columns = self._columns or []
@@ -113,36 +560,64 @@ class Cursor(object):
         ]
 
     def close(self):
-        self._connection.transport.disconnect()
+        # Transport is shared by all cursors of the connection and stays
+        # connected. Only unread blocks of streamed result must not be left
+        # on the wire, the query is cancelled on the server.
+        blocks, self._blocks = self._blocks, None
+        if blocks is not None:
+            blocks.cancel()
+            if self._connection.stream is blocks:
+                self._connection.stream = None
+
+    def __del__(self):
+        # Result dropped in the middle of the stream. No I/O is done from
+        # finalizer, the stream stays on the connection and is cancelled
+        # before its next query or when it is returned to the pool.
+        if getattr(self, '_blocks', None) is not None:
+            warnings.warn(
+                'Cursor with partially read streamed result was not closed',
+                ResourceWarning
+            )
 
-    def make_external_tables(self, dialect, execution_options):
+    def make_external_tables(self, dialect, execution_options,
+                             extra=None):
+        """
+        Returns external tables of the query.
+
+        :param extra: list of name, structure and data of other tables,
+                      e.g. made of long IN lists.
+        """
         external_tables = execution_options.get('external_tables')
-        if external_tables is None:
+        if external_tables is None and not extra:
             return
 
-        tables = []
-        type_compiler = dialect.type_compiler
-
-        for table in external_tables:
-            structure = []
-            for c in table.columns:
-                type_ = type_compiler.process(c.type, type_expression=c)
-                structure.append((c.name, type_))
+        transport = self._connection.transport
+        tables = ExternalTables(transport.client_settings['insert_block_size'])
+        # Structures are compiled once per table.
+        cache = getattr(dialect, 'external_structures', None)
+
+        for table in external_tables or ():
+            structure = get_structure(table, dialect.type_compiler, cache)
+            tables.add(
+                table.name, structure,
+                table.dialect_options['bytehouse']['data']
+            )
 
-            tables.append({
-                'name': table.name,
-                'structure': structure,
-                'data': table.dialect_options['bytehouse']['data']
-            })
+        for name, structure, data in extra or ():
+            tables.add(name, structure, data)
 
         return tables
 
     def _prepare(self, context=None):
         if context:
             execution_options = context.execution_options
+            self._timing = context.timing
+            events = context.dialect.query_events.dispatch
+            if events.on_progress or events.on_profile:
+                self._context = ref(context)
 
             external_tables = self.make_external_tables(
-                context.dialect, execution_options
+                context.dialect, execution_options, context.external_in
             )
         else:
             execution_options = {}
@@ -150,58 +625,216 @@ class Cursor(object):
 
         transport = self._connection.transport
         execute = transport.execute
-        execute_iter = getattr(transport, 'execute_iter', None)
 
         self._stream_results = execution_options.get('stream_results', False)
         settings = execution_options.get('settings')
 
-        if self._stream_results and execute_iter:
-            execute = execute_iter
-            settings = settings or {}
-            settings['max_block_size'] = execution_options['max_row_buffer']
+        deadline = self._get_deadline(execution_options)
+        if deadline is not None:
+            timeout = int(ceil(deadline - time()))
+            if timeout <= 0:
+                raise QueryCancelledException('Query deadline exceeded')
+
+            # Server stops the query as well if the client can't reach it.
+            settings = dict(settings or {})
+            settings['max_execution_time'] = min(
+                settings.get('max_execution_time') or timeout, timeout
+            )
+
+        transport.set_compression(
+            execution_options.get('compression'),
+            execution_options.get('compress_block_size')
+        )
+        # Other cursor could leave its stream unread.
+        self._connection.close_stream()
+        transport.start_query(deadline, listener=self)
 
         execute_kwargs = {
+            'query_id': self._query_id,
             'settings': settings,
             'external_tables': external_tables,
             'types_check': execution_options.get('types_check', False)
         }
 
+        if self._stream_results:
+            # Block size is set by max_block_size setting, max_row_buffer
+            # only limits rows buffered by SQLAlchemy.
+            execute = partial(execute_blocks, transport)
+
+        elif execution_options.get('columnar', False):
+            self._columnar = True
+            execute_kwargs['columnar'] = True
+
+        if self._timing is not None:
+            execute = self._timing.timed(execute)
+
         return execute, execute_kwargs
 
-    def execute(self, operation, parameters=None, context=None):
-        self._reset_state()
-        self._begin_query()
+    def _prepare_insert(self, context=None):
+        _, execute_kwargs = self._prepare(context)
 
-        try:
-            execute, execute_kwargs = self._prepare(context)
+        # INSERT data is sent at once in row-oriented form by default and
+        # there is no result to stream.
+        execute_kwargs.pop('columnar', None)
+        self._stream_results = self._columnar = False
 
-            response = execute(
-                operation, params=parameters, with_column_types=True,
-                **execute_kwargs
-            )
+        execute = self._connection.transport.execute
+        if self._timing is not None:
+            execute = self._timing.timed(execute)
 
-        except DriverError as orig:
-            raise DatabaseException(orig)
+        return execute, execute_kwargs
 
-        self._process_response(response)
-        self._end_query()
+    def execute(self, operation, parameters=None, context=None):
+        self._reset_state()
+        self._begin_query(operation)
+
+        with self._traced(operation, context):
+            try:
+                execute, execute_kwargs = self._prepare(context)
+
+                hedge_after = None
+                tables = execute_kwargs['external_tables']
+                # Hedge sends external tables again.
+                if context is not None and not self._stream_results and \
+                        (tables is None or tables.replayable):
+                    hedge_after = context.execution_options.get('hedge_after')
+
+                def run():
+                    if hedge_after is not None:
+                        return self._run_hedged(
+                            execute, hedge_after, operation, parameters,
+                            execute_kwargs
+                        )
+
+                    response = execute(
+                        operation, params=parameters, with_column_types=True,
+                        **execute_kwargs
+                    )
+                    self._check_cancelled()
+                    return response
+
+                response = self._run_shared(
+                    run, operation, parameters, context, execute_kwargs
+                )
+
+            except DriverError as orig:
+                raise self._wrap_error(orig)
+
+            self._process_response(response)
+            self._end_query()
 
     def executemany(self, operation, seq_of_parameters, context=None):
         self._reset_state()
-        self._begin_query()
+        self._begin_query(operation)
+
+        with self._traced(operation, context):
+            try:
+                execute, execute_kwargs = self._prepare_insert(context)
+
+                response = execute(
+                    operation, params=seq_of_parameters, **execute_kwargs
+                )
+
+            except DriverError as orig:
+                raise self._wrap_error(orig)
+
+            self._check_cancelled()
+            self._process_response(response, executemany=True)
+            self._end_query()
+
+    def fetch_arrow_batches(self, path=None):
+        """
+        Yields remaining rows as :class:`pyarrow.RecordBatch` objects.
+
+        With ``stream_results`` execution option each batch holds one
+        server block, so the result is never fully kept in memory.
+        Otherwise the rest of the result is yielded as a single batch.
+
+        :param path: if specified batches are also written to Arrow IPC
+                     file. The file appears at this path only after the last
+                     batch is written and can be memory-mapped for zero-copy
+                     reads, see :func:`.arrow.open_arrow_file`.
+        """
+        self.check_query_started()
+
+        columns_with_types = list(zip(self._columns, self._types))
+        writer = None
+        if path is not None:
+            schema = empty_batch(columns_with_types).schema
+            writer = ArrowFileWriter(path, schema)
 
         try:
-            execute, execute_kwargs = self._prepare(context)
+            if self._blocks is None:
+                columns = self.fetch_columns()
+            else:
+                # Rows already taken from the stream by other fetches.
+                columns = list(zip(*self._rows.popall()))
+
+            if columns and len(columns[0]):
+                batch = columns_to_batch(columns, columns_with_types)
+                if writer is not None:
+                    writer.write(batch)
+                yield batch
+
+            while self._blocks is not None:
+                block = next(self._blocks, None)
+                if block is None:
+                    self._blocks = None
+                    break
+
+                batch = columns_to_batch(
+                    block.get_columns(), columns_with_types
+                )
+                if writer is not None:
+                    writer.write(batch)
+                yield batch
+
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+
+        if writer is not None:
+            writer.close()
+
+    def insert_columns(self, operation, columns, context=None):
+        """
+        Executes INSERT query with data passed in column-oriented form.
 
-            response = execute(
-                operation, params=seq_of_parameters, **execute_kwargs
-            )
+        :param operation: INSERT query without data, i.e.
+                          ``INSERT INTO t (x, y) VALUES``.
+        :param columns: list of column sequences in the order of the query
+                        columns. NumPy arrays are accepted as well.
+        """
+        self._reset_state()
+        self._begin_query(operation)
+
+        with self._traced(operation, context):
+            try:
+                execute, execute_kwargs = self._prepare_insert(context)
+                execute_kwargs['columnar'] = True
+
+                response = execute(
+                    operation, params=[array_to_column(c) for c in columns],
+                    **execute_kwargs
+                )
+
+            except DriverError as orig:
+                raise self._wrap_error(orig)
 
-        except DriverError as orig:
-            raise DatabaseException(orig)
+            self._check_cancelled()
+            self._process_response(response, executemany=True)
+            self._end_query()
 
-        self._process_response(response, executemany=True)
-        self._end_query()
+    def cancel(self):
+        """
+        Cancels the query being executed or streamed by the cursor. Safe to
+        call from another thread. The query is cancelled on the server and
+        :meth:`execute` or the next fetch of streamed result raises
+        :class:`~bytehouse_sqlalchemy.exceptions.QueryCancelledException`.
+        """
+        if self._state == self._states.RUNNING or self._blocks is not None:
+            self._connection.transport.request_cancel()
 
     def check_query_started(self):
         if self._state == self._states.NONE:
@@ -210,34 +843,83 @@ class Cursor(object):
     def fetchone(self):
         self.check_query_started()
 
-        if self._stream_results:
-            return next(self._rows, None)
+        self._fill_rows(1)
+        return self._rows.popone()
 
-        else:
-            if not self._rows:
-                return None
+    def fetchmany(self, size=1):
+        self.check_query_started()
 
-            return self._rows.pop(0)
+        self._fill_rows(size)
+        return self._rows.popmany(size)
 
-    def fetchmany(self, size=1):
+    def fetchall(self):
         self.check_query_started()
 
-        if self._stream_results:
-            return list(islice(self._rows, size))
+        self._fill_rows()
+        return self._rows.popall()
 
-        rv = self._rows[:size]
-        self._rows = self._rows[size:]
-        return rv
+    def fetchblock(self):
+        """
+        Fetches rows of the next block received from the server. Rows
+        already buffered by other fetches are returned first.
 
-    def fetchall(self):
+        Without ``stream_results`` execution option the whole result
+        is one block.
+
+        :return: list of rows, empty list if there are no more rows.
+        """
         self.check_query_started()
 
-        if self._stream_results:
-            return list(self._rows)
+        if not self._rows:
+            self._fill_rows(1)
+        return self._rows.popall()
 
-        rv = self._rows
-        self._rows = []
-        return rv
+    def fetch_columns(self):
+        """
+        Fetches all remaining rows in column-oriented form.
+
+        Executing with ``columnar=True`` execution option lets the driver
+        return columns as is. Otherwise remaining rows are transposed.
+
+        :return: list of column sequences in the order of ``description``.
+        """
+        self.check_query_started()
+
+        if self._column_data is not None:
+            rv = self._column_data
+            self._column_data = None
+            return rv
+
+        if self._blocks is not None and not self._rows:
+            rv = [[] for _ in self._columns]
+            for block in self._blocks:
+                for column, values in zip(rv, block.get_columns()):
+                    column.extend(values)
+            self._blocks = None
+            return rv
+
+        rows = self.fetchall()
+        if not rows:
+            return [[] for _ in self._columns or ()]
+
+        return [list(column) for column in zip(*rows)]
+
+    def fetch_numpy(self):
+        """
+        Fetches all remaining rows as typed NumPy arrays.
+
+        Column dtypes are derived from the server types of the result.
+        Nullable columns are returned as masked arrays, columns without
+        a fixed-width NumPy counterpart as object arrays.
+
+        :return: list of arrays in the order of ``description``.
+        """
+        columns = self.fetch_columns()
+
+        return [
+            column_to_numpy(column, type_)
+            for column, type_ in zip(columns, self._types)
+        ]
 
     @property
     def arraysize(self):
@@ -256,18 +938,27 @@ class Cursor(object):
     def _process_response(self, response, executemany=False):
         if executemany:
             self._rowcount = response
+            metrics.insert_rows.inc(response or 0)
             response = None
 
         if not response:
-            self._columns = self._types = self._rows = []
+            self._columns = self._types = []
+            self._rows = RowBuffer()
             return
 
         if self._stream_results:
-            columns_with_types = next(response)
-            rows = response
+            self._blocks = self._connection.stream = response
+            response.timing = self._timing
+            columns_with_types = response.columns_with_types
+            rows = RowBuffer()
+
+        elif self._columnar:
+            self._column_data, columns_with_types = response
+            rows = RowBuffer()
 
         else:
             rows, columns_with_types = response
+            rows = RowBuffer([rows])
 
         if columns_with_types:
             self._columns, self._types = zip(*columns_with_types)
@@ -276,21 +967,259 @@ class Cursor(object):
 
         self._rows = rows
 
+        if self._column_data is not None:
+            # Driver returns no columns at all for empty result.
+            self._column_data = list(self._column_data) or [
+                [] for _ in self._columns
+            ]
+
+        # Size of streamed result is not known in advance.
+        if not self._columns:
+            self._rowcount = self._progress.written_rows
+        elif self._column_data is not None:
+            self._rowcount = len(self._column_data[0])
+        elif not self._stream_results:
+            self._rowcount = len(rows)
+
+        if self._rowcount > 0 and self._columns:
+            if self._shared:
+                metrics.rows_shared.inc(self._rowcount)
+            else:
+                metrics.rows_fetched.inc(self._rowcount)
+
+    def _fill_rows(self, size=None):
+        """
+        Makes at least ``size`` rows available in the row buffer if result
+        has them. All remaining rows if ``size`` is not specified.
+        """
+        if self._column_data is not None:
+            self._rows.append_block(zip(*self._column_data))
+            self._column_data = None
+
+        while self._blocks is not None and \
+                (size is None or len(self._rows) < size):
+            block = next(self._blocks, None)
+            if block is None:
+                self._blocks = None
+            else:
+                self._rows.append_block(block.get_rows())
+
+    @staticmethod
+    def _get_deadline(execution_options):
+        """
+        Gets query deadline from ``timeout`` (seconds) and ``deadline``
+        (:func:`time.time` value) execution options, the earliest wins.
+        """
+        deadline = execution_options.get('deadline')
+        timeout = execution_options.get('timeout')
+        if timeout is not None:
+            timeout_deadline = time() + timeout
+            if deadline is None or timeout_deadline < deadline:
+                deadline = timeout_deadline
+
+        return deadline
+
+    def _run_shared(self, run, operation, parameters, context,
+                    execute_kwargs):
+        """
+        Runs the query or takes its result from the result cache or from
+        identical query in flight, see ``cache_ttl`` and ``coalesce``
+        execution options. The cursor's connection stays checked out while
+        waiting for the query in flight.
+        """
+        if context is None or self._stream_results or \
+                execute_kwargs['external_tables']:
+            return run()
+
+        execution_options = context.execution_options
+        cache_ttl = execution_options.get('cache_ttl')
+        coalesce = execution_options.get('coalesce', False)
+        if not cache_ttl and not coalesce:
+            return run()
+
+        key = self._get_query_key(operation, parameters, execution_options)
+
+        # Response is shared unless this cursor runs the query itself.
+        self._shared = True
+        fetch = run
+
+        def run():
+            self._shared = False
+            return fetch()
+
+        if cache_ttl:
+            cache = execution_options.get('result_cache')
+            if cache is None:
+                cache = context.dialect.result_cache
+
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            run = partial(self._run_cached, run, cache, key, context)
+
+        if coalesce:
+            return context.dialect.single_flight.do(
+                key, run, deadline=self._connection.transport.deadline
+            )
+
+        return run()
+
+    def _run_hedged(self, execute, delay, operation, parameters,
+                    execute_kwargs):
+        """
+        Runs the query and sends it to another host as well if there is no
+        response within ``delay`` seconds. First response is taken.
+        """
+        settings = dict(execute_kwargs['settings'] or {})
+        settings.setdefault('interactive_delay', HEDGE_INTERACTIVE_DELAY)
+        execute_kwargs = dict(execute_kwargs, settings=settings)
+        hedge_query_id = get_hedge_query_id(execute_kwargs['query_id'])
+
+        def execute_on(transport):
+            if transport is self._connection.transport:
+                return execute(
+                    operation, params=parameters, with_column_types=True,
+                    **execute_kwargs
+                )
+
+            # The second query runs under its own id.
+            return transport.execute(
+                operation, params=parameters, with_column_types=True,
+                **dict(execute_kwargs, query_id=hedge_query_id)
+            )
+
+        hedge = self._connection.make_hedge(delay, execute_on)
+        response, hedged = hedge.run()
+        if hedged:
+            self._query_id = hedge_query_id
+        else:
+            self._check_cancelled()
+
+        return response
+
+    def _get_query_key(self, operation, parameters, execution_options):
+        # Settings derived from timeout don't change the result.
+        settings = execution_options.get('settings') or {}
+        connection = self._connection.transport.connection
+        return (
+            connection.user, connection.database, operation,
+            repr(parameters), repr(sorted(settings.items())), self._columnar
+        )
+
+    def _run_cached(self, run, cache, key, context):
+        response = run()
+
+        compiled = context.compiled
+        tables = ()
+        if compiled is not None:
+            tables = get_statement_tables(
+                compiled.statement, database=self._connection.database
+            )
+        ttl = context.execution_options['cache_ttl']
+        cache.put(key, response, ttl, tables=tables, columnar=self._columnar)
+        return response
+
+    @contextmanager
+    def _traced(self, operation, context):
+        """
+        Runs query in a span of ``tracer`` execution option if it's set.
+        Query id is generated if it wasn't passed.
+        """
+        execution_options = context.execution_options if context else {}
+        self._query_id = execution_options.get('query_id')
+
+        tracer = execution_options.get('tracer')
+        if tracer is None:
+            yield
+            return
+
+        if self._query_id is None:
+            self._query_id = str(uuid4())
+
+        attributes = {
+            'db.system': 'bytehouse',
+            'db.operation': self._kind,
+            'db.statement': operation,
+            'db.bytehouse.query_id': self._query_id
+        }
+        with tracer.start_span('bytehouse.' + self._kind, attributes) as span:
+            yield
+            span.set_attribute('db.bytehouse.rowcount', self._rowcount)
+
+    def _check_cancelled(self):
+        cancelled = self._connection.transport.cancelled
+        if cancelled is not None:
+            metrics.query_errors.inc(labels=(self._kind, ))
+            raise QueryCancelledException(cancelled)
+
+    def _wrap_error(self, orig):
+        metrics.query_errors.inc(labels=(self._kind, ))
+        stats = self._connection.stats
+        if stats is not None and \
+                isinstance(orig, (NetworkError, SocketTimeoutError)):
+            stats.record_failure()
+
+        if self._connection.transport.cancelled is not None:
+            return QueryCancelledException(orig)
+        return DatabaseException(orig)
+
+    def _store_progress(self, progress):
+        self._progress = progress
+
+        context = self._context and self._context()
+        if context is not None:
+            events = context.dialect.query_events.dispatch
+            events.on_progress(context.root_connection, context, progress)
+
+    def _store_profile(self, profile_info):
+        self._profile_info = profile_info
+
+        context = self._context and self._context()
+        if context is not None:
+            events = context.dialect.query_events.dispatch
+            events.on_profile(context.root_connection, context, profile_info)
+
     def _reset_state(self):
         """
         Resets query state and get ready for another query.
         """
+        # Previous result of the cursor is not read till the end.
+        if getattr(self, '_blocks', None) is not None:
+            self.close()
+
         self._state = self._states.NONE
+        self._context = None
+        self._query_id = None
+        self._timing = None
+        self._progress = Progress()
+        self._profile_info = BlockStreamProfileInfo()
+        self._elapsed = 0
+        self._start_time = None
 
         self._columns = None
         self._types = None
         self._rows = None
+        self._column_data = None
+        self._blocks = None
         self._rowcount = -1
 
         self._stream_results = False
+        self._columnar = False
+        # Result is taken from result cache or identical query in flight.
+        self._shared = False
 
-    def _begin_query(self):
+    def _begin_query(self, operation):
         self._state = self._states.RUNNING
+        self._start_time = time()
+        self._kind = metrics.statement_kind(operation)
+        metrics.queries.inc(labels=(self._kind, ))
 
     def _end_query(self):
         self._state = self._states.FINISHED
+        self._elapsed = time() - self._start_time
+        metrics.query_duration.observe(self._elapsed, labels=(self._kind, ))
+
+        stats = self._connection.stats
+        if stats is not None:
+            stats.observe(self._elapsed)
@@ -0,0 +1,86 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+
+class QueryEventsTarget(object):
+    """
+    Holds query event listeners of an engine, see :class:`QueryEvents`.
+    """
+
+
+class QueryEvents(event.Events):
+    """
+    Events of packets received from the server while query runs::
+
+        from sqlalchemy import event
+
+        @event.listens_for(engine, 'on_progress')
+        def on_progress(conn, context, progress):
+            print(context.statement, progress.rows, progress.total_rows)
+
+    Listeners are registered on an engine or a connection, in both cases
+    they get events of all connections of the engine. Listeners of asyncio
+    engines are called in executor threads.
+    """
+
+    _dispatch_target = QueryEventsTarget
+
+    @classmethod
+    def _accept_with(cls, target):
+        if isinstance(target, Connection):
+            target = target.engine
+
+        if isinstance(target, Engine):
+            return getattr(target.dialect, 'query_events', None)
+
+        if isinstance(target, QueryEventsTarget):
+            return target
+
+        return None
+
+    def on_progress(self, conn, context, progress):
+        """
+        Called on each progress packet.
+
+        :param conn: :class:`~sqlalchemy.engine.Connection`.
+        :param context: execution context of the query.
+        :param progress: progress totals of the query so far with ``rows``,
+                         ``bytes``, ``total_rows``, ``written_rows`` and
+                         ``written_bytes`` attributes.
+        """
+
+    def on_profile(self, conn, context, profile_info):
+        """
+        Called when profile packet is received at the end of SELECT.
+
+        :param conn: :class:`~sqlalchemy.engine.Connection`.
+        :param context: execution context of the query.
+        :param profile_info: result profile with ``rows``, ``blocks``,
+                             ``bytes``, ``applied_limit`` and
+                             ``rows_before_limit`` attributes.
+        """
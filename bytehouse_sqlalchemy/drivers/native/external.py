@@ -0,0 +1,158 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from collections.abc import Iterator, Mapping
+from itertools import chain
+
+from sqlalchemy.sql import sqltypes
+
+from .columnar import array_to_column
+
+# Generic integer types compile to server's INTEGER, i.e. Int32, and
+# similar, which may not hold Python ints bound to them.
+generic_integer_types = (
+    sqltypes.Integer, sqltypes.BigInteger, sqltypes.SmallInteger
+)
+
+
+def get_structure(table, type_compiler, cache=None):
+    """
+    Returns list of column names and server types of external ``table``.
+
+    :param cache: mapping from tables to their structures, compiled
+                  structure is stored there.
+    """
+    structure = cache.get(table) if cache is not None else None
+    if structure is None:
+        structure = [
+            (c.name, type_compiler.process(c.type, type_expression=c))
+            for c in table.columns
+        ]
+        if cache is not None:
+            cache[table] = structure
+
+    return structure
+
+
+def get_external_type(type_, dialect):
+    """
+    Returns server type of external table column holding values bound as
+    ``type_``. Generic integers are sent as Int64.
+    """
+    impl = type_._unwrapped_dialect_impl(dialect)
+    if type(impl) in generic_integer_types:
+        return 'Int64'
+
+    return dialect.type_compiler.process(type_)
+
+
+def is_frame(data):
+    return hasattr(data, 'iloc') and hasattr(data, 'columns')
+
+
+def frame_to_columns(frame, structure):
+    from ...ext.dataframe import series_to_column
+
+    return {
+        name: series_to_column(frame[name], type_)
+        for name, type_ in structure
+    }
+
+
+def iter_batch_blocks(batch, structure, block_size):
+    """
+    Splits batch of external table data into lists of rows of at most
+    ``block_size`` rows. Batch is a sequence of rows, a dict of column
+    sequences or NumPy arrays or a pandas DataFrame.
+    """
+    if is_frame(batch):
+        batch = frame_to_columns(batch, structure)
+
+    if isinstance(batch, Mapping):
+        columns = [batch[name] for name, _ in structure]
+        size = len(columns[0]) if columns else 0
+
+        for start in range(0, size, block_size):
+            yield list(zip(*[
+                array_to_column(column[start:start + block_size])
+                for column in columns
+            ]))
+
+    elif len(batch) <= block_size:
+        yield batch
+
+    else:
+        for start in range(0, len(batch), block_size):
+            yield batch[start:start + block_size]
+
+
+class ExternalTables(object):
+    """
+    External tables of the query sent by the driver. Data of each table is
+    sent in blocks of at most ``block_size`` rows, so the driver never
+    holds more than one block of rows.
+
+    Table data is a sequence of rows, a dict of column sequences or NumPy
+    arrays, a pandas DataFrame or an iterator of such batches.
+    """
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.tables = []
+
+    def add(self, name, structure, data):
+        self.tables.append((name, structure, data))
+
+    def __len__(self):
+        return len(self.tables)
+
+    @property
+    def replayable(self):
+        """
+        Whether tables can be sent more than once. Iterators of batches
+        are consumed by the first query.
+        """
+        return not any(
+            isinstance(data, Iterator) for _, _, data in self.tables
+        )
+
+    def iter_blocks(self, structure, data):
+        batches = data if isinstance(data, Iterator) else [data]
+
+        for batch in batches:
+            for block in iter_batch_blocks(batch, structure, self.block_size):
+                if block:
+                    yield block
+
+    def __iter__(self):
+        # Driver sends each item as a separate data block, server appends
+        # blocks with the same name to the same table.
+        for name, structure, data in self.tables:
+            blocks = self.iter_blocks(structure, data)
+            # Empty table is created by a block without rows.
+            first = next(blocks, [])
+
+            for block in chain([first], blocks):
+                yield {'name': name, 'structure': structure, 'data': block}
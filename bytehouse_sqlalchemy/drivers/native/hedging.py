@@ -0,0 +1,182 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+from bytehouse_driver.errors import Error as DriverError
+
+from . import metrics
+
+# Interval of progress packets of hedged queries, microseconds. Cancel is
+# sent before the next packet is received, so the losing query is stopped
+# this fast.
+HEDGE_INTERACTIVE_DELAY = 10000
+
+
+def get_hedge_host(url, current):
+    """
+    Returns host of the URL for hedged queries: the one after ``current``
+    host name used by the connection among the URL host and ``alt_hosts``.
+    None if URL has no hosts.
+    """
+    parts = urlsplit(url)
+    hosts = [parts.netloc.rpartition('@')[2]]
+    for name, value in parse_qsl(parts.query):
+        if name == 'alt_hosts':
+            hosts.extend(value.split(','))
+
+    hosts = [host for host in hosts if host]
+    if not hosts:
+        return None
+
+    names = [host.rsplit(':', 1)[0] for host in hosts]
+    if current in names:
+        return hosts[(names.index(current) + 1) % len(hosts)]
+
+    return hosts[0]
+
+
+def get_hedge_query_id(query_id):
+    """
+    Returns id of the second query. The server rejects the same id while
+    the first query runs, and the losing query is told apart by it.
+    """
+    if query_id is None:
+        return None
+    return query_id + '-hedge'
+
+
+class Hedge(object):
+    """
+    Sends the query to another host if it isn't answered within ``delay``
+    seconds. First response is taken, the other query is cancelled.
+
+    :param transport: transport of the query.
+    :param hedge_transport: transport connected to another host.
+    :param delay: seconds to wait before sending the second query.
+    :param execute: callable taking transport and sending the query to it.
+    """
+
+    def __init__(self, transport, hedge_transport, delay, execute):
+        self.transport = transport
+        self.hedge_transport = hedge_transport
+        self.delay = delay
+        self.execute = execute
+
+        self.response = None
+        self.started = False
+        self.hedge_won = None
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run_hedge)
+        self._thread.daemon = True
+
+        super(Hedge, self).__init__()
+
+    def run(self):
+        """
+        Sends the query and returns ``(response, hedged)`` pair. ``hedged``
+        is true when response is taken from the second host.
+        """
+        self._thread.start()
+
+        try:
+            response = self.execute(self.transport)
+        except DriverError:
+            # Host failure, the second query may still succeed.
+            if self._wait_hedge():
+                return self.response, True
+            raise
+
+        with self._lock:
+            if self.hedge_won is None and self.transport.cancelled is None:
+                self.hedge_won = False
+
+        if self.hedge_won:
+            return self.response, True
+
+        if self.hedge_won is None:
+            # Query is cancelled by user or deadline, same goes for the
+            # second one.
+            self.hedge_won = False
+            self.hedge_transport.request_cancel()
+
+        self.stop()
+        return response, False
+
+    def stop(self):
+        """
+        Cancels the second query if it's running.
+        """
+        self._done.set()
+        with self._lock:
+            if self.started and not self.hedge_won:
+                self.hedge_transport.request_cancel()
+
+    def join(self):
+        self.stop()
+        if self._thread.ident is not None:
+            self._thread.join()
+
+    def _wait_hedge(self):
+        self._done.set()
+        with self._lock:
+            if not self.started:
+                self.hedge_won = False
+                return False
+
+        self._thread.join()
+        return bool(self.hedge_won)
+
+    def _run_hedge(self):
+        if self._done.wait(self.delay):
+            return
+
+        with self._lock:
+            if self.hedge_won is not None:
+                return
+
+            self.hedge_transport.start_query(self.transport.deadline)
+            self.started = True
+
+        metrics.hedged_queries.inc()
+        try:
+            response = self.execute(self.hedge_transport)
+        except DriverError:
+            return
+
+        with self._lock:
+            if self.hedge_won is not None or \
+                    self.hedge_transport.cancelled is not None:
+                return
+
+            self.response = response
+            self.hedge_won = True
+            # Under the lock, so cancel can't reach the next query.
+            self.transport.request_cancel()
+
+        metrics.hedged_wins.inc()
@@ -0,0 +1,271 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from bisect import bisect_left
+
+# Same as default buckets of Prometheus clients.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+statement_kinds = {
+    'select': 'select', 'with': 'select', 'insert': 'insert',
+    'create': 'ddl', 'alter': 'ddl', 'drop': 'ddl', 'rename': 'ddl',
+    'truncate': 'ddl', 'show': 'show', 'describe': 'show', 'desc': 'show',
+    'exists': 'show', 'optimize': 'other', 'set': 'other', 'use': 'other'
+}
+
+
+def statement_kind(statement):
+    """
+    Returns kind of SQL statement by its first keyword: ``select``,
+    ``insert``, ``ddl``, ``show`` or ``other``.
+    """
+    words = statement[:16].split(None, 1)
+    if not words:
+        return 'other'
+    return statement_kinds.get(words[0].lower(), 'other')
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ''
+
+    return '{%s}' % ','.join(
+        '%s="%s"' % (
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for name, value in pairs
+    )
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value)
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+        super(Metric, self).__init__()
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def expose(self):
+        """
+        Returns metric in Prometheus text exposition format.
+        """
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} {}'.format(self.name, self.type)
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._expose_samples(items))
+
+        return '\n'.join(lines)
+
+    def _expose_samples(self, items):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def _expose_samples(self, items):
+        for labels, value in items:
+            yield '{}{} {}'.format(
+                self.name, _format_labels(self.labelnames, labels),
+                _format_value(value)
+            )
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super(Histogram, self).__init__(name, documentation, labelnames)
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per bucket counts, the last one is +Inf, then sum.
+                state = self._values[labels] = [0] * (len(self.buckets) + 1)
+                state.append(0.0)
+
+            state[index] += 1
+            state[-1] += value
+
+    def get_count(self, labels=()):
+        state = self._values.get(labels)
+        return sum(state[:-1]) if state else 0
+
+    def get_sum(self, labels=()):
+        state = self._values.get(labels)
+        return state[-1] if state else 0.0
+
+    def _expose_samples(self, items):
+        bounds = self.buckets + (float('inf'), )
+
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                yield '{}_bucket{} {}'.format(
+                    self.name,
+                    _format_labels(
+                        self.labelnames, labels,
+                        extra=[('le', _format_value(bound))]
+                    ),
+                    cumulative
+                )
+
+            suffix = _format_labels(self.labelnames, labels)
+            yield '{}_sum{} {}'.format(
+                self.name, suffix, _format_value(state[-1])
+            )
+            yield '{}_count{} {}'.format(self.name, suffix, cumulative)
+
+
+class MetricsRegistry(object):
+    """
+    Collection of metrics exposed together.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        super(MetricsRegistry, self).__init__()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets=buckets)
+        )
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+    def expose(self):
+        return ''.join(metric.expose() + '\n' for metric in self.metrics)
+
+
+registry = MetricsRegistry()
+
+queries = registry.counter(
+    'bytehouse_queries_total', 'Queries executed.', ('kind', )
+)
+query_errors = registry.counter(
+    'bytehouse_query_errors_total', 'Queries failed.', ('kind', )
+)
+query_duration = registry.histogram(
+    'bytehouse_query_duration_seconds',
+    'Time of query execution till its result is received.', ('kind', )
+)
+rows_fetched = registry.counter(
+    'bytehouse_fetched_rows_total', 'Rows received in query results.'
+)
+rows_shared = registry.counter(
+    'bytehouse_shared_rows_total',
+    'Rows taken from result cache or identical query in flight.'
+)
+read_rows = registry.counter(
+    'bytehouse_read_rows_total', 'Rows read by the server.'
+)
+read_bytes = registry.counter(
+    'bytehouse_read_bytes_total', 'Bytes read by the server.'
+)
+insert_rows = registry.counter(
+    'bytehouse_insert_rows_total', 'Rows sent by INSERT queries.'
+)
+pool_checkout_wait = registry.histogram(
+    'bytehouse_pool_checkout_wait_seconds',
+    'Time of connection checkout from the pool including connecting.',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+compile_cache = registry.counter(
+    'bytehouse_compile_cache_total',
+    'Statement compilations by SQLAlchemy compiled cache result.',
+    ('result', )
+)
+
+result_cache = registry.counter(
+    'bytehouse_result_cache_total', 'Result cache lookups.', ('result', )
+)
+
+coalesced_queries = registry.counter(
+    'bytehouse_coalesced_queries_total',
+    'Queries answered by identical query in flight.'
+)
+
+hedged_queries = registry.counter(
+    'bytehouse_hedged_queries_total', 'Queries sent to another host.'
+)
+hedged_wins = registry.counter(
+    'bytehouse_hedged_wins_total',
+    'Queries answered by another host first.'
+)
+
+
+def snapshot():
+    """
+    Returns all metrics of the process in Prometheus text exposition
+    format, e.g. to be served on ``/metrics`` endpoint.
+    """
+    return registry.expose()
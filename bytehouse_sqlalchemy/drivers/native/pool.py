@@ -0,0 +1,273 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import threading
+from time import perf_counter
+
+from sqlalchemy import pool as sa_pool
+from sqlalchemy.pool import Pool
+
+from . import metrics
+from .balancing import HostStats, get_policy
+
+_local = threading.local()
+
+
+def get_connect_host():
+    """
+    Returns host the connection being created in this thread is pinned to
+    by :class:`HostPool` or None.
+    """
+    return getattr(_local, 'host', None)
+
+
+def prewarm(pool, size):
+    """
+    Opens ``size`` connections and leaves them idle in ``pool``, so first
+    queries don't pay for connection setup. Only up to the pool size
+    connections are kept.
+    """
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(pool.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+class QueuePool(sa_pool.QueuePool):
+    """
+    :class:`~sqlalchemy.pool.QueuePool` which records time of waiting for
+    a connection in ``bytehouse_pool_checkout_wait_seconds`` metric.
+    """
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super(QueuePool, self)._do_get()
+        finally:
+            metrics.pool_checkout_wait.observe(perf_counter() - start)
+
+
+class AsyncQueuePool(QueuePool, sa_pool.AsyncAdaptedQueuePool):
+    """
+    :class:`QueuePool` for asyncio engines.
+    """
+
+
+class HostQueuePool(QueuePool):
+    """
+    :class:`~sqlalchemy.pool.QueuePool` which makes all its connections to
+    the same host. Connection failures are recorded in host ``stats``.
+    """
+
+    def __init__(self, creator, host=None, stats=None, **kw):
+        self.host = host
+        self.stats = stats or HostStats(host)
+        super(HostQueuePool, self).__init__(creator, **kw)
+
+    def _should_wrap_creator(self, creator):
+        invoke_creator = super(HostQueuePool, self)._should_wrap_creator(
+            creator
+        )
+
+        def connect_host(connection_record):
+            _local.host = self.host
+            try:
+                connection = invoke_creator(connection_record)
+            except Exception:
+                self.stats.record_failure()
+                raise
+            finally:
+                _local.host = None
+
+            # Cursors record query latency and network errors.
+            connection.stats = self.stats
+            return connection
+
+        return connect_host
+
+
+class AsyncHostQueuePool(HostQueuePool, sa_pool.AsyncAdaptedQueuePool):
+    """
+    :class:`HostQueuePool` for asyncio engines.
+    """
+
+
+class HostPool(Pool):
+    """
+    Pool keeping separate :class:`HostQueuePool` for each host of the URL:
+    the main one and ``alt_hosts``.
+
+    Host of each checkout is chosen by load balancing ``policy``, see
+    :mod:`.balancing`: ``round_robin`` (default) takes the hosts in turn,
+    preferring hosts with idle connections, ``least_outstanding`` takes
+    host with the fewest queries in flight, ``ewma`` the one with the
+    lowest average latency. Hosts failing repeatedly are ejected for a
+    while. Size limits apply to each host. When connection is found broken
+    only connections to the same host are recycled.
+
+    Enabled with ``host_pools=true`` or ``load_balancing`` URL parameter
+    or passed to :func:`~sqlalchemy.create_engine` as ``poolclass``.
+    """
+
+    host_pool_cls = HostQueuePool
+
+    def __init__(self, creator, hosts=None, pool_size=5, max_overflow=10,
+                 timeout=30.0, use_lifo=False, policy=None, **kw):
+        super(HostPool, self).__init__(creator, **kw)
+
+        self._hosts = hosts
+        self._policy = policy
+        self._pool_kw = {
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'timeout': timeout,
+            'use_lifo': use_lifo
+        }
+        self._pools = None
+        self._pools_lock = threading.Lock()
+
+    @property
+    def pools(self):
+        """
+        Host pools by host. Pools are created on first checkout.
+        """
+        if self._pools is None:
+            with self._pools_lock:
+                if self._pools is None:
+                    hosts = self._hosts or \
+                        getattr(self._dialect, 'hosts', None) or [None]
+                    self.policy = get_policy(
+                        self._policy or
+                        getattr(self._dialect, 'load_balancing', None)
+                    )
+                    self._pools = {
+                        host: self._create_host_pool(host) for host in hosts
+                    }
+
+        return self._pools
+
+    def host_stats(self):
+        """
+        Returns statistics of hosts by host: number of checked out
+        connections (``outstanding``), successful ``queries``, network
+        ``errors``, average query ``latency`` in seconds and whether the
+        host is ``ejected``.
+        """
+        rv = {}
+        for host, pool in self.pools.items():
+            rv[host] = dict(
+                pool.stats.as_dict(), outstanding=pool.checkedout()
+            )
+
+        return rv
+
+    def _create_host_pool(self, host):
+        pool = self.host_pool_cls(
+            self._creator, host=host,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            dialect=self._dialect,
+            **self._pool_kw
+        )
+        # Connection events are dispatched by host pools. Share listeners,
+        # so ones added to the engine pool later are called too.
+        pool.dispatch = self.dispatch
+        return pool
+
+    def _do_get(self):
+        pools = list(self.pools.values())
+        # All hosts are tried if all of them are ejected.
+        available = [pool for pool in pools if not pool.stats.ejected]
+
+        return self.policy.choose(available or pools)._do_get()
+
+    def _invalidate(self, connection, exception=None, _checkin=True):
+        dbapi_connection = getattr(connection, 'dbapi_connection', None)
+        host = getattr(dbapi_connection, 'host', None)
+        pool = self.pools.get(host)
+
+        if pool is None:
+            for pool in self.pools.values():
+                pool._invalidate(connection, exception, _checkin=False)
+            if _checkin and getattr(connection, 'is_valid', False):
+                connection.invalidate(exception)
+        else:
+            pool.stats.record_failure()
+            pool._invalidate(connection, exception, _checkin=_checkin)
+
+    def recreate(self):
+        self.logger.info('Pool recreating')
+        return self.__class__(
+            self._creator,
+            hosts=self._hosts,
+            policy=self._policy,
+            pre_ping=self._pre_ping,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+            **self._pool_kw
+        )
+
+    def dispose(self):
+        if self._pools is not None:
+            for pool in self._pools.values():
+                pool.dispose()
+
+        self.logger.info('Pool disposed. %s', self.status())
+
+    def status(self):
+        if self._pools is None:
+            return 'No connections'
+
+        return '; '.join(
+            '%s: %s' % (host, pool.status())
+            for host, pool in self._pools.items()
+        )
+
+    def size(self):
+        return sum(pool.size() for pool in self.pools.values())
+
+    def checkedin(self):
+        return sum(pool.checkedin() for pool in self.pools.values())
+
+    def checkedout(self):
+        return sum(pool.checkedout() for pool in self.pools.values())
+
+
+class AsyncHostPool(HostPool):
+    """
+    :class:`HostPool` for asyncio engines.
+    """
+    _is_asyncio = True
+    host_pool_cls = AsyncHostQueuePool
@@ -0,0 +1,138 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from ...exceptions import QueryCancelledException
+from . import metrics
+
+
+class BlockStream(object):
+    """
+    Iterates over data blocks of a streamed result as they are received
+    from the server. Blocks without rows are skipped.
+    """
+
+    def __init__(self, transport, packets):
+        self._transport = transport
+        self._packets = packets
+        self._pending = None
+        self.columns_with_types = []
+        self.finished = False
+        # Time of receiving blocks is added to it, see ext.timing.
+        self.timing = None
+
+        super(BlockStream, self).__init__()
+
+    def read_header(self):
+        """
+        Receives packets up to the first block to learn result structure.
+        """
+        for packet in self._packets:
+            block = getattr(packet, 'block', None)
+            if block is None:
+                continue
+
+            self.columns_with_types = block.columns_with_types
+            if block.num_rows:
+                self._pending = block
+            break
+
+        else:
+            self.finished = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.timing is not None:
+            return self.timing.timed(self._next_block)()
+        return self._next_block()
+
+    def _next_block(self):
+        if self._pending is not None:
+            block, self._pending = self._pending, None
+            metrics.rows_fetched.inc(block.num_rows)
+            return block
+
+        for packet in self._packets:
+            block = getattr(packet, 'block', None)
+            if block is not None and block.num_rows:
+                metrics.rows_fetched.inc(block.num_rows)
+                return block
+
+        self.finished = True
+        cancelled = self._transport.cancelled
+        if cancelled is not None:
+            raise QueryCancelledException(cancelled)
+
+        raise StopIteration
+
+    def cancel(self):
+        """
+        Cancels the query on the server if the result is not read till the
+        end. Packets sent before the server stops the query are skipped,
+        so the connection can be used for the next query.
+        """
+        connection = self._transport.connection
+        if self.finished or not connection.is_query_executing:
+            self.finished = True
+            return
+
+        self.finished = True
+        self._pending = None
+        try:
+            connection.send_cancel()
+            for _ in self._packets:
+                pass
+
+        except Exception:
+            # Driver closes the connection on errors, it is established
+            # again on the next query.
+            self._transport.disconnect()
+
+
+def execute_blocks(transport, query, params=None, with_column_types=True,
+                   external_tables=None, query_id=None, settings=None,
+                   types_check=False):
+    """
+    Executes SELECT query and returns :class:`BlockStream` over its result.
+    Same as driver's ``execute_iter`` but yields whole blocks instead of
+    rows. Result structure is available right after the call.
+    """
+    with transport.disconnect_on_error(query, settings):
+        if params is not None:
+            query = transport.substitute_params(
+                query, params, transport.connection.context
+            )
+
+        connection = transport.connection
+        connection.send_query(query, query_id=query_id)
+        connection.send_external_tables(
+            external_tables, types_check=types_check
+        )
+
+        rv = BlockStream(transport, transport.packet_generator())
+        rv.read_header()
+        return rv
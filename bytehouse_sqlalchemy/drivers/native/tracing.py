@@ -0,0 +1,130 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from contextlib import contextmanager
+from time import time
+
+
+def import_opentelemetry():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise RuntimeError('Extras for opentelemetry must be installed')
+
+    return trace
+
+
+class Span(object):
+    """
+    Finished or running span of :class:`Tracer`.
+    """
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_time = time()
+        self.end_time = None
+        self.exception = None
+
+        super(Span, self).__init__()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exception):
+        self.exception = exception
+
+
+class InMemorySpanExporter(object):
+    """
+    Keeps finished spans in memory, e.g. to check them in tests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+        super(InMemorySpanExporter, self).__init__()
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def get_finished_spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans = []
+
+
+class Tracer(object):
+    """
+    Minimal tracer passing finished :class:`Span` objects to ``exporter``.
+
+    Any object with ``start_span(name, attributes)`` method returning
+    context manager of a span with ``set_attribute(key, value)`` method can
+    be used as ``tracer`` execution option, see :class:`OpenTelemetryTracer`.
+    """
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+        super(Tracer, self).__init__()
+
+    @contextmanager
+    def start_span(self, name, attributes=None):
+        span = Span(name, attributes)
+        try:
+            yield span
+
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+
+        finally:
+            span.end_time = time()
+            self.exporter.export(span)
+
+
+class OpenTelemetryTracer(object):
+    """
+    Creates query spans with OpenTelemetry API as children of the current
+    span (requires ``opentelemetry-api``).
+
+    :param tracer: OpenTelemetry tracer. Tracer of the global tracer
+                   provider is used by default.
+    """
+
+    def __init__(self, tracer=None):
+        trace = import_opentelemetry()
+        self._span_kind = trace.SpanKind.CLIENT
+        self.tracer = tracer or trace.get_tracer('bytehouse_sqlalchemy')
+        super(OpenTelemetryTracer, self).__init__()
+
+    def start_span(self, name, attributes=None):
+        return self.tracer.start_as_current_span(
+            name, kind=self._span_kind, attributes=attributes
+        )
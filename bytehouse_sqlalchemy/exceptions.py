@@ -32,3 +32,9 @@ class DatabaseException(Exception):
 
     def __str__(self):
         return 'Orig exception: {}'.format(self.orig)
+
+
+class QueryCancelledException(DatabaseException):
+    """
+    Query was cancelled by :meth:`Cursor.cancel` or its deadline passed.
+    """
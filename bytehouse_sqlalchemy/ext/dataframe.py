@@ -0,0 +1,259 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from sqlalchemy.engine import Engine
+
+from ..drivers.native.columnar import (
+    column_to_numpy, get_numpy_dtype, unwrap_type
+)
+
+datetime64_scales = {'s': 0, 'ms': 3, 'us': 6, 'ns': 9}
+
+
+def import_pandas():
+    try:
+        import pandas
+    except ImportError:
+        raise RuntimeError('Extras for pandas must be installed')
+
+    return pandas
+
+
+def column_to_series(values, spec):
+    """
+    Converts column values of the given server type to pandas Series.
+
+    * ``LowCardinality`` columns become categoricals.
+    * Nullable integers use pandas nullable integer dtypes.
+    * Dates, ``DateTime`` and ``DateTime64`` become datetime64 series,
+      timezone-aware ones keep their timezone.
+    * ``Decimal`` values are kept as :class:`decimal.Decimal` objects.
+    """
+    pandas = import_pandas()
+    dtype, nullable = get_numpy_dtype(spec)
+    inner, _ = unwrap_type(spec)
+
+    outer = spec[9:-1] if spec.startswith('Nullable(') else spec
+    if outer.startswith('LowCardinality('):
+        return pandas.Series(pandas.Categorical(values))
+
+    if inner.startswith('Date'):
+        if dtype is object or nullable:
+            return pandas.Series(pandas.to_datetime(list(values)))
+        return pandas.Series(column_to_numpy(values, spec))
+
+    if dtype is object:
+        return pandas.Series(column_to_numpy(values, spec), dtype=object)
+
+    if nullable:
+        if dtype.startswith(('int', 'uint')):
+            dtype = dtype.capitalize().replace('Uint', 'UInt')
+        return pandas.Series(pandas.array(list(values), dtype=dtype))
+
+    return pandas.Series(column_to_numpy(values, spec), copy=False)
+
+
+def series_to_column(series, spec):
+    """
+    Converts pandas Series to column values accepted by the driver for the
+    given server type. Missing values of nullable columns become ``None``.
+    """
+    pandas = import_pandas()
+    inner, nullable = unwrap_type(spec)
+
+    if isinstance(series.dtype, pandas.CategoricalDtype):
+        series = series.astype(object)
+
+    if series.dtype.kind == 'M' and series.dt.tz is not None and \
+            inner.startswith('DateTime'):
+        # Raw timestamps skip per-value timezone conversion in the driver.
+        precision = 0
+        if inner.startswith('DateTime64('):
+            precision = int(inner[11:-1].split(',')[0])
+
+        values = series.array
+        # Resolution is always nanoseconds before pandas 2.0.
+        scale = datetime64_scales[getattr(values, 'unit', 'ns')]
+        if precision >= scale:
+            ticks = values.asi8 * 10 ** (precision - scale)
+        else:
+            ticks = values.asi8 // 10 ** (scale - precision)
+        column = ticks.tolist()
+
+    elif series.dtype.kind == 'M':
+        column = series.astype(object).tolist()
+
+    else:
+        column = series.tolist()
+
+    if nullable:
+        mask = series.isna()
+        if mask.any():
+            column = [
+                None if is_null else x
+                for x, is_null in zip(column, mask.tolist())
+            ]
+
+    return column
+
+
+def _get_column_types(connection, table_name, schema=None):
+    dialect = connection.dialect
+    quote = dialect._quote_table_name
+
+    if schema:
+        qualified_name = quote(schema) + '.' + quote(table_name)
+    else:
+        qualified_name = quote(table_name)
+
+    query = 'DESCRIBE TABLE {}'.format(qualified_name)
+    return {r.Name: r.Type for r in dialect._execute(connection, query)}
+
+
+def _insert_query(connection, table_name, schema, keys):
+    preparer = connection.dialect.identifier_preparer
+
+    table = preparer.quote(table_name)
+    if schema:
+        table = preparer.quote_schema(schema) + '.' + table
+
+    return 'INSERT INTO {} ({}) VALUES'.format(
+        table, ', '.join(preparer.quote(key) for key in keys)
+    )
+
+
+def insert_frame_columns(connection, table_name, frame, schema=None):
+    """
+    Inserts DataFrame into existing table column by column.
+
+    :param connection: SQLAlchemy connection.
+    :param table_name: target table name.
+    :param frame: pandas DataFrame. Frame columns are matched with table
+                  columns by name.
+    :param schema: target database. Defaults to connection's one.
+    :return: number of inserted rows.
+    """
+    keys = [str(x) for x in frame.columns]
+    return _insert_frame(connection, table_name, schema, frame, keys)
+
+
+def _insert_frame(connection, table_name, schema, frame, keys):
+    types = _get_column_types(connection, table_name, schema=schema)
+
+    missing = [key for key in keys if key not in types]
+    if missing:
+        raise ValueError(
+            'Table {} has no columns: {}'.format(table_name, missing)
+        )
+
+    columns = [
+        series_to_column(frame.iloc[:, i], types[key])
+        for i, key in enumerate(keys)
+    ]
+
+    query = _insert_query(connection, table_name, schema, keys)
+    return _insert_columns(connection, query, columns)
+
+
+def _insert_columns(connection, query, columns):
+    cursor = connection.connection.cursor()
+    try:
+        cursor.insert_columns(query, columns)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def insert_frame(pd_table, connection, keys, data_iter):
+    """
+    ``method`` callable for :meth:`pandas.DataFrame.to_sql`::
+
+        df.to_sql('t', engine, if_exists='append', index=False,
+                  method=insert_frame)
+
+    Row tuples built by pandas are not used: the whole frame is converted
+    to typed columns like :func:`insert_frame_columns` does and sent on the
+    first call, later chunks are skipped. ``chunksize`` is therefore
+    ignored, the driver splits columns into blocks of ``insert_block_size``
+    rows.
+    """
+    if getattr(pd_table, '_bytehouse_inserted', False):
+        return 0
+    pd_table._bytehouse_inserted = True
+
+    frame = pd_table.frame
+    if pd_table.index is not None:
+        frame = frame.copy(deep=False)
+        frame.index.names = pd_table.index
+        frame = frame.reset_index()
+
+    return _insert_frame(
+        connection, pd_table.name, pd_table.schema, frame, keys
+    )
+
+
+def read_frame(selectable, bind, params=None, index_col=None):
+    """
+    Executes SELECT and returns its result as pandas DataFrame.
+
+    Result is received from the server in column-oriented form and converted
+    to typed columns without building row tuples, see
+    :func:`column_to_series` for type mapping.
+
+    :param selectable: SELECT statement or query string.
+    :param bind: SQLAlchemy engine or connection.
+    :param params: query parameters.
+    :param index_col: column name or list of names to set as index.
+    """
+    pandas = import_pandas()
+
+    if isinstance(bind, Engine):
+        with bind.connect() as connection:
+            return read_frame(
+                selectable, connection, params=params, index_col=index_col
+            )
+
+    result = bind.execution_options(columnar=True).execute(
+        selectable, params or {}
+    )
+    try:
+        cursor = result.cursor
+        names = [x[0] for x in cursor.description]
+        types = [x[1] for x in cursor.description]
+        columns = cursor.fetch_columns()
+    finally:
+        result.close()
+
+    frame = pandas.DataFrame({
+        i: column_to_series(column, type_)
+        for i, (column, type_) in enumerate(zip(columns, types))
+    })
+    frame.columns = names
+
+    if index_col is not None:
+        frame = frame.set_index(index_col)
+
+    return frame
@@ -0,0 +1,166 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from bytehouse_driver.defines import DEFAULT_INSERT_BLOCK_SIZE
+
+
+class BlockResult(object):
+    """
+    Outcome of inserting one block.
+
+    :ivar index: block number.
+    :ivar offset: position of the first row of the block in data.
+    :ivar rows: number of rows in the block.
+    :ivar rowcount: number of rows written as reported by the driver, 0 if
+                    the block failed.
+    :ivar error: exception raised while inserting the block or None.
+    """
+
+    def __init__(self, index, offset, rows, rowcount=0, error=None):
+        self.index = index
+        self.offset = offset
+        self.rows = rows
+        self.rowcount = rowcount
+        self.error = error
+        super(BlockResult, self).__init__()
+
+    def __repr__(self):
+        return (
+            '<BlockResult index={} offset={} rows={} rowcount={} '
+            'error={!r}>'.format(
+                self.index, self.offset, self.rows, self.rowcount, self.error
+            )
+        )
+
+
+class InsertResult(object):
+    """
+    Outcome of :func:`parallel_insert`, block results in data order.
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        super(InsertResult, self).__init__()
+
+    @property
+    def rows_written(self):
+        return sum(
+            block.rowcount for block in self.blocks if block.error is None
+        )
+
+    @property
+    def errors(self):
+        return [block for block in self.blocks if block.error is not None]
+
+    def raise_for_errors(self):
+        """
+        Raises error of the first failed block if any.
+        """
+        errors = self.errors
+        if errors:
+            raise errors[0].error
+
+
+def _data_size(data):
+    if isinstance(data, dict):
+        sizes = {len(column) for column in data.values()}
+        if len(sizes) > 1:
+            raise ValueError('Columns have different lengths')
+        return sizes.pop() if sizes else 0
+
+    return len(data)
+
+
+def _data_slice(data, start, stop):
+    if isinstance(data, dict):
+        return {key: column[start:stop] for key, column in data.items()}
+
+    return data[start:stop]
+
+
+def parallel_insert(engine, table, data, block_size=None, max_workers=None,
+                    settings=None):
+    """
+    Splits INSERT into blocks and sends them concurrently, each block over
+    its own pooled connection.
+
+    Blocks are independent INSERT queries: if some of them fail, the rest
+    are still written. Check :attr:`InsertResult.errors` or call
+    :meth:`InsertResult.raise_for_errors`.
+
+    :param engine: engine to take connections from.
+    :param table: target table.
+    :param data: list of row dicts, or dict of column sequences or NumPy
+                 arrays to insert them column by column.
+    :param block_size: rows per block. ``max_insert_block_size`` setting
+                       if given, 1048576 by default. It is also sent as
+                       ``max_insert_block_size``, so that each query forms
+                       one block on server.
+    :param max_workers: number of concurrent inserts. Defaults to
+                        the engine pool size.
+    :param settings: additional query settings.
+    :return: :class:`InsertResult`.
+    """
+    settings = dict(settings or {})
+    if block_size is None:
+        block_size = int(
+            settings.get('max_insert_block_size', DEFAULT_INSERT_BLOCK_SIZE)
+        )
+    settings['max_insert_block_size'] = block_size
+
+    if max_workers is None:
+        # QueuePool.size() is a method, SingletonThreadPool.size is a number.
+        size = getattr(engine.pool, 'size', None)
+        if callable(size):
+            size = size()
+        max_workers = size or 1
+
+    stmt = table.insert().execution_options(
+        settings=settings, insert_columns=isinstance(data, dict)
+    )
+
+    def insert_block(index, offset):
+        block = _data_slice(data, offset, offset + block_size)
+        rows = _data_size(block)
+        try:
+            with engine.connect() as connection:
+                rowcount = connection.execute(stmt, block).rowcount
+        except Exception as e:
+            return BlockResult(index, offset, rows, error=e)
+
+        return BlockResult(index, offset, rows, rowcount=rowcount)
+
+    offsets = range(0, _data_size(data), block_size)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(insert_block, index, offset)
+            for index, offset in enumerate(offsets)
+        ]
+        blocks = [future.result() for future in futures]
+
+    return InsertResult(blocks)
@@ -0,0 +1,271 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import logging
+from contextlib import contextmanager
+from time import perf_counter
+
+from sqlalchemy import event
+
+try:
+    from time import thread_time
+except ImportError:
+    # Python 3.6.
+    from time import process_time as thread_time
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTiming(object):
+    """
+    Client-side time in seconds spent on phases of a query:
+
+    * ``compile`` -- statement compilation and processing of parameters.
+    * ``wire`` -- waiting for the server, i.e. query execution and network.
+    * ``decode`` -- CPU time spent on receiving and decoding of result
+      blocks.
+    * ``hydrate`` -- building objects from rows by
+      :class:`~bytehouse_sqlalchemy.orm.query.Query`.
+    """
+
+    def __init__(self, listener, compile=0.0):
+        self.listener = listener
+        self.compile = compile
+        self.wire = 0.0
+        self.decode = 0.0
+        self.hydrate = 0.0
+        self.reported = False
+
+        super(QueryTiming, self).__init__()
+
+    @property
+    def total(self):
+        return self.compile + self.wire + self.decode + self.hydrate
+
+    def timed(self, fn):
+        """
+        Wraps driver call ``fn``. Its CPU time is accounted as ``decode``,
+        the rest as ``wire``.
+        """
+        def wrapper(*args, **kwargs):
+            start, start_cpu = perf_counter(), thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                cpu = thread_time() - start_cpu
+                self.decode += cpu
+                self.wire += max(perf_counter() - start - cpu, 0.0)
+
+        return wrapper
+
+    @contextmanager
+    def hydrating(self):
+        """
+        Accounts time of the block as ``hydrate``. Result blocks streamed
+        meanwhile are already accounted as ``wire`` and ``decode`` by
+        :meth:`timed`, so their time is left out.
+        """
+        start, fetched = perf_counter(), self.wire + self.decode
+        try:
+            yield
+        finally:
+            fetched = self.wire + self.decode - fetched
+            self.hydrate += max(perf_counter() - start - fetched, 0.0)
+
+    def __repr__(self):
+        return (
+            '<QueryTiming total={:.6f} compile={:.6f} wire={:.6f} '
+            'decode={:.6f} hydrate={:.6f}>'
+        ).format(
+            self.total, self.compile, self.wire, self.decode, self.hydrate
+        )
+
+
+def log_slow_query(conn, context, timing):
+    logger.warning('Slow query %r: %s', timing, context.statement)
+
+
+class TimingListener(object):
+    """
+    Engine event listeners measuring :class:`QueryTiming` of queries.
+    """
+
+    def __init__(self, slow_query_threshold=None, on_slow_query=None):
+        self.slow_query_threshold = slow_query_threshold
+        self.on_slow_query = on_slow_query or log_slow_query
+
+        super(TimingListener, self).__init__()
+
+    def before_execute(self, conn, *args):
+        conn.info['bytehouse_execute_start'] = perf_counter()
+
+    def after_execute(self, conn, *args):
+        # Start is left when no cursor query was run. It would be taken by
+        # the next exec_driver_sql() otherwise, which has no before_execute.
+        conn.info.pop('bytehouse_execute_start', None)
+
+    def handle_error(self, exception_context):
+        # Failed statement may not reach before_cursor_execute.
+        conn = exception_context.connection
+        if conn is not None:
+            conn.info.pop('bytehouse_execute_start', None)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters,
+                              context, executemany):
+        start = conn.info.pop('bytehouse_execute_start', None)
+        compile = perf_counter() - start if start is not None else 0.0
+        context.timing = QueryTiming(self, compile=compile)
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters,
+                             context, executemany):
+        self.check(conn, context)
+
+    def check(self, conn, context):
+        """
+        Calls slow query hook once per query if its time so far exceeds
+        the threshold.
+        """
+        timing = context.timing
+        threshold = self.slow_query_threshold
+        if threshold is None or timing.reported or timing.total < threshold:
+            return
+
+        timing.reported = True
+        self.on_slow_query(conn, context, timing)
+
+    def listen(self, engine):
+        event.listen(engine, 'before_execute', self.before_execute)
+        event.listen(engine, 'after_execute', self.after_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+        event.listen(
+            engine, 'before_cursor_execute', self.before_cursor_execute
+        )
+        event.listen(
+            engine, 'after_cursor_execute', self.after_cursor_execute
+        )
+
+    def remove(self, engine):
+        event.remove(engine, 'before_execute', self.before_execute)
+        event.remove(engine, 'after_execute', self.after_execute)
+        event.remove(engine, 'handle_error', self.handle_error)
+        event.remove(
+            engine, 'before_cursor_execute', self.before_cursor_execute
+        )
+        event.remove(
+            engine, 'after_cursor_execute', self.after_cursor_execute
+        )
+
+
+def enable_timing(engine, slow_query_threshold=None, on_slow_query=None):
+    """
+    Enables timing of query phases for the engine. Timing is available as
+    ``result.context.timing``, see :class:`QueryTiming`.
+
+    :param engine: SQLAlchemy engine.
+    :param slow_query_threshold: seconds. ``on_slow_query`` is called for
+                                 queries which take longer.
+    :param on_slow_query: ``fn(conn, context, timing)``. Slow queries are
+                          logged as warnings by default.
+    :return: :class:`TimingListener`, call its ``remove(engine)`` to
+             disable timing.
+    """
+    listener = TimingListener(
+        slow_query_threshold=slow_query_threshold,
+        on_slow_query=on_slow_query
+    )
+    listener.listen(engine)
+    return listener
+
+
+def _get_context(result):
+    # ORM results keep the cursor result they are built from. Results of
+    # single entity queries are wrapped into scalar results.
+    result = getattr(result, '_real_result', None) or result
+    context = getattr(getattr(result, 'raw', None), 'context', None)
+    if getattr(context, 'timing', None) is None:
+        return None
+    return context
+
+
+def _iter_hydrate(result, context):
+    timing = context.timing
+    rows = iter(result)
+    end = object()
+    while True:
+        with timing.hydrating():
+            row = next(rows, end)
+        if row is end:
+            break
+        yield row
+
+    timing.listener.check(context.root_connection, context)
+
+
+class HydratingResult(object):
+    """
+    Proxy of ORM result, the time of iterating over it and of its fetch
+    methods is accounted as ``hydrate`` phase of the query.
+    """
+
+    fetch_methods = frozenset([
+        'all', 'first', 'one', 'one_or_none', 'scalar', 'scalar_one',
+        'scalar_one_or_none', 'fetchone', 'fetchmany', 'fetchall'
+    ])
+
+    def __init__(self, result, context):
+        self._result = result
+        self._context = context
+        super(HydratingResult, self).__init__()
+
+    def __iter__(self):
+        return _iter_hydrate(self._result, self._context)
+
+    def __getattr__(self, name):
+        attr = getattr(self._result, name)
+        if name not in self.fetch_methods:
+            return attr
+
+        def fetch(*args, **kwargs):
+            context = self._context
+            try:
+                with context.timing.hydrating():
+                    return attr(*args, **kwargs)
+            finally:
+                context.timing.listener.check(
+                    context.root_connection, context
+                )
+
+        return fetch
+
+
+def hydrating_result(result):
+    """
+    Wraps ORM result into :class:`HydratingResult` if the query is timed.
+    """
+    context = _get_context(result)
+    if context is None:
+        return result
+
+    return HydratingResult(result, context)
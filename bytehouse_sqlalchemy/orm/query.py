@@ -27,30 +27,51 @@ SOFTWARE.
 from sqlalchemy import exc
 from sqlalchemy.sql.base import _generative
 from sqlalchemy.orm.query import Query as BaseQuery
+from sqlalchemy.sql.selectable import Select as StandardSelect
 
 from ..ext.clauses import (
     ArrayJoin,
+    JoinFlags,
     LeftArrayJoin,
     LimitByClause,
     sample_clause,
 )
+from ..ext.timing import hydrating_result
+from ..sql.selectable import Select
 
 
 class Query(BaseQuery):
+    # Named as in Select, the statement of the query is made of its dict.
     _with_totals = False
-    _final = None
-    _sample = None
-    _limit_by = None
+    _final_clause = None
+    _sample_clause = None
+    _limit_by_clause = None
     _array_join = None
 
+    def _iter(self):
+        # Every way of loading rows, e.g. all(), first() or scalar(),
+        # goes through _iter().
+        return hydrating_result(super(Query, self)._iter())
+
+    def _statement_20(self, *args, **kwargs):
+        stmt = super(Query, self)._statement_20(*args, **kwargs)
+        if type(stmt) is not StandardSelect:
+            return stmt
+
+        # ClickHouse clauses are compiled and taken into cache key by
+        # ByteHouse Select only.
+        rv = Select.__new__(Select)
+        rv.__dict__.update(stmt.__dict__)
+        return rv
+
     def _compile_context(self, *args, **kwargs):
         context = super(Query, self)._compile_context(*args, **kwargs)
         query = context.query
 
         query._with_totals = self._with_totals
-        query._final_clause = self._final
-        query._sample_clause = sample_clause(self._sample)
-        query._limit_by_clause = self._limit_by
+        query._final_clause = self._final_clause
+        query._sample_clause = self._sample_clause
+        query._limit_by_clause = self._limit_by_clause
         query._array_join = self._array_join
 
         return context
@@ -80,15 +101,15 @@ class Query(BaseQuery):
 
     @_generative
     def final(self):
-        self._final = True
+        self._final_clause = True
 
     @_generative
     def sample(self, sample):
-        self._sample = sample
+        self._sample_clause = sample_clause(sample)
 
     @_generative
     def limit_by(self, by_clauses, limit, offset=None):
-        self._limit_by = LimitByClause(by_clauses, limit, offset)
+        self._limit_by_clause = LimitByClause(by_clauses, limit, offset)
 
     def join(self, *props, **kwargs):
         spec = {
@@ -97,8 +118,9 @@ class Query(BaseQuery):
             'distribution': kwargs.pop('distribution', None)
         }
         rv = super(Query, self).join(*props, **kwargs)
-        for x in rv._legacy_setup_joins:
-            x_spec = dict(spec)
+        # Flags of joins made before are already set.
+        for x in rv._legacy_setup_joins[len(self._legacy_setup_joins):]:
+            x_spec = JoinFlags(spec)
             # use 'full' key to pass extra flags
             x_spec['full'] = x[-1]['full']
             x[-1]['full'] = x_spec
@@ -34,6 +34,8 @@ from sqlalchemy.sql.selectable import Join
 
 from bytehouse_sqlalchemy.sql.selectable import Select
 
+from ..ext.clauses import JoinFlags
+
 from . import ddl
 
 
@@ -44,14 +46,30 @@ class Table(TableBase):
         bind._run_ddl_visitor(ddl.SchemaDropper, self,
                               checkfirst=checkfirst, if_exists=if_exists)
 
+    def insert_columns(self, data, bind=None):
+        """
+        Inserts data passed in column-oriented form. Columns are sent to
+        the driver without per-row parameter processing.
+
+        :param data: dict of column keys and column sequences or NumPy
+                     arrays of the same length.
+        :param bind: engine or connection.
+        :return: number of inserted rows.
+        """
+        if bind is None:
+            bind = _bind_or_error(self)
+
+        stmt = self.insert().execution_options(insert_columns=True)
+        return bind.execute(stmt, data).rowcount
+
     def join(self, right, onclause=None, isouter=False, full=False,
              type=None, strictness=None, distribution=None):
-        flags = {
+        flags = JoinFlags({
             'full': full,
             'type': type,
             'strictness': strictness,
             'distribution': distribution
-        }
+        })
         return Join(self, right, onclause=onclause, isouter=isouter,
                     full=flags)
 
@@ -25,6 +25,7 @@ SOFTWARE.
 """
 
 from sqlalchemy.sql.base import _generative
+from sqlalchemy.sql.visitors import InternalTraversal
 from sqlalchemy.sql.selectable import (
     Select as StandardSelect,
     Join
@@ -32,6 +33,7 @@ from sqlalchemy.sql.selectable import (
 
 from ..ext.clauses import (
     ArrayJoin,
+    JoinFlags,
     LeftArrayJoin,
     LimitByClause,
     sample_clause,
@@ -48,6 +50,20 @@ class Select(StandardSelect):
     _limit_by_clause = None
     _array_join = None
 
+    # ClickHouse clauses are a part of cache key, so statements differing
+    # only in them don't share compiled form.
+    inherit_cache = True
+    _traverse_internals = StandardSelect._traverse_internals + [
+        ('_with_totals', InternalTraversal.dp_boolean),
+        ('_final_clause', InternalTraversal.dp_boolean),
+        ('_sample_clause', InternalTraversal.dp_clauseelement),
+        ('_limit_by_clause', InternalTraversal.dp_clauseelement),
+        ('_array_join', InternalTraversal.dp_clauseelement),
+    ]
+    _cache_key_traversal = _traverse_internals + [
+        ('_compile_options', InternalTraversal.dp_has_cache_key)
+    ]
+
     @_generative
     def with_totals(self):
         self._with_totals = True
@@ -79,12 +95,12 @@ class Select(StandardSelect):
 
     def join(self, right, onclause=None, isouter=False, full=False, type=None,
              strictness=None, distribution=None):
-        flags = {
+        flags = JoinFlags({
             'full': full,
             'type': type,
             'strictness': strictness,
             'distribution': distribution
-        }
+        })
         return Join(self, right, onclause=onclause, isouter=isouter,
                     full=flags)
 
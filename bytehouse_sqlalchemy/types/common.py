@@ -77,6 +77,15 @@ class Nullable(ByteHouseTypeEngine):
         self.nested_type = nested_type
         super(Nullable, self).__init__()
 
+    def column_processor(self, dialect):
+        """
+        Returns ``column_processor`` of the nested type if it has one, see
+        :class:`~bytehouse_sqlalchemy.types.IPv4`.
+        """
+        nested_type = to_instance(self.nested_type)
+        get_processor = getattr(nested_type, 'column_processor', None)
+        return get_processor(dialect) if get_processor else None
+
 
 class UUID(String):
     __visit_name__ = 'uuid'
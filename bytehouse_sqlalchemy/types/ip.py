@@ -24,49 +24,214 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from ipaddress import IPv4Network, IPv6Network
+import sys
+from array import array
+from functools import partial
+from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
+from socket import AF_INET, AF_INET6, inet_pton
 
-from sqlalchemy import or_, and_, types, func
+from sqlalchemy import or_, and_, not_, types, func
 from sqlalchemy.sql.type_api import UserDefinedType
 
+from .common import String, UInt32
+
+pack_ipv4 = partial(inet_pton, AF_INET)
+pack_ipv6 = partial(inet_pton, AF_INET6)
+
+
+def ipv4_to_int(value):
+    """
+    Converts IPv4 address or its string to integer written by the driver
+    as is. Integers and None are returned unchanged.
+    """
+    if value is None or isinstance(value, int):
+        return value
+
+    if isinstance(value, str):
+        try:
+            return int.from_bytes(pack_ipv4(value), 'big')
+        except OSError:
+            # Let ipaddress report invalid value.
+            pass
+
+    return int(IPv4Address(value))
+
+
+def ipv6_to_bytes(value):
+    """
+    Converts IPv6 address or its string to 16 bytes written by the driver
+    as is. Bytes and None are returned unchanged.
+    """
+    if value is None or isinstance(value, bytes):
+        return value
+
+    if isinstance(value, str):
+        try:
+            return pack_ipv6(value)
+        except OSError:
+            pass
+
+    return IPv6Address(value).packed
+
+
+def _convert_present(convert, values):
+    """
+    Converts values other than None with ``convert``, None values of
+    nullable columns are kept in their places.
+    """
+    converted = iter(convert([x for x in values if x is not None]))
+    return [None if x is None else next(converted) for x in values]
+
+
+def ipv4_column(values):
+    """
+    Converts sequence of IPv4 values to list of integers. Strings are
+    converted in bulk, NumPy integer arrays are returned as is. None
+    values are kept.
+    """
+    if getattr(values, 'dtype', None) is not None and \
+            values.dtype.kind in 'iu':
+        return values
+
+    if None in values:
+        return _convert_present(ipv4_column, values)
+
+    try:
+        packed = array('I', b''.join(map(pack_ipv4, values)))
+    except (TypeError, OSError):
+        # Addresses, integers, None or invalid strings.
+        return [ipv4_to_int(x) for x in values]
+
+    # Addresses are packed in network byte order.
+    if sys.byteorder == 'little':
+        packed.byteswap()
+    return packed.tolist()
+
+
+def ipv6_column(values):
+    """
+    Converts sequence of IPv6 values to list of 16-byte strings. Strings
+    are converted in bulk. None values are kept.
+    """
+    if None in values:
+        return _convert_present(ipv6_column, values)
+
+    try:
+        return list(map(pack_ipv6, values))
+    except (TypeError, OSError):
+        return [ipv6_to_bytes(x) for x in values]
+
+
+def collapse_ranges(networks):
+    """
+    Merges overlapping and adjacent networks into sorted disjoint ranges.
+
+    :return: list of first and last addresses of ranges as integers.
+    """
+    bounds = sorted(
+        (int(net.network_address), int(net.broadcast_address))
+        for net in networks
+    )
+
+    ranges = []
+    for first, last in bounds:
+        if ranges and first <= ranges[-1][1] + 1:
+            if last > ranges[-1][1]:
+                ranges[-1][1] = last
+        else:
+            ranges.append([first, last])
+
+    return ranges
+
+
+def range_networks(first, last, max_prefixlen):
+    """
+    Splits range of integer addresses into the fewest networks.
+
+    :return: iterator of network addresses as integers and prefix lengths.
+    """
+    while first <= last:
+        # The largest network starting at the first address and fitting
+        # into the range.
+        bits = (first & -first).bit_length() - 1 if first else max_prefixlen
+        bits = min(bits, (last - first + 1).bit_length() - 1)
+
+        yield first, max_prefixlen - bits
+        first += 1 << bits
+
 
 class BaseIPComparator(UserDefinedType.Comparator):
     network_class = None
+    address_class = None
+    ip_function = None
+
+    # Lists collapsing into more ranges are compiled into lookups of the
+    # column network prefixes in sets instead of range comparisons. Sets
+    # are sent as external tables with ``external_in_threshold``.
+    lookup_threshold = 16
 
     def _wrap_to_ip(self, x):
+        return getattr(func, self.ip_function)(str(x))
+
+    def _network_key(self, prefixlen):
+        """
+        Returns expression of the column network with ``prefixlen`` and
+        function converting integer network address to the value of the
+        expression.
+        """
         raise NotImplementedError()
 
-    def _split_other(self, other):
+    def _split_ranges(self, ranges):
         """
-        Split values between addresses and networks
+        Split collapsed ranges between addresses and ranges of first and
+        last address.
         This allows to generate complex filters with both addresses
         and networks in the same IN
         ie in_('10.0.0.0/24', '192.168.0.1')
         """
-        addresses = []
-        networks = []
-        for sub in other:
-            sub = self.network_class(sub)
-            if sub.prefixlen == sub.max_prefixlen:
-                # this is an address
-                addresses.append(sub.network_address)
-            else:
-                networks.append(sub)
-        return addresses, networks
+        address = self.address_class
+
+        addresses = [
+            address(first) for first, last in ranges if first == last
+        ]
+        ranges = [
+            (address(first), address(last)) for first, last in ranges
+            if first != last
+        ]
+        return addresses, ranges
+
+    def _in_networks(self, ranges):
+        max_prefixlen = self.address_class(0).max_prefixlen
+        networks = {}
+        for first, last in ranges:
+            for address, prefixlen in range_networks(
+                    first, last, max_prefixlen):
+                networks.setdefault(prefixlen, []).append(address)
+
+        clauses = []
+        for prefixlen, addresses in sorted(networks.items()):
+            key, to_value = self._network_key(prefixlen)
+            clauses.append(key.in_([to_value(x) for x in addresses]))
+
+        return or_(*clauses)
 
     def in_(self, other):
         if isinstance(other, (list, tuple)):
-            addresses, networks = self._split_other(other)
+            ranges = collapse_ranges(self.network_class(x) for x in other)
+            if len(ranges) > self.lookup_threshold:
+                return self._in_networks(ranges)
+
+            addresses, ranges = self._split_ranges(ranges)
             addresses_clause = super(BaseIPComparator, self).in_(
                 self._wrap_to_ip(x) for x in addresses
             ) if addresses else None
             networks_clause = or_(*[
                 and_(
-                    self >= self._wrap_to_ip(net[0]),
-                    self <= self._wrap_to_ip(net[-1])
+                    self >= self._wrap_to_ip(first),
+                    self <= self._wrap_to_ip(last)
                 )
-                for net in networks
-            ]) if networks else None
+                for first, last in ranges
+            ]) if ranges else None
             if addresses_clause is not None and networks_clause is not None:
                 return or_(addresses_clause, networks_clause)
             elif addresses_clause is not None and networks_clause is None:
@@ -87,17 +252,21 @@ class BaseIPComparator(UserDefinedType.Comparator):
 
     def not_in(self, other):
         if isinstance(other, (list, tuple)):
-            addresses, networks = self._split_other(other)
+            ranges = collapse_ranges(self.network_class(x) for x in other)
+            if len(ranges) > self.lookup_threshold:
+                return not_(self._in_networks(ranges))
+
+            addresses, ranges = self._split_ranges(ranges)
             addresses_clause = super(BaseIPComparator, self).notin_(
                 self._wrap_to_ip(x) for x in addresses
             ) if addresses else None
             networks_clause = and_(*[
                 or_(
-                    self < self._wrap_to_ip(net[0]),
-                    self > self._wrap_to_ip(net[-1])
+                    self < self._wrap_to_ip(first),
+                    self > self._wrap_to_ip(last)
                 )
-                for net in networks
-            ]) if networks else None
+                for first, last in ranges
+            ]) if ranges else None
             if addresses_clause is not None and networks_clause is not None:
                 return and_(addresses_clause, networks_clause)
             elif addresses_clause is not None and networks_clause is None:
@@ -136,6 +305,13 @@ class IPv4(types.UserDefinedType):
 
         return process
 
+    def column_processor(self, dialect):
+        """
+        Returns function converting column of INSERT data to integers the
+        driver writes without parsing.
+        """
+        return ipv4_column
+
     def bind_expression(self, bindvalue):
         if isinstance(bindvalue.value, (list, tuple)):
             bindvalue.value = ([func.toIPv4(x) for x in bindvalue.value])
@@ -144,9 +320,16 @@ class IPv4(types.UserDefinedType):
 
     class comparator_factory(BaseIPComparator):
         network_class = IPv4Network
+        address_class = IPv4Address
+        ip_function = 'toIPv4'
+
+        def _network_key(self, prefixlen):
+            key = func.toUInt32(self.expr, type_=UInt32)
+            if prefixlen < 32:
+                mask = 0xFFFFFFFF ^ ((1 << (32 - prefixlen)) - 1)
+                key = func.bitAnd(key, mask, type_=UInt32)
 
-        def _wrap_to_ip(self, x):
-            return func.toIPv4(str(x))
+            return key, int
 
 
 class IPv6(types.UserDefinedType):
@@ -168,6 +351,13 @@ class IPv6(types.UserDefinedType):
 
         return process
 
+    def column_processor(self, dialect):
+        """
+        Returns function converting column of INSERT data to 16-byte
+        strings the driver writes without parsing.
+        """
+        return ipv6_column
+
     def bind_expression(self, bindvalue):
         if isinstance(bindvalue.value, (list, tuple)):
             bindvalue.value = ([func.toIPv6(x) for x in bindvalue.value])
@@ -176,6 +366,13 @@ class IPv6(types.UserDefinedType):
 
     class comparator_factory(BaseIPComparator):
         network_class = IPv6Network
+        address_class = IPv6Address
+        ip_function = 'toIPv6'
+
+        def _network_key(self, prefixlen):
+            # Networks are compared by bytes of the first address.
+            key = func.hex(func.tupleElement(
+                func.IPv6CIDRToRange(self.expr, prefixlen), 1
+            ), type_=String)
 
-        def _wrap_to_ip(self, x):
-            return func.toIPv6(str(x))
+            return key, '{:032X}'.format
@@ -56,7 +56,8 @@ dialects = [
 
     for driver, d_path in [
         ('', 'native.base:ByteHouseDialect_native'),
-        ('.native', 'native.base:ByteHouseDialect_native')
+        ('.native', 'native.base:ByteHouseDialect_native'),
+        ('.asyncnative', 'asyncnative.base:ByteHouseDialect_asyncnative')
     ]
 ]
 
@@ -123,6 +124,13 @@ setup(
         'sqlalchemy>=1.4,<1.5',
         'requests'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+        'pandas': ['numpy', 'pandas'],
+        'arrow': ['pyarrow'],
+        'asyncio': ['greenlet'],
+        'opentelemetry': ['opentelemetry-api'],
+    },
     # Registering `bytehouse` as dialect.
     entry_points={
         'sqlalchemy.dialects': dialects
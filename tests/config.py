@@ -33,6 +33,10 @@ from tests import log
 registry.register(
     "bytehouse", "bytehouse_sqlalchemy.drivers.native.base", "dialect"
 )
+registry.register(
+    "bytehouse.asyncnative", "bytehouse_sqlalchemy.drivers.asyncnative.base",
+    "dialect"
+)
 
 file_config = configparser.ConfigParser()
 file_config.read(['setup.cfg'])
@@ -54,3 +58,7 @@ native_uri = uri_template.format(
 system_native_uri = uri_template.format(
     schema='bytehouse', user=user, password=password, region=region,
     account=account, database=database)
+
+asyncnative_uri = uri_template.format(
+    schema='bytehouse+asyncnative', user=user, password=password,
+    region=region, account=account, database=database)
@@ -0,0 +1,105 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from bytehouse_sqlalchemy.drivers.asyncnative.connector import (
+    Connection, SharedExecutor
+)
+
+
+class BlockingCursor(object):
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.finished = False
+
+    def execute(self, operation, parameters=None, context=None):
+        # Like driver reading packets till the server stops the query.
+        self.cancelled.wait(5)
+        time.sleep(0.1)
+        self.finished = True
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class BlockingConnection(object):
+    def __init__(self):
+        self.raw_cursor = BlockingCursor()
+
+    def cursor(self):
+        return self.raw_cursor
+
+
+class CancelTestCase(TestCase):
+    def test_cancel_waits_for_worker(self):
+        raw = BlockingConnection()
+        executor = ThreadPoolExecutor(max_workers=1)
+        connection = Connection(raw, executor)
+        cursor = connection.cursor()
+
+        async def execute():
+            try:
+                await asyncio.wait_for(
+                    greenlet_spawn(cursor.execute, 'SELECT 1'), 0.05
+                )
+            except asyncio.TimeoutError:
+                # Connection is not given back while the worker uses it.
+                return raw.raw_cursor.finished
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertTrue(loop.run_until_complete(execute()))
+        finally:
+            loop.close()
+            executor.shutdown()
+
+        self.assertTrue(raw.raw_cursor.cancelled.is_set())
+
+
+class SharedExecutorTestCase(TestCase):
+    def test_shutdown_with_last_connection(self):
+        shared = SharedExecutor(max_workers=1)
+
+        executor = shared.acquire()
+        self.assertIs(shared.acquire(), executor)
+
+        shared.release()
+        self.assertEqual(executor.submit(lambda: 1).result(), 1)
+
+        shared.release()
+        self.assertIsNone(shared.executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(lambda: 1)
+
+        self.assertIsNot(shared.acquire(), executor)
+        shared.release()
@@ -0,0 +1,77 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from tests.config import asyncnative_uri
+from tests.testcase import BaseTestCase
+
+
+class AsyncSelectTestCase(BaseTestCase):
+    def setUp(self):
+        super(AsyncSelectTestCase, self).setUp()
+        self.engine = create_async_engine(asyncnative_uri)
+
+    def tearDown(self):
+        self.run_async(self.engine.dispose())
+        super(AsyncSelectTestCase, self).tearDown()
+
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def test_execute(self):
+        async def execute():
+            async with self.engine.connect() as connection:
+                result = await connection.execute(
+                    text('SELECT number FROM system.numbers LIMIT 3')
+                )
+                return result.fetchall()
+
+        self.assertEqual(self.run_async(execute()), [(0, ), (1, ), (2, )])
+
+    def test_concurrent_execute(self):
+        async def execute(i):
+            async with self.engine.connect() as connection:
+                return await connection.scalar(text('SELECT %d' % i))
+
+        rv = self.run_async(asyncio.gather(*[execute(i) for i in range(4)]))
+        self.assertEqual(rv, [0, 1, 2, 3])
+
+    def test_stream_blocks(self):
+        async def stream():
+            async with self.engine.connect() as connection:
+                connection = await connection.execution_options(
+                    settings={'max_block_size': 5}
+                )
+                result = await connection.stream(
+                    text('SELECT number FROM system.numbers LIMIT 12')
+                )
+                return [len(p) async for p in result.partitions()]
+
+        self.assertEqual(self.run_async(stream()), [5, 5, 2])
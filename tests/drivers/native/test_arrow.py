@@ -0,0 +1,125 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+from datetime import datetime
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pyarrow as pa
+
+from bytehouse_sqlalchemy.drivers.native.arrow import (
+    ArrowFileWriter, column_to_arrow, columns_to_batch, get_arrow_type,
+    open_arrow_file
+)
+
+
+class ArrowTypeTestCase(TestCase):
+    def test_simple(self):
+        self.assertEqual(get_arrow_type(pa, 'UInt32'), pa.uint32())
+        self.assertEqual(get_arrow_type(pa, 'Float32'), pa.float32())
+        self.assertEqual(get_arrow_type(pa, 'String'), pa.string())
+        self.assertEqual(get_arrow_type(pa, 'IPv4'), pa.string())
+
+    def test_wrappers(self):
+        self.assertEqual(
+            get_arrow_type(pa, 'LowCardinality(Nullable(String))'),
+            pa.string()
+        )
+
+    def test_datetime(self):
+        self.assertEqual(get_arrow_type(pa, 'DateTime'), pa.timestamp('s'))
+        self.assertEqual(
+            get_arrow_type(pa, "DateTime64(6, 'UTC')"),
+            pa.timestamp('us', tz='UTC')
+        )
+
+    def test_decimal(self):
+        self.assertEqual(
+            get_arrow_type(pa, 'Decimal(9, 2)'), pa.decimal128(9, 2)
+        )
+        self.assertEqual(
+            get_arrow_type(pa, 'Decimal(76, 2)'), pa.decimal256(76, 2)
+        )
+
+    def test_inferred(self):
+        self.assertIsNone(get_arrow_type(pa, 'Array(Int32)'))
+
+
+class ColumnToArrowTestCase(TestCase):
+    def test_nullable(self):
+        rv = column_to_arrow(pa, [1, None], 'Nullable(Int16)')
+        self.assertEqual(rv.type, pa.int16())
+        self.assertEqual(rv.null_count, 1)
+
+    def test_low_cardinality(self):
+        rv = column_to_arrow(pa, ['a', 'b', 'a'], 'LowCardinality(String)')
+        self.assertEqual(rv.type, pa.dictionary(pa.int32(), pa.string()))
+
+    def test_array_of_low_cardinality(self):
+        rv = column_to_arrow(
+            pa, [['a', 'b'], ['a']], 'Array(LowCardinality(String))'
+        )
+        self.assertEqual(rv.type, pa.list_(pa.string()))
+        self.assertEqual(rv.to_pylist(), [['a', 'b'], ['a']])
+
+    def test_values(self):
+        rv = column_to_arrow(pa, [Decimal('1.25')], 'Decimal(9, 2)')
+        self.assertEqual(rv.to_pylist(), [Decimal('1.25')])
+
+        dt = datetime(2023, 1, 1, 1, 2, 3)
+        rv = column_to_arrow(pa, [dt], 'DateTime')
+        self.assertEqual(rv.to_pylist(), [dt])
+
+
+class ArrowFileTestCase(TestCase):
+    def test_write_read(self):
+        columns_with_types = [('x', 'UInt8'), ('y', 'String')]
+        batch = columns_to_batch([[1, 2], ['a', 'b']], columns_with_types)
+
+        with TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'result.arrow')
+            writer = ArrowFileWriter(path, batch.schema)
+            writer.write(batch)
+            writer.write(batch)
+            self.assertFalse(os.path.exists(path))
+            writer.close()
+
+            reader = open_arrow_file(path)
+            self.assertEqual(reader.num_record_batches, 2)
+            self.assertEqual(
+                reader.read_all().column('x').to_pylist(), [1, 2, 1, 2]
+            )
+
+    def test_abort(self):
+        batch = columns_to_batch([[1]], [('x', 'UInt8')])
+
+        with TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'result.arrow')
+            writer = ArrowFileWriter(path, batch.schema)
+            writer.abort()
+            self.assertEqual(os.listdir(tmp), [])
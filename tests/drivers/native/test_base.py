@@ -72,3 +72,45 @@ class TestConnectArgs(BaseTestCase):
         self.assertEqual(
             str(connect_args[0][0]), 'bytehouse://localhost:9001/default'
         )
+
+    def test_pool_params(self):
+        url = URL.create(
+            drivername='bytehouse',
+            host='localhost',
+            port=9001,
+            database='default',
+            query={
+                'alt_hosts': 'replica:9001,other',
+                'host_pools': 'true',
+                'pool_prewarm': '3'
+            }
+        )
+        connect_args = self.dialect.create_connect_args(url)
+        self.assertEqual(
+            str(connect_args[0][0]),
+            'bytehouse://localhost:9001/default'
+            '?alt_hosts=replica%3A9001%2Cother'
+        )
+        self.assertTrue(self.dialect.host_pools)
+        self.assertEqual(self.dialect.pool_prewarm, 3)
+        self.assertEqual(
+            self.dialect.hosts, ['localhost:9001', 'replica:9001', 'other']
+        )
+
+    def test_compression(self):
+        url = URL.create(
+            drivername='bytehouse',
+            host='localhost',
+            database='default',
+            query={'compression': 'none', 'compress_block_size': '65536'}
+        )
+        connect_args = self.dialect.create_connect_args(url)
+        self.assertEqual(
+            str(connect_args[0][0]),
+            'bytehouse://localhost/default'
+            '?compress_block_size=65536&compression=false'
+        )
+
+        url = url.update_query_dict({'compression': 'zstd-fast'})
+        with self.assertRaises(ValueError):
+            self.dialect.create_connect_args(url)
@@ -0,0 +1,85 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from unittest import TestCase
+
+from bytehouse_sqlalchemy.drivers.native.buffer import RowBuffer
+
+
+class RowBufferTestCase(TestCase):
+    def test_empty(self):
+        buf = RowBuffer()
+
+        self.assertFalse(buf)
+        self.assertEqual(len(buf), 0)
+        self.assertIsNone(buf.popone())
+        self.assertEqual(buf.popmany(10), [])
+        self.assertEqual(buf.popall(), [])
+
+    def test_popone(self):
+        buf = RowBuffer([[(1, ), (2, )], [(3, )]])
+
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(buf.popone(), (1, ))
+        self.assertEqual(buf.popone(), (2, ))
+        self.assertEqual(buf.popone(), (3, ))
+        self.assertIsNone(buf.popone())
+
+    def test_popmany_across_blocks(self):
+        buf = RowBuffer([[1, 2, 3], [4, 5], [6]])
+
+        self.assertEqual(buf.popmany(2), [1, 2])
+        self.assertEqual(buf.popmany(3), [3, 4, 5])
+        self.assertEqual(len(buf), 1)
+        self.assertEqual(buf.popmany(5), [6])
+        self.assertEqual(buf.popmany(5), [])
+
+    def test_popall_after_partial_fetch(self):
+        buf = RowBuffer([[1, 2, 3], [4, 5]])
+
+        self.assertEqual(buf.popone(), 1)
+        self.assertEqual(buf.popall(), [2, 3, 4, 5])
+        self.assertFalse(buf)
+
+    def test_popall_single_block_is_not_copied(self):
+        rows = [1, 2, 3]
+        buf = RowBuffer([rows])
+
+        self.assertIs(buf.popall(), rows)
+
+    def test_consumed_blocks_are_released(self):
+        buf = RowBuffer([[1, 2], [3, 4]])
+
+        buf.popmany(2)
+        self.assertEqual(len(buf._blocks), 1)
+        self.assertEqual(buf._offset, 0)
+
+    def test_empty_blocks_are_skipped(self):
+        buf = RowBuffer([[], [1], []])
+        buf.append_block(iter([2, 3]))
+
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(list(buf), [1, 2, 3])
@@ -0,0 +1,330 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import shutil
+import stat
+import tempfile
+from time import sleep
+from unittest import TestCase, mock
+from uuid import uuid4
+
+import pyarrow
+
+from sqlalchemy import Column, func, select
+
+from bytehouse_sqlalchemy import engines, types, Table
+from bytehouse_sqlalchemy.drivers.native import metrics
+from bytehouse_sqlalchemy.drivers.native.cache import (
+    DiskResultCache, ResultCache, get_statement_tables
+)
+from tests.testcase import NativeSessionTestCase
+
+
+class ResultCacheTestCase(TestCase):
+    columns = [('x', 'UInt64')]
+
+    def response(self, *values):
+        return [(x, ) for x in values], self.columns
+
+    def test_get_put(self):
+        cache = ResultCache()
+        self.assertIsNone(cache.get('a'))
+
+        cache.put('a', self.response(1, 2), 60)
+        self.assertEqual(cache.get('a'), self.response(1, 2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_copy(self):
+        cache = ResultCache()
+        cache.put('a', self.response(1), 60)
+
+        rows, _ = cache.get('a')
+        rows.append((2, ))
+        self.assertEqual(cache.get('a'), self.response(1))
+
+    def test_ttl(self):
+        cache = ResultCache()
+        cache.put('a', self.response(1), 0.01)
+        sleep(0.02)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru(self):
+        cache = ResultCache(max_entries=2)
+        cache.put('a', self.response(1), 60)
+        cache.put('b', self.response(2), 60)
+        cache.get('a')
+        cache.put('c', self.response(3), 60)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_max_bytes(self):
+        cache = ResultCache(max_bytes=2000)
+        cache.put('large', self.response(*range(1000)), 60)
+        self.assertEqual(len(cache), 0)
+
+        for key in range(100):
+            cache.put(key, self.response(key), 60)
+        self.assertLessEqual(cache.size, 2000)
+        self.assertLess(len(cache), 100)
+        self.assertIsNotNone(cache.get(99))
+
+    def test_invalidate(self):
+        cache = ResultCache()
+        cache.put('a', self.response(1), 60, tables={'t1'})
+        cache.put('b', self.response(2), 60, tables={'t1', 'db.t2'})
+        cache.put('c', self.response(3), 60)
+
+        cache.invalidate('t1')
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache._table_keys, {})
+
+    def test_statement_tables(self):
+        t1 = Table(
+            't1', NativeSessionTestCase.metadata(), Column('x', types.Int32)
+        )
+        t2 = Table(
+            't2', NativeSessionTestCase.metadata(), Column('x', types.Int32),
+            schema='db'
+        )
+        query = select(t1.c.x).where(t1.c.x.in_(select(t2.c.x)))
+
+        self.assertEqual(get_statement_tables(query), {'t1', 'db.t2'})
+        self.assertEqual(
+            get_statement_tables(query, database='default'),
+            {'default.t1', 'db.t2'}
+        )
+
+    def test_invalidate_database(self):
+        cache = ResultCache()
+        cache.put('a', self.response(1), 60, tables={'default.t1'})
+        cache.put('b', self.response(2), 60, tables={'db.t1'})
+
+        # INSERT INTO t1 and SELECT FROM default.t1 refer to one table.
+        cache.invalidate('t1', database='default')
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+
+        cache.invalidate('db.t1', database='default')
+        self.assertIsNone(cache.get('b'))
+
+        # Database is unknown, the table of any database is invalidated.
+        cache.put('a', self.response(1), 60, tables={'default.t1'})
+        cache.put('b', self.response(2), 60, tables={'db.t1'})
+        cache.invalidate('t1')
+        self.assertEqual(len(cache), 0)
+
+
+class DiskResultCacheTestCase(TestCase):
+    columns = [('x', 'UInt64'), ('s', 'String')]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiskResultCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        response = ([(1, 'a'), (2, None)], self.columns)
+        self.assertIsNone(self.cache.get('a'))
+
+        self.cache.put('a', response, 60)
+        self.assertEqual(self.cache.get('a'), response)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_columnar(self):
+        response = ([(1, 2), ('a', None)], self.columns)
+        self.cache.put('a', response, 60, columnar=True)
+        self.assertEqual(self.cache.get('a'), response)
+
+        self.cache.put('b', ([], self.columns), 60)
+        self.assertEqual(self.cache.get('b'), ([], self.columns))
+
+    def test_shared(self):
+        other = DiskResultCache(self.directory)
+        other.put('a', ([(1, 'a')], self.columns), 60)
+
+        self.assertEqual(self.cache.get('a'), ([(1, 'a')], self.columns))
+        self.assertEqual(
+            [x for x in os.listdir(self.directory) if x.endswith('.tmp')],
+            []
+        )
+
+    def test_ttl(self):
+        self.cache.put('a', ([(1, 'a')], self.columns), 0.01)
+        sleep(0.02)
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_expired_replaced(self):
+        self.cache.put('a', ([(1, 'a')], self.columns), 0.01, tables={'t1'})
+        (path, expired), = self.cache._list_files()
+        sleep(0.02)
+
+        # Fresh result is published after the expired one is read.
+        fresh = ([(2, 'b')], self.columns)
+        self.cache.put('a', fresh, 60, tables={'t1'})
+        self.cache._remove_expired(path, expired, ['t1'])
+        self.assertEqual(self.cache.get('a'), fresh)
+
+        self.cache.invalidate('t1')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_max_bytes(self):
+        cache = DiskResultCache(self.directory, max_bytes=5000)
+        for key in range(50):
+            cache.put(key, ([(key, 'a')] * 100, self.columns), 60)
+
+        self.assertLess(len(cache), 50)
+        self.assertIsNotNone(cache.get(49))
+
+    def test_arrow_file(self):
+        self.cache.put('a', ([(1, 'a')], self.columns), 60)
+        path, = [
+            os.path.join(self.directory, x) for x in os.listdir(self.directory)
+        ]
+
+        with pyarrow.memory_map(path) as source:
+            table = pyarrow.ipc.open_file(source).read_all()
+        self.assertEqual(table.column(0).type, pyarrow.uint64())
+        self.assertEqual(table.column(1).to_pylist(), ['a'])
+
+    def test_not_stored(self):
+        # Values which would be read back as different objects.
+        self.cache.put('a', ([(uuid4(), )], [('u', 'UUID')]), 60)
+        self.cache.put('b', ([(b'a', )], [('s', 'String')]), 60)
+        self.cache.put('c', ([((1, 2), )], [('a', 'Array(Int32)')]), 60)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_directory_mode(self):
+        directory = os.path.join(self.directory, 'cache')
+        DiskResultCache(directory)
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode) & 0o077, 0)
+
+    def test_unsafe_directory(self):
+        os.chmod(self.directory, 0o777)
+        with self.assertRaises(ValueError):
+            DiskResultCache(self.directory)
+
+        if os.getuid() == 0:
+            os.chmod(self.directory, 0o700)
+            os.chown(self.directory, 65534, -1)
+            with self.assertRaises(ValueError):
+                DiskResultCache(self.directory)
+            os.chown(self.directory, 0, -1)
+
+    def test_invalidate(self):
+        self.cache.put('a', ([(1, 'a')], self.columns), 60, tables={'t1'})
+        self.cache.put('b', ([(2, 'b')], self.columns), 60, tables={'t2'})
+
+        self.cache.invalidate('t1')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate_database(self):
+        self.cache.put(
+            'a', ([(1, 'a')], self.columns), 60, tables={'default.t1'}
+        )
+
+        self.cache.invalidate('t1', database='default')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_invalidate_by_index(self):
+        self.cache.put('a', ([(1, 'a')], self.columns), 60, tables={'t1'})
+        other = DiskResultCache(self.directory)
+
+        # Headers of results are not read.
+        with mock.patch.object(pyarrow, 'memory_map') as memory_map:
+            other.invalidate('t1', 't2')
+        memory_map.assert_not_called()
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_evicted_unindexed(self):
+        cache = DiskResultCache(self.directory, max_bytes=5000)
+        for key in range(50):
+            cache.put(key, ([(key, 'a')] * 100, self.columns), 60, {'t1'})
+
+        index, = os.listdir(cache.index_directory)
+        markers = os.listdir(os.path.join(cache.index_directory, index))
+        self.assertEqual(len(markers), len(cache))
+
+
+class ResultCacheNativeTestCase(NativeSessionTestCase):
+    table = Table(
+        'test', NativeSessionTestCase.metadata(),
+        Column('x', types.Int32, primary_key=True),
+        engines.CnchMergeTree(order_by=func.tuple())
+    )
+
+    def setUp(self):
+        super(ResultCacheNativeTestCase, self).setUp()
+        self.session.bind.dialect.result_cache.clear()
+
+    def test_cached(self):
+        query = self.session.query(func.rand()).execution_options(
+            cache_ttl=60
+        )
+        self.assertEqual(query.scalar(), query.scalar())
+
+        cache = self.session.bind.dialect.result_cache
+        self.assertEqual(cache.hits, 1)
+
+    def test_rows_metrics(self):
+        query = self.session.query(func.rand()).execution_options(
+            cache_ttl=60
+        )
+        fetched = metrics.rows_fetched.get()
+        shared = metrics.rows_shared.get()
+
+        query.scalar()
+        self.assertEqual(metrics.rows_fetched.get(), fetched + 1)
+        query.scalar()
+        self.assertEqual(metrics.rows_fetched.get(), fetched + 1)
+        self.assertEqual(metrics.rows_shared.get(), shared + 1)
+
+    def test_not_cached(self):
+        query = self.session.query(func.rand())
+        self.assertNotEqual(query.scalar(), query.scalar())
+
+    def test_invalidate_on_insert(self):
+        with self.create_table(self.table):
+            query = self.session.query(self.table.c.x).execution_options(
+                cache_ttl=60
+            )
+            self.assertEqual(query.all(), [])
+
+            self.session.execute(self.table.insert(), [{'x': 1}])
+            self.assertEqual(query.all(), [(1, )])
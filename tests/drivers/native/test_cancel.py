@@ -0,0 +1,209 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from time import time
+from unittest import TestCase, mock
+
+from bytehouse_driver.errors import Error as DriverError
+from bytehouse_driver.progress import Progress
+from bytehouse_driver.protocol import ServerPacketTypes
+
+from bytehouse_sqlalchemy.drivers.native.connector import (
+    Cursor, QueryInfo, Transport
+)
+from bytehouse_sqlalchemy.exceptions import (
+    DatabaseException, QueryCancelledException
+)
+from tests.testcase import NativeSessionTestCase
+
+
+class Packet(object):
+    type = ServerPacketTypes.DATA
+    block = None
+
+
+class ProgressPacket(object):
+    type = ServerPacketTypes.PROGRESS
+
+    def __init__(self):
+        self.progress = Progress()
+        self.progress.rows = 10
+
+
+class Wire(object):
+    is_query_executing = True
+
+    def __init__(self):
+        self.cancels = 0
+        self.blocks = []
+        self.packets = []
+
+    def send_cancel(self):
+        self.cancels += 1
+
+    def send_query(self, query, query_id=None):
+        pass
+
+    def send_external_tables(self, tables, types_check=False):
+        pass
+
+    def send_data(self, block):
+        self.blocks.append(block)
+
+    def receive_packet(self):
+        return self.packets.pop(0) if self.packets else Packet()
+
+
+class TransportTestCase(TestCase):
+    def make_transport(self):
+        # Bypass driver client constructor, it connects to the server.
+        transport = Transport.__new__(Transport)
+        transport.connection = Wire()
+        transport.last_query = None
+        transport.inserting = False
+        transport.watch_connection(transport.connection)
+        transport.start_query()
+        return transport
+
+    def test_no_cancel(self):
+        transport = self.make_transport()
+
+        transport.receive_packet()
+        self.assertEqual(transport.connection.cancels, 0)
+        self.assertIsNone(transport.cancelled)
+
+    def test_request_cancel(self):
+        transport = self.make_transport()
+        thread = threading.Thread(target=transport.request_cancel)
+        thread.start()
+        thread.join()
+
+        transport.receive_packet()
+        transport.receive_packet()
+        self.assertEqual(transport.connection.cancels, 1)
+        self.assertEqual(transport.cancelled, 'Query was cancelled')
+
+        transport.start_query()
+        self.assertIsNone(transport.cancelled)
+
+    def test_deadline(self):
+        transport = self.make_transport()
+        transport.start_query(deadline=time() - 1)
+
+        transport.receive_packet()
+        self.assertEqual(transport.connection.cancels, 1)
+        self.assertEqual(transport.cancelled, 'Query deadline exceeded')
+
+    def test_idle(self):
+        transport = self.make_transport()
+        transport.connection.is_query_executing = False
+        transport.request_cancel()
+
+        transport.receive_packet()
+        self.assertEqual(transport.connection.cancels, 0)
+
+    def test_insert_cancel(self):
+        transport = self.make_transport()
+        transport.request_cancel()
+
+        with self.assertRaises(DriverError):
+            transport.process_insert_query('INSERT INTO t VALUES', [(1, )])
+        self.assertEqual(transport.connection.blocks, [])
+        self.assertEqual(transport.connection.cancels, 0)
+        self.assertEqual(transport.cancelled, 'Query was cancelled')
+        self.assertFalse(transport.inserting)
+
+    def test_connection_progress(self):
+        transport = self.make_transport()
+        listener = mock.Mock()
+        transport.last_query = QueryInfo(listener)
+        transport.connection.packets.append(ProgressPacket())
+
+        # INSERT reads packets from the connection, not the client.
+        transport.connection.receive_packet()
+        self.assertEqual(transport.last_query.progress.rows, 10)
+        listener._store_progress.assert_called_once_with(
+            transport.last_query.progress
+        )
+
+        transport.connection.packets.append(ProgressPacket())
+        transport.receive_packet()
+        self.assertEqual(transport.last_query.progress.rows, 20)
+
+
+class DeadlineTestCase(TestCase):
+    def test_no_deadline(self):
+        self.assertIsNone(Cursor._get_deadline({}))
+
+    def test_timeout(self):
+        deadline = Cursor._get_deadline({'timeout': 5})
+        self.assertAlmostEqual(deadline, time() + 5, delta=1)
+
+    def test_earliest(self):
+        now = time()
+        self.assertEqual(
+            Cursor._get_deadline({'timeout': 60, 'deadline': now + 1}),
+            now + 1
+        )
+        deadline = Cursor._get_deadline({'timeout': 1, 'deadline': now + 60})
+        self.assertLess(deadline, now + 60)
+
+
+class CancelTestCase(NativeSessionTestCase):
+    sleep_query = 'SELECT sleepEachRow(0.5) FROM system.numbers LIMIT 20'
+
+    def test_timeout(self):
+        start = time()
+        with self.assertRaises(DatabaseException):
+            self.session.connection().execution_options(timeout=1).execute(
+                self.sleep_query
+            )
+        self.assertLess(time() - start, 5)
+
+        rv = self.session.execute('SELECT 1').scalar()
+        self.assertEqual(rv, 1)
+
+    def test_deadline_passed(self):
+        with self.assertRaises(QueryCancelledException):
+            self.session.connection().execution_options(
+                deadline=time() - 1
+            ).execute('SELECT 1')
+
+    def test_cancel_from_thread(self):
+        raw = self.session.bind.raw_connection()
+        cursor = raw.cursor()
+        timer = threading.Timer(1, cursor.cancel)
+        timer.start()
+
+        start = time()
+        with self.assertRaises(QueryCancelledException):
+            cursor.execute(self.sleep_query)
+        self.assertLess(time() - start, 5)
+        timer.join()
+
+        cursor.execute('SELECT 1')
+        self.assertEqual(cursor.fetchall(), [(1, )])
+        raw.close()
@@ -0,0 +1,150 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+from time import sleep, time
+from unittest import TestCase
+
+from sqlalchemy import create_engine, text
+
+from bytehouse_sqlalchemy.drivers.native import metrics
+from bytehouse_sqlalchemy.drivers.native.coalesce import SingleFlight
+from bytehouse_sqlalchemy.exceptions import QueryCancelledException
+from tests.testcase import NativeSessionTestCase
+
+
+class SingleFlightTestCase(TestCase):
+    def run_concurrently(self, fn, count=5):
+        results = []
+
+        def target():
+            try:
+                results.append(fn())
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_coalesce(self):
+        flight = SingleFlight()
+        calls = []
+
+        def query():
+            calls.append(1)
+            sleep(0.2)
+            return [(1, )], [('x', 'UInt8')]
+
+        results = self.run_concurrently(lambda: flight.do('key', query))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [([(1, )], [('x', 'UInt8')])] * 5)
+
+        # Each caller gets its own rows.
+        self.assertEqual(len({id(rows) for rows, _ in results}), 5)
+
+    def test_error(self):
+        flight = SingleFlight()
+        calls = []
+
+        def query():
+            calls.append(1)
+            sleep(0.2)
+            if len(calls) == 1:
+                raise ValueError()
+            return [(1, )], [('x', 'UInt8')]
+
+        results = self.run_concurrently(lambda: flight.do('key', query))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            len([x for x in results if isinstance(x, ValueError)]), 1
+        )
+
+    def test_deadline(self):
+        flight = SingleFlight()
+
+        def query():
+            sleep(0.5)
+            return [], []
+
+        thread = threading.Thread(target=flight.do, args=('key', query))
+        thread.start()
+        sleep(0.1)
+
+        with self.assertRaises(QueryCancelledException):
+            flight.do('key', query, deadline=time() + 0.1)
+        thread.join()
+
+
+class CoalesceTestCase(NativeSessionTestCase):
+    def test_coalesce(self):
+        results = []
+        query = text('SELECT sleep(1), rand()')
+
+        def target():
+            with self.session.bind.connect() as connection:
+                connection = connection.execution_options(coalesce=True)
+                results.append(connection.execute(query).fetchall())
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_pool_size(self):
+        # Waiting callers hold their connection, so with single pooled
+        # connection callers wait for checkout instead and run the query
+        # one by one. Nothing is coalesced, nothing is stuck.
+        engine = create_engine(
+            self.session.bind.url, pool_size=1, max_overflow=0,
+            execution_options={'coalesce': True}
+        )
+        coalesced = metrics.coalesced_queries.get()
+        results = []
+
+        def target():
+            with engine.connect() as connection:
+                results.append(
+                    connection.execute(text('SELECT sleep(0.5)')).fetchall()
+                )
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(metrics.coalesced_queries.get(), coalesced)
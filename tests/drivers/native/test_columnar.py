@@ -0,0 +1,122 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from datetime import date, datetime
+from unittest import TestCase
+
+import numpy
+
+from bytehouse_sqlalchemy.drivers.native.columnar import (
+    array_to_column, column_to_numpy, get_numpy_dtype
+)
+
+
+class NumpyDtypeTestCase(TestCase):
+    def test_integers(self):
+        self.assertEqual(get_numpy_dtype('Int8'), ('int8', False))
+        self.assertEqual(get_numpy_dtype('UInt64'), ('uint64', False))
+        self.assertEqual(get_numpy_dtype('Int128'), (object, False))
+
+    def test_floats(self):
+        self.assertEqual(get_numpy_dtype('Float32'), ('float32', False))
+        self.assertEqual(get_numpy_dtype('Float64'), ('float64', False))
+
+    def test_wrappers(self):
+        self.assertEqual(get_numpy_dtype('Nullable(Int32)'), ('int32', True))
+        self.assertEqual(
+            get_numpy_dtype('LowCardinality(Nullable(String))'),
+            (object, True)
+        )
+
+    def test_dates(self):
+        self.assertEqual(get_numpy_dtype('Date'), ('datetime64[D]', False))
+        self.assertEqual(
+            get_numpy_dtype('DateTime'), ('datetime64[s]', False)
+        )
+        self.assertEqual(
+            get_numpy_dtype('DateTime64(6)'), ('datetime64[us]', False)
+        )
+        self.assertEqual(
+            get_numpy_dtype("DateTime64(3, 'Europe/Moscow')"), (object, False)
+        )
+        self.assertEqual(
+            get_numpy_dtype("DateTime('Europe/Moscow')"), (object, False)
+        )
+
+    def test_other(self):
+        self.assertEqual(get_numpy_dtype('Decimal(9, 2)'), (object, False))
+        self.assertEqual(get_numpy_dtype('Array(Int32)'), (object, False))
+
+
+class ColumnToNumpyTestCase(TestCase):
+    def test_typed(self):
+        rv = column_to_numpy([1, 2, 3], 'UInt16')
+        self.assertEqual(rv.dtype, numpy.uint16)
+        self.assertEqual(rv.tolist(), [1, 2, 3])
+
+    def test_nullable(self):
+        rv = column_to_numpy([1, None, 3], 'Nullable(Int64)')
+        self.assertIsInstance(rv, numpy.ma.MaskedArray)
+        self.assertEqual(rv.dtype, numpy.int64)
+        self.assertEqual(rv.mask.tolist(), [False, True, False])
+
+    def test_dates(self):
+        rv = column_to_numpy([date(2023, 1, 2)], 'Date')
+        self.assertEqual(rv[0], numpy.datetime64('2023-01-02'))
+
+        rv = column_to_numpy([datetime(2023, 1, 2, 3, 4, 5)], 'DateTime')
+        self.assertEqual(rv[0], numpy.datetime64('2023-01-02T03:04:05'))
+
+    def test_object(self):
+        rv = column_to_numpy([(1, 2), (3, 4)], 'Array(Int32)')
+        self.assertEqual(rv.dtype, object)
+        self.assertEqual(rv.shape, (2, ))
+        self.assertEqual(rv[1], (3, 4))
+
+    def test_empty(self):
+        rv = column_to_numpy([], 'Nullable(Float64)')
+        self.assertEqual(len(rv), 0)
+
+
+class ArrayToColumnTestCase(TestCase):
+    def test_list(self):
+        values = [1, 2]
+        self.assertIs(array_to_column(values), values)
+
+    def test_ints(self):
+        rv = array_to_column(numpy.arange(3, dtype='int32'))
+        self.assertEqual(rv, [0, 1, 2])
+        self.assertIs(type(rv[0]), int)
+
+    def test_datetime64(self):
+        values = numpy.array(['2020-01-01T00:00:01'], dtype='datetime64[ns]')
+        self.assertEqual(
+            array_to_column(values), [datetime(2020, 1, 1, 0, 0, 1)]
+        )
+
+    def test_masked(self):
+        values = numpy.ma.masked_array([1, 2, 3], mask=[False, True, False])
+        self.assertEqual(array_to_column(values), [1, None, 3])
@@ -0,0 +1,198 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from unittest import TestCase, mock
+
+from bytehouse_driver import Client as DriverClient
+from bytehouse_driver.connection import Connection as DriverConnection
+from bytehouse_driver.errors import NetworkError
+from bytehouse_driver.protocol import Compression
+from sqlalchemy import text
+
+from bytehouse_sqlalchemy.drivers.native.connector import (
+    Transport, get_compression
+)
+from tests.testcase import NativeSessionTestCase
+
+
+class GetCompressionTestCase(TestCase):
+    def test_methods(self):
+        self.assertEqual(get_compression('ZSTD'), 'zstd')
+        self.assertEqual(get_compression('lz4hc'), 'lz4hc')
+        self.assertEqual(get_compression('true'), 'lz4')
+        self.assertEqual(get_compression(True), 'lz4')
+        self.assertFalse(get_compression('none'))
+        self.assertFalse(get_compression(False))
+
+        with self.assertRaises(ValueError):
+            get_compression('gzip')
+
+
+class TransportCompressionTestCase(TestCase):
+    def make_transport(self, **kwargs):
+        # Bypass driver client constructor, it connects to the server.
+        transport = Transport.__new__(Transport)
+        connection = transport.connection = DriverConnection('h', **kwargs)
+        transport.listener = None
+        transport.compression = None
+        transport.compression_settings = {}
+        transport.default_compression = (
+            connection.compression, connection.compressor_cls,
+            connection.compress_block_size
+        )
+        return transport
+
+    def establish_connection(self, transport, connection=None):
+        # Driver client switches to the next host with alt_hosts.
+        def switch(settings):
+            if connection is not None:
+                transport.connection = connection
+
+        with mock.patch.object(
+                DriverClient, 'establish_connection', side_effect=switch):
+            transport.establish_connection(None)
+
+    def test_override(self):
+        transport = self.make_transport()
+        connection = transport.connection
+
+        transport.set_compression('zstd', 4096)
+        self.assertEqual(connection.compression, Compression.DISABLED)
+
+        self.establish_connection(transport)
+        self.assertEqual(connection.compression, Compression.ENABLED)
+        self.assertEqual(connection.compressor_cls.method_byte, 0x90)
+        self.assertEqual(connection.compress_block_size, 4096)
+
+        transport.set_compression()
+        self.establish_connection(transport)
+        self.assertEqual(connection.compression, Compression.DISABLED)
+        self.assertIsNone(connection.compressor_cls)
+
+    def test_server_settings(self):
+        transport = self.make_transport()
+        transport.settings = {'network_compression_method': 'LZ4'}
+        transport.client_settings = {}
+        context = transport.connection.context
+
+        transport.set_compression('zstd')
+        transport.make_query_settings(None)
+        self.assertEqual(context.settings, {
+            'network_compression_method': 'ZSTD',
+            'network_zstd_compression_level': 3
+        })
+
+        transport.set_compression('lz4hc')
+        transport.make_query_settings({'max_threads': 1})
+        self.assertEqual(context.settings, {
+            'network_compression_method': 'LZ4HC', 'max_threads': 1
+        })
+
+        # Explicit setting of the query wins.
+        transport.make_query_settings({'network_compression_method': 'LZ4'})
+        self.assertEqual(context.settings['network_compression_method'], 'LZ4')
+
+        # Previous values are restored for the next query.
+        transport.set_compression()
+        transport.make_query_settings(None)
+        self.assertEqual(
+            context.settings, {'network_compression_method': 'LZ4'}
+        )
+
+    def test_disable(self):
+        transport = self.make_transport(compression='lz4')
+        connection = transport.connection
+        default_cls = connection.compressor_cls
+
+        transport.set_compression('none')
+        self.establish_connection(transport)
+        self.assertEqual(connection.compression, Compression.DISABLED)
+
+        transport.set_compression(block_size=4096)
+        self.establish_connection(transport)
+        self.assertIs(connection.compressor_cls, default_cls)
+        self.assertEqual(connection.compress_block_size, 4096)
+
+    def test_switch_connection(self):
+        transport = self.make_transport()
+        first = transport.connection
+        second = DriverConnection('h2')
+
+        transport.set_compression('lz4')
+        self.establish_connection(transport)
+        self.assertEqual(first.compression, Compression.ENABLED)
+
+        self.establish_connection(transport, second)
+        self.assertEqual(second.compression, Compression.ENABLED)
+        self.assertEqual(first.compression, Compression.DISABLED)
+        self.assertIsNone(first.compressor_cls)
+
+    def test_switch_failed(self):
+        transport = self.make_transport()
+        first = transport.connection
+        transport.set_compression('lz4')
+        self.establish_connection(transport)
+
+        def fail(settings):
+            transport.connection = DriverConnection('h2')
+            raise NetworkError('h2')
+
+        with mock.patch.object(
+                DriverClient, 'establish_connection', side_effect=fail):
+            with self.assertRaises(NetworkError):
+                transport.establish_connection(None)
+
+        self.assertEqual(first.compression, Compression.DISABLED)
+
+    def test_connected_streams(self):
+        transport = self.make_transport()
+        connection = transport.connection
+        connection.connected = True
+
+        transport.set_compression('lz4')
+        self.establish_connection(transport)
+        self.assertEqual(
+            type(connection.block_out).__name__,
+            'CompressedBlockOutputStream'
+        )
+        block_out = connection.block_out
+
+        # Streams are kept while compression stays the same.
+        self.establish_connection(transport)
+        self.assertIs(connection.block_out, block_out)
+
+
+class CompressionTestCase(NativeSessionTestCase):
+    query = text(
+        'SELECT number, toString(number) FROM system.numbers LIMIT 10000'
+    )
+
+    def test_per_query(self):
+        expected = [(i, str(i)) for i in range(10000)]
+        connection = self.session.connection()
+
+        for method in ('none', 'lz4', 'zstd'):
+            options = connection.execution_options(compression=method)
+            self.assertEqual(options.execute(self.query).fetchall(), expected)
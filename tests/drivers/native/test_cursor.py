@@ -24,6 +24,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import warnings
+from unittest import TestCase, mock
+
+from bytehouse_sqlalchemy.drivers.native.base import StreamFetchStrategy
+from bytehouse_sqlalchemy.drivers.native.connector import Connection, Cursor
 from tests.testcase import NativeSessionTestCase
 
 
@@ -40,3 +45,133 @@ class CursorTestCase(NativeSessionTestCase):
         rv = self.session.execute("SELECT 1")
 
         self.assertEqual(len(rv.fetchall()), 1)
+
+    def test_fetch_columns(self):
+        rv = self.session.execute(
+            'SELECT number, toString(number) FROM system.numbers LIMIT 3'
+        )
+        self.assertEqual(
+            rv.cursor.fetch_columns(), [[0, 1, 2], ['0', '1', '2']]
+        )
+
+    def test_fetch_numpy_columnar(self):
+        rv = self.session.connection().execution_options(
+            columnar=True
+        ).execute(
+            'SELECT toInt32(number) AS x, '
+            'if(number = 1, NULL, number) AS y '
+            'FROM system.numbers LIMIT 3'
+        )
+        x, y = rv.cursor.fetch_numpy()
+
+        self.assertEqual(x.dtype.name, 'int32')
+        self.assertEqual(x.tolist(), [0, 1, 2])
+        self.assertEqual(y.mask.tolist(), [False, True, False])
+
+    def test_fetchall_columnar(self):
+        rv = self.session.connection().execution_options(
+            columnar=True
+        ).execute('SELECT number FROM system.numbers LIMIT 2')
+
+        self.assertEqual(rv.fetchall(), [(0, ), (1, )])
+
+    def test_fetch_arrow_batches_stream(self):
+        rv = self.session.connection().execution_options(
+            stream_results=True, settings={'max_block_size': 100}
+        ).execute('SELECT number FROM system.numbers LIMIT 250')
+
+        batches = list(rv.cursor.fetch_arrow_batches())
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(sum(x.num_rows for x in batches), 250)
+        self.assertEqual(batches[0].column(0).to_pylist()[:2], [0, 1])
+
+    def test_fetchblock_stream(self):
+        rv = self.session.connection().execution_options(
+            stream_results=True, max_row_buffer=1000,
+            settings={'max_block_size': 10}
+        ).execute('SELECT number FROM system.numbers LIMIT 25')
+
+        sizes = []
+        block = rv.cursor.fetchblock()
+        while block:
+            sizes.append(len(block))
+            block = rv.cursor.fetchblock()
+
+        self.assertEqual(sizes, [10, 10, 5])
+
+    def test_close_stream_cancels_query(self):
+        connection = self.session.connection()
+        rv = connection.execution_options(stream_results=True).execute(
+            'SELECT number FROM system.numbers'
+        )
+        self.assertEqual(rv.fetchone(), (0, ))
+        rv.close()
+
+        raw = connection.connection.dbapi_connection
+        self.assertIsNone(raw.stream)
+        self.assertTrue(raw.transport.connection.connected)
+        self.assertEqual(connection.execute('SELECT 1').scalar(), 1)
+
+
+class DroppedStreamTestCase(TestCase):
+    def make_connection(self):
+        connection = Connection.__new__(Connection)
+        connection.stream = None
+        return connection
+
+    def start_stream(self, cursor):
+        blocks = mock.Mock()
+        cursor._blocks = cursor._connection.stream = blocks
+        return blocks
+
+    def test_del_does_no_io(self):
+        connection = self.make_connection()
+        cursor = Cursor(connection)
+        blocks = self.start_stream(cursor)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            del cursor
+
+        self.assertEqual(caught[0].category, ResourceWarning)
+        blocks.cancel.assert_not_called()
+        self.assertIs(connection.stream, blocks)
+
+        connection.close_stream()
+        blocks.cancel.assert_called_once_with()
+        self.assertIsNone(connection.stream)
+
+    def test_reset_state_cancels_stream(self):
+        connection = self.make_connection()
+        cursor = Cursor(connection)
+        blocks = self.start_stream(cursor)
+
+        cursor._reset_state()
+        blocks.cancel.assert_called_once_with()
+        self.assertIsNone(connection.stream)
+
+
+class StreamFetchStrategyTestCase(TestCase):
+    def make_cursor(self, rows):
+        rows = iter(rows)
+        cursor = mock.Mock()
+        cursor.fetchmany.side_effect = lambda size: [
+            row for _, row in zip(range(size), rows)
+        ]
+        return cursor
+
+    def test_no_prefetch(self):
+        cursor = self.make_cursor([(0, )])
+        StreamFetchStrategy(cursor, {})
+        cursor.fetchmany.assert_not_called()
+
+    def test_max_row_buffer(self):
+        cursor = self.make_cursor([(x, ) for x in range(100)])
+        strategy = StreamFetchStrategy(cursor, {'max_row_buffer': 10})
+        result = mock.Mock()
+
+        rows = [strategy.fetchone(result, cursor) for _ in range(30)]
+        self.assertEqual(rows, [(x, ) for x in range(30)])
+
+        sizes = [args[0] for args, _ in cursor.fetchmany.call_args_list]
+        self.assertEqual(sizes, [5, 10, 10, 10])
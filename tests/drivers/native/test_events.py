@@ -0,0 +1,127 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from unittest import TestCase
+
+from bytehouse_driver.blockstreamprofileinfo import BlockStreamProfileInfo
+from bytehouse_driver.progress import Progress
+from sqlalchemy import create_engine, event
+
+from bytehouse_sqlalchemy.drivers.native.connector import QueryInfo
+from tests.config import native_uri
+from tests.testcase import NativeSessionTestCase
+
+
+def make_progress(rows, total_rows=0):
+    progress = Progress()
+    progress.rows = rows
+    progress.total_rows = total_rows
+    return progress
+
+
+class Listener(object):
+    def __init__(self):
+        self.progress = []
+        self.profiles = []
+
+    def _store_progress(self, progress):
+        self.progress.append(progress.rows)
+
+    def _store_profile(self, profile_info):
+        self.profiles.append(profile_info)
+
+
+class QueryInfoTestCase(TestCase):
+    def test_listener(self):
+        listener = Listener()
+        info = QueryInfo(listener)
+
+        info.store_progress(make_progress(10, 30))
+        info.store_progress(make_progress(5))
+        profile_info = BlockStreamProfileInfo()
+        info.store_profile(profile_info)
+
+        self.assertEqual(listener.progress, [10, 15])
+        self.assertEqual(info.progress.total_rows, 30)
+        self.assertEqual(listener.profiles, [profile_info])
+
+    def test_no_listener(self):
+        info = QueryInfo()
+        info.store_progress(make_progress(10))
+
+        self.assertEqual(info.progress.rows, 10)
+
+
+class QueryEventsTestCase(TestCase):
+    def test_listeners_per_engine(self):
+        engine = create_engine(native_uri)
+        other = create_engine(native_uri)
+
+        def on_progress(conn, context, progress):
+            pass
+
+        event.listen(engine, 'on_progress', on_progress)
+        self.assertEqual(
+            list(engine.dialect.query_events.dispatch.on_progress),
+            [on_progress]
+        )
+        self.assertFalse(other.dialect.query_events.dispatch.on_progress)
+
+        event.remove(engine, 'on_progress', on_progress)
+        self.assertFalse(engine.dialect.query_events.dispatch.on_progress)
+
+
+class ProgressTestCase(NativeSessionTestCase):
+    def test_select(self):
+        rv = self.session.execute(
+            'SELECT number FROM system.numbers LIMIT 100'
+        )
+
+        self.assertEqual(rv.rowcount, 100)
+        self.assertGreaterEqual(rv.cursor.progress.rows, 100)
+        self.assertEqual(rv.cursor.profile_info.rows, 100)
+        self.assertGreater(rv.cursor.elapsed, 0)
+
+    def test_events(self):
+        engine = self.session.bind
+        received = []
+
+        def on_progress(conn, context, progress):
+            received.append(('progress', context.statement, progress.rows))
+
+        def on_profile(conn, context, profile_info):
+            received.append(('profile', context.statement, profile_info.rows))
+
+        event.listen(engine, 'on_progress', on_progress)
+        event.listen(engine, 'on_profile', on_profile)
+        try:
+            query = 'SELECT number FROM system.numbers LIMIT 10'
+            self.session.execute(query).fetchall()
+        finally:
+            event.remove(engine, 'on_progress', on_progress)
+            event.remove(engine, 'on_profile', on_profile)
+
+        self.assertIn(('profile', query, 10), received)
+        self.assertTrue(any(x[0] == 'progress' for x in received))
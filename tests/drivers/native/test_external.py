@@ -0,0 +1,194 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from unittest import TestCase
+
+import numpy
+from sqlalchemy import (
+    BigInteger, Column, Integer, MetaData, column, func, select, tuple_
+)
+
+from bytehouse_sqlalchemy import types, Table
+from bytehouse_sqlalchemy.drivers.native.base import dialect
+from bytehouse_sqlalchemy.drivers.native.external import (
+    ExternalTables, get_external_type, get_structure
+)
+from tests.testcase import NativeSessionTestCase
+
+structure = [('x', 'UInt64'), ('s', 'String')]
+
+
+class ExternalTablesTestCase(TestCase):
+    def blocks(self, data, block_size=2):
+        tables = ExternalTables(block_size)
+        tables.add('t', structure, data)
+        return [table['data'] for table in tables]
+
+    def test_rows(self):
+        rows = [(1, 'a'), (2, 'b'), (3, 'c')]
+        self.assertEqual(self.blocks(rows), [rows[:2], rows[2:]])
+        self.assertEqual(self.blocks(rows, block_size=3), [rows])
+
+    def test_columns(self):
+        data = {'s': ['a', 'b', 'c'], 'x': [1, 2, 3]}
+        self.assertEqual(
+            self.blocks(data), [[(1, 'a'), (2, 'b')], [(3, 'c')]]
+        )
+
+    def test_numpy(self):
+        data = {'x': numpy.arange(3, dtype='uint64'), 's': ['a', 'b', 'c']}
+        self.assertEqual(
+            self.blocks(data), [[(0, 'a'), (1, 'b')], [(2, 'c')]]
+        )
+
+    def test_iterator(self):
+        batches = iter([[(1, 'a')], {'x': [2, 3], 's': ['b', 'c']}])
+        tables = ExternalTables(2)
+        tables.add('t', structure, batches)
+        self.assertFalse(tables.replayable)
+
+        self.assertEqual(
+            [table['data'] for table in tables],
+            [[(1, 'a')], [(2, 'b'), (3, 'c')]]
+        )
+        # Consumed iterator leaves the table empty.
+        self.assertEqual([table['data'] for table in tables], [[]])
+
+    def test_empty(self):
+        self.assertEqual(self.blocks([]), [[]])
+        self.assertEqual(self.blocks(iter([])), [[]])
+
+    def test_structure_cache(self):
+        table = Table(
+            't', MetaData(), Column('x', types.UInt64),
+            Column('s', types.String)
+        )
+        type_compiler = dialect().type_compiler
+        cache = {}
+
+        rv = get_structure(table, type_compiler, cache)
+        self.assertEqual(rv, structure)
+        self.assertIs(get_structure(table, type_compiler, cache), rv)
+
+
+class ExternalInTestCase(TestCase):
+    table = Table(
+        't', MetaData(), Column('x', types.UInt64),
+        Column('y', types.String)
+    )
+
+    def compile(self, query, threshold=2):
+        compile_dialect = dialect()
+        compile_dialect.external_in_threshold = threshold
+        compiled = query.compile(dialect=compile_dialect)
+        return compiled._process_parameters_for_postcompile()
+
+    def test_externalized(self):
+        query = select(self.table.c.x).where(
+            self.table.c.x.in_([1, 2, 3]), self.table.c.y.in_(['a'])
+        )
+
+        state = self.compile(query)
+        self.assertEqual(
+            state.statement,
+            'SELECT t.x \nFROM t \nWHERE t.x IN (SELECT x FROM _ext_x_1) '
+            'AND t.y IN (%(y_1_1)s)'
+        )
+        self.assertEqual(state.parameter_expansion['x_1'], [
+            'x_1_1', 'x_1_2', 'x_1_3'
+        ])
+
+    def test_disabled(self):
+        query = select(self.table.c.x).where(self.table.c.x.in_([1, 2, 3]))
+
+        state = self.compile(query, threshold=None)
+        self.assertIn('IN (%(x_1_1)s, %(x_1_2)s, %(x_1_3)s)', state.statement)
+
+    def test_external_type(self):
+        compile_dialect = dialect()
+        # Generic INTEGER is Int32 on server.
+        self.assertEqual(
+            get_external_type(Integer(), compile_dialect), 'Int64'
+        )
+        self.assertEqual(
+            get_external_type(BigInteger(), compile_dialect), 'Int64'
+        )
+        self.assertEqual(
+            get_external_type(types.UInt64(), compile_dialect), 'UInt64'
+        )
+        self.assertEqual(
+            get_external_type(types.Int32(), compile_dialect), 'Int32'
+        )
+
+    def test_tuples_inline(self):
+        query = select(self.table.c.x).where(
+            tuple_(self.table.c.x, self.table.c.y).in_(
+                [(1, 'a'), (2, 'b'), (3, 'c')]
+            )
+        )
+
+        state = self.compile(query)
+        self.assertNotIn('_ext_', state.statement)
+
+
+class ExternalTablesNativeTestCase(NativeSessionTestCase):
+    def make_table(self, data):
+        return Table(
+            'ext', MetaData(), Column('x', types.UInt64),
+            bytehouse_data=data
+        )
+
+    def test_iterator(self):
+        batches = ([(i, ) for i in range(j, j + 1000)] for j in (0, 1000))
+        table = self.make_table(batches)
+
+        rv = self.session.execute(
+            select(func.count(), func.sum(table.c.x)),
+            execution_options={'external_tables': [table]}
+        )
+        self.assertEqual(rv.fetchall(), [(2000, sum(range(2000)))])
+
+    def test_numpy(self):
+        table = self.make_table({'x': numpy.arange(10, dtype='uint64')})
+        rv = self.session.execute(
+            select(func.sum(table.c.x)),
+            execution_options={'external_tables': [table]}
+        )
+        self.assertEqual(rv.scalar(), 45)
+
+
+class ExternalInNativeTestCase(NativeSessionTestCase):
+    def test_long_in(self):
+        dialect = self.session.bind.dialect
+        dialect.external_in_threshold = 10
+        self.addCleanup(setattr, dialect, 'external_in_threshold', None)
+
+        numbers = func.numbers(100).table_valued(
+            column('number', types.UInt64)
+        )
+        query = select(func.count()).select_from(numbers).where(
+            numbers.c.number.in_(list(range(0, 100, 2)))
+        )
+        self.assertEqual(self.session.execute(query).scalar(), 50)
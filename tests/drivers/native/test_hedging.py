@@ -0,0 +1,186 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from time import sleep, time
+from unittest import TestCase, mock
+from uuid import uuid4
+
+from bytehouse_driver.errors import Error as DriverError
+from sqlalchemy import text
+
+from bytehouse_sqlalchemy.drivers.native.connector import Cursor
+from bytehouse_sqlalchemy.drivers.native.hedging import (
+    Hedge, get_hedge_host, get_hedge_query_id
+)
+from tests.testcase import NativeSessionTestCase
+
+
+class Transport(object):
+    deadline = None
+
+    def __init__(self, name, delay, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.queries = 0
+        self.start_query()
+
+    def start_query(self, deadline=None):
+        self.cancel_requested = False
+        self.cancelled = None
+
+    def request_cancel(self):
+        self.cancel_requested = True
+
+    def execute(self):
+        self.queries += 1
+        end = time() + self.delay
+        while time() < end:
+            if self.cancel_requested:
+                self.cancelled = 'Query was cancelled'
+                return None
+            sleep(0.005)
+
+        if self.fail:
+            raise DriverError('Host is down')
+        return self.name
+
+
+class HedgeTestCase(TestCase):
+    def run_hedge(self, primary, secondary, delay=0.1):
+        hedge = Hedge(
+            primary, secondary, delay, lambda transport: transport.execute()
+        )
+        rv = hedge.run()
+        hedge.join()
+        return rv
+
+    def test_fast(self):
+        primary, secondary = Transport('a', 0.01), Transport('b', 0.01)
+
+        self.assertEqual(self.run_hedge(primary, secondary), ('a', False))
+        self.assertEqual(secondary.queries, 0)
+
+    def test_hedged(self):
+        primary, secondary = Transport('a', 2), Transport('b', 0.01)
+
+        start = time()
+        self.assertEqual(self.run_hedge(primary, secondary), ('b', True))
+        self.assertLess(time() - start, 1)
+        self.assertEqual(primary.cancelled, 'Query was cancelled')
+
+    def test_hedge_lost(self):
+        primary, secondary = Transport('a', 0.2), Transport('b', 2)
+
+        self.assertEqual(self.run_hedge(primary, secondary), ('a', False))
+        self.assertEqual(secondary.queries, 1)
+        self.assertEqual(secondary.cancelled, 'Query was cancelled')
+
+    def test_primary_failed(self):
+        primary = Transport('a', 0.2, fail=True)
+        secondary = Transport('b', 0.2)
+
+        self.assertEqual(self.run_hedge(primary, secondary), ('b', True))
+
+        primary = Transport('a', 0.01, fail=True)
+        with self.assertRaises(DriverError):
+            self.run_hedge(primary, secondary)
+
+    def test_hosts(self):
+        url = 'bytehouse://u:p@a:9000/db?alt_hosts=b:9000,c&secure=false'
+        self.assertEqual(get_hedge_host(url, 'a'), 'b:9000')
+        self.assertEqual(get_hedge_host(url, 'c'), 'a:9000')
+        self.assertEqual(get_hedge_host(url, 'x'), 'a:9000')
+        self.assertEqual(get_hedge_host('bytehouse://a/db', 'a'), 'a')
+        self.assertIsNone(get_hedge_host('bytehouse:///db?region=x', 'a'))
+
+
+class HedgeQueryIdTestCase(TestCase):
+    def run_hedged(self, query_id, hedge_won):
+        connection = mock.Mock()
+        hedge_transport = mock.Mock()
+        hedge_transport.execute.return_value = 'b'
+
+        def make_hedge(delay, execute_on):
+            hedge = mock.Mock()
+            primary = execute_on(connection.transport)
+            secondary = execute_on(hedge_transport)
+            hedge.run.return_value = (
+                (secondary, True) if hedge_won else (primary, False)
+            )
+            return hedge
+
+        connection.make_hedge.side_effect = make_hedge
+        connection.transport.cancelled = None
+        execute = mock.Mock(return_value='a')
+
+        cursor = Cursor(connection)
+        cursor._query_id = query_id
+        rv = cursor._run_hedged(
+            execute, 0.1, 'SELECT 1', None,
+            {'query_id': query_id, 'settings': None}
+        )
+        return rv, cursor, execute, hedge_transport
+
+    def test_derived_id(self):
+        rv, cursor, execute, hedge_transport = self.run_hedged('q1', False)
+        self.assertEqual(rv, 'a')
+        self.assertEqual(execute.call_args[1]['query_id'], 'q1')
+        self.assertEqual(
+            hedge_transport.execute.call_args[1]['query_id'], 'q1-hedge'
+        )
+        self.assertEqual(cursor.query_id, 'q1')
+
+    def test_hedge_won(self):
+        rv, cursor, _, _ = self.run_hedged('q1', True)
+        self.assertEqual(rv, 'b')
+        self.assertEqual(cursor.query_id, 'q1-hedge')
+
+    def test_no_id(self):
+        _, cursor, _, hedge_transport = self.run_hedged(None, True)
+        self.assertIsNone(hedge_transport.execute.call_args[1]['query_id'])
+        self.assertIsNone(cursor.query_id)
+        self.assertIsNone(get_hedge_query_id(None))
+
+
+class HedgeNativeTestCase(NativeSessionTestCase):
+    def test_hedged(self):
+        connection = self.session.connection().execution_options(
+            hedge_after=0.1
+        )
+        rv = connection.execute(text('SELECT sleep(0.5), 1')).fetchall()
+        self.assertEqual(rv, [(0, 1)])
+
+        rv = connection.execute(text('SELECT 2')).scalar()
+        self.assertEqual(rv, 2)
+
+    def test_hedged_query_id(self):
+        query_id = str(uuid4())
+        connection = self.session.connection().execution_options(
+            hedge_after=0.1, query_id=query_id
+        )
+        rv = connection.execute(text('SELECT sleep(0.5), 1'))
+        self.assertEqual(rv.fetchall(), [(0, 1)])
+        self.assertIn(rv.cursor.query_id, (query_id, query_id + '-hedge'))
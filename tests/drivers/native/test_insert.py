@@ -24,8 +24,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import itertools
 import unittest
 
+import numpy
 from sqlalchemy import Column, func
 
 from bytehouse_sqlalchemy import engines, types, Table
@@ -81,3 +83,73 @@ class NativeInsertTestCase(NativeSessionTestCase):
             'Repeat query with types_check=True for detailed info',
             str(ex.exception.orig)
         )
+
+    def test_insert_columns(self):
+        table = Table(
+            'test', self.metadata(),
+            Column('x', types.Int32, primary_key=True),
+            Column('y', types.Nullable(types.Float64)),
+            Column('z', types.Int32, default=7),
+            engines.CnchMergeTree(
+                order_by=func.tuple()
+            )
+        )
+        with self.create_table(table):
+            y = numpy.ma.masked_array(
+                [0.5, 1.5, 2.5], mask=[False, True, False]
+            )
+            rv = table.insert_columns(
+                {'x': numpy.arange(3, dtype='int32'), 'y': y},
+                bind=self.session.bind
+            )
+            self.assertEqual(rv, 3)
+
+            rv = self.session.execute(
+                table.insert().execution_options(insert_columns=True),
+                {'x': [3, 4], 'y': [None, 4.5], 'z': [1, 2]}
+            )
+            self.assertEqual(rv.rowcount, 2)
+
+            rows = self.session.query(table.c.x, table.c.y, table.c.z) \
+                .order_by(table.c.x).all()
+            self.assertEqual(rows, [
+                (0, 0.5, 7), (1, None, 7), (2, 2.5, 7),
+                (3, None, 1), (4, 4.5, 2)
+            ])
+
+    def test_insert_columns_callable_default(self):
+        counter = itertools.count()
+        table = Table(
+            'test', self.metadata(),
+            Column('x', types.Int32, primary_key=True),
+            Column('y', types.Int32, default=lambda: next(counter)),
+            engines.CnchMergeTree(
+                order_by=func.tuple()
+            )
+        )
+        with self.create_table(table):
+            table.insert_columns({'x': [0, 1, 2]}, bind=self.session.bind)
+
+            rows = self.session.query(table.c.y).order_by(table.c.x).all()
+            self.assertEqual(len({y for y, in rows}), 3)
+
+    def test_columnar_rows(self):
+        table = Table(
+            'test', self.metadata(),
+            Column('x', types.Int32, primary_key=True),
+            engines.CnchMergeTree(
+                order_by=func.tuple()
+            )
+        )
+        with self.create_table(table):
+            # Columnar fetch option leaves INSERT of rows row-wise.
+            connection = self.session.connection().execution_options(
+                columnar=True
+            )
+            rv = connection.execute(table.insert(), [{'x': 1}, {'x': 2}])
+            self.assertEqual(rv.rowcount, 2)
+            rv = connection.execute(table.insert(), {'x': 3})
+            self.assertEqual(rv.rowcount, 1)
+
+            rows = self.session.query(table.c.x).order_by(table.c.x).all()
+            self.assertEqual(rows, [(1, ), (2, ), (3, )])
@@ -0,0 +1,106 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from unittest import TestCase
+
+from bytehouse_sqlalchemy.drivers.native import metrics
+from bytehouse_sqlalchemy.drivers.native.metrics import (
+    MetricsRegistry, statement_kind
+)
+from tests.testcase import NativeSessionTestCase
+
+
+class StatementKindTestCase(TestCase):
+    def test_kinds(self):
+        self.assertEqual(statement_kind('SELECT 1'), 'select')
+        self.assertEqual(statement_kind('\n  with 1 AS x SELECT x'), 'select')
+        self.assertEqual(statement_kind('INSERT INTO t VALUES'), 'insert')
+        self.assertEqual(statement_kind('CREATE TABLE t'), 'ddl')
+        self.assertEqual(statement_kind('DESCRIBE TABLE t'), 'show')
+        self.assertEqual(statement_kind('KILL QUERY'), 'other')
+        self.assertEqual(statement_kind(''), 'other')
+
+
+class RegistryTestCase(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter('c_total', 'Counter.', ('kind', ))
+        counter.inc(labels=('a', ))
+        counter.inc(2, labels=('a', ))
+        counter.inc(labels=('b"', ))
+
+        self.assertEqual(counter.get(('a', )), 3)
+        self.assertEqual(
+            self.registry.expose(),
+            '# HELP c_total Counter.\n'
+            '# TYPE c_total counter\n'
+            'c_total{kind="a"} 3\n'
+            'c_total{kind="b\\""} 1\n'
+        )
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('h', 'Histogram.', buckets=(1, 2))
+        histogram.observe(0.5)
+        histogram.observe(1)
+        histogram.observe(3)
+
+        self.assertEqual(histogram.get_count(), 3)
+        self.assertEqual(histogram.get_sum(), 4.5)
+        self.assertEqual(
+            self.registry.expose(),
+            '# HELP h Histogram.\n'
+            '# TYPE h histogram\n'
+            'h_bucket{le="1"} 2\n'
+            'h_bucket{le="2"} 2\n'
+            'h_bucket{le="+Inf"} 3\n'
+            'h_sum 4.5\n'
+            'h_count 3\n'
+        )
+
+    def test_reset(self):
+        counter = self.registry.counter('c_total', 'Counter.')
+        counter.inc()
+        self.registry.reset()
+
+        self.assertEqual(counter.get(), 0)
+
+
+class MetricsTestCase(NativeSessionTestCase):
+    def test_select(self):
+        queries = metrics.queries.get(('select', ))
+        fetched = metrics.rows_fetched.get()
+
+        self.session.execute(
+            'SELECT number FROM system.numbers LIMIT 10'
+        ).fetchall()
+
+        self.assertEqual(metrics.queries.get(('select', )), queries + 1)
+        self.assertEqual(metrics.rows_fetched.get(), fetched + 10)
+        self.assertIn(
+            'bytehouse_query_duration_seconds_count{kind="select"}',
+            metrics.snapshot()
+        )
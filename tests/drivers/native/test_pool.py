@@ -0,0 +1,219 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from unittest import TestCase
+
+from bytehouse_sqlalchemy.drivers.native.balancing import (
+    HostStats, get_policy
+)
+from bytehouse_sqlalchemy.drivers.native.connector import pin_host
+from bytehouse_sqlalchemy.drivers.native.pool import (
+    HostPool, get_connect_host, prewarm
+)
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.host = get_connect_host()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        pass
+
+
+class PinHostTestCase(TestCase):
+    def test_pin_host(self):
+        url = 'bytehouse://u:p@h1:9000/db?alt_hosts=h2:9000&secure=false'
+        self.assertEqual(
+            pin_host(url, 'h2:9000'),
+            'bytehouse://u:p@h2:9000/db?secure=false'
+        )
+
+    def test_pin_host_no_auth(self):
+        url = 'bytehouse://h1/db?round_robin=true&alt_hosts=h2'
+        self.assertEqual(pin_host(url, 'h2'), 'bytehouse://h2/db')
+
+
+class HostPoolTestCase(TestCase):
+    def test_hosts_in_turn(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2'])
+
+        connections = [pool.connect() for _ in range(4)]
+        self.assertEqual(
+            [c.dbapi_connection.host for c in connections],
+            ['h1', 'h2', 'h1', 'h2']
+        )
+        self.assertEqual(pool.checkedout(), 4)
+
+        for c in connections:
+            c.close()
+        self.assertEqual(pool.checkedin(), 4)
+        self.assertIsNone(get_connect_host())
+
+    def test_prefer_idle(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2'])
+
+        c1 = pool.connect()
+        c2 = pool.connect()
+        dbapi_connection = c2.dbapi_connection
+        c2.close()
+
+        c3 = pool.connect()
+        self.assertIs(c3.dbapi_connection, dbapi_connection)
+        c1.close()
+        c3.close()
+
+    def test_prewarm(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2', 'h3'])
+        prewarm(pool, 3)
+
+        self.assertEqual(
+            [p.checkedin() for p in pool.pools.values()], [1, 1, 1]
+        )
+
+    def test_invalidate_host(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2'])
+        prewarm(pool, 2)
+
+        c1 = pool.connect()
+        c2 = pool.connect()
+        h1_connection = c1.dbapi_connection
+        h2_connection = c2.dbapi_connection
+        c1.close()
+
+        pool._invalidate(c2)
+        self.assertTrue(h2_connection.closed)
+
+        c1 = pool.connect()
+        c2 = pool.connect()
+        self.assertIs(c1.dbapi_connection, h1_connection)
+        self.assertIsNot(c2.dbapi_connection, h2_connection)
+        self.assertEqual(c2.dbapi_connection.host, 'h2')
+        self.assertFalse(h1_connection.closed)
+
+    def test_dispose(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2'])
+        prewarm(pool, 2)
+        connections = [
+            record.dbapi_connection
+            for p in pool.pools.values() for record in list(p._pool.queue)
+        ]
+
+        pool.dispose()
+        self.assertTrue(all(c.closed for c in connections))
+        self.assertEqual(pool.checkedin(), 0)
+
+
+class HostStatsTestCase(TestCase):
+    def test_latency(self):
+        stats = HostStats('h1', decay=0.5)
+        stats.observe(1.0)
+        stats.observe(3.0)
+
+        self.assertEqual(stats.latency, 2.0)
+        self.assertEqual(stats.queries, 2)
+
+    def test_eject(self):
+        stats = HostStats('h1', max_failures=2, eject_time=60)
+        stats.record_failure()
+        self.assertFalse(stats.ejected)
+
+        stats.record_failure()
+        self.assertTrue(stats.ejected)
+        self.assertEqual(stats.errors, 2)
+
+        # Failed probe ejects for longer.
+        stats.ejected_until = 0
+        stats.record_failure()
+        self.assertGreater(stats.ejected_until, 0)
+        self.assertEqual(stats.ejections, 2)
+
+        stats.ejected_until = 0
+        stats.observe(0.1)
+        self.assertFalse(stats.ejected)
+        self.assertEqual((stats.failures, stats.ejections), (0, 0))
+
+
+class LoadBalancingTestCase(TestCase):
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            get_policy('random')
+
+    def test_least_outstanding(self):
+        pool = HostPool(
+            FakeConnection, hosts=['h1', 'h2', 'h3'],
+            policy='least_outstanding'
+        )
+
+        connections = [pool.connect() for _ in range(6)]
+        self.assertEqual(
+            sorted(pool.host_stats()[h]['outstanding'] for h in pool.pools),
+            [2, 2, 2]
+        )
+
+        host = connections[0].dbapi_connection.host
+        for c in connections:
+            if c.dbapi_connection.host == host:
+                c.close()
+        self.assertEqual(pool.connect().dbapi_connection.host, host)
+
+    def test_ewma(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2'], policy='ewma')
+        pool.pools['h1'].stats.observe(0.5)
+        pool.pools['h2'].stats.observe(0.1)
+
+        connections = [pool.connect() for _ in range(3)]
+        self.assertEqual(
+            [c.dbapi_connection.host for c in connections],
+            ['h2', 'h2', 'h2']
+        )
+
+        # Queries in flight add up.
+        connections.extend(pool.connect() for _ in range(3))
+        self.assertIn(
+            'h1', [c.dbapi_connection.host for c in connections[3:]]
+        )
+
+    def test_ejected_host(self):
+        pool = HostPool(FakeConnection, hosts=['h1', 'h2'])
+        pool.pools['h1'].stats.ejected_until = float('inf')
+
+        connections = [pool.connect() for _ in range(3)]
+        self.assertEqual(
+            {c.dbapi_connection.host for c in connections}, {'h2'}
+        )
+        self.assertTrue(pool.host_stats()['h1']['ejected'])
+
+    def test_stats_on_connection(self):
+        pool = HostPool(FakeConnection, hosts=['h1'])
+        connection = pool.connect()
+
+        self.assertIs(
+            connection.dbapi_connection.stats, pool.pools['h1'].stats
+        )
@@ -0,0 +1,127 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from unittest import TestCase
+
+from bytehouse_sqlalchemy.drivers.native.streaming import BlockStream
+from bytehouse_sqlalchemy.exceptions import QueryCancelledException
+
+
+class Block(object):
+    columns_with_types = [('x', 'UInt64')]
+
+    def __init__(self, num_rows):
+        self.num_rows = num_rows
+
+
+class Packet(object):
+    def __init__(self, block=None):
+        self.block = block
+
+
+class Wire(object):
+    def __init__(self, transport):
+        self.transport = transport
+        self.is_query_executing = True
+
+    def send_cancel(self):
+        self.transport.cancel_sent = True
+
+
+class Transport(object):
+    def __init__(self, sizes, fail=False):
+        self.connection = Wire(self)
+        self.cancelled = None
+        self.cancel_sent = self.disconnected = False
+        self.received = 0
+        self.sizes = sizes
+        self.fail = fail
+
+    def packet_generator(self):
+        yield Packet()
+        for size in self.sizes:
+            if self.cancel_sent and self.fail:
+                raise OSError('Connection reset')
+            self.received += 1
+            yield Packet(Block(size))
+        self.connection.is_query_executing = False
+
+    def disconnect(self):
+        self.disconnected = True
+        self.connection.is_query_executing = False
+
+
+class BlockStreamTestCase(TestCase):
+    def make_stream(self, transport):
+        stream = BlockStream(transport, transport.packet_generator())
+        stream.read_header()
+        return stream
+
+    def test_blocks(self):
+        transport = Transport([2, 0, 3])
+        stream = self.make_stream(transport)
+
+        self.assertEqual(stream.columns_with_types, [('x', 'UInt64')])
+        self.assertEqual([x.num_rows for x in stream], [2, 3])
+        self.assertTrue(stream.finished)
+
+        stream.cancel()
+        self.assertFalse(transport.cancel_sent)
+
+    def test_cancel(self):
+        transport = Transport([2, 2, 2, 2])
+        stream = self.make_stream(transport)
+        next(stream)
+
+        stream.cancel()
+        self.assertTrue(transport.cancel_sent)
+        self.assertFalse(transport.disconnected)
+        self.assertEqual(transport.received, 4)
+        self.assertFalse(transport.connection.is_query_executing)
+        self.assertEqual(list(stream), [])
+
+    def test_cancel_error(self):
+        transport = Transport([2, 2, 2], fail=True)
+        stream = self.make_stream(transport)
+
+        stream.cancel()
+        self.assertTrue(transport.cancel_sent)
+        self.assertTrue(transport.disconnected)
+
+    def test_empty(self):
+        transport = Transport([])
+        stream = self.make_stream(transport)
+
+        self.assertTrue(stream.finished)
+        stream.cancel()
+        self.assertFalse(transport.cancel_sent)
+
+    def test_cancelled(self):
+        transport = Transport([2, 2])
+        stream = self.make_stream(transport)
+        transport.cancelled = 'Query was cancelled'
+
+        with self.assertRaises(QueryCancelledException):
+            list(stream)
@@ -0,0 +1,98 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from unittest import TestCase
+
+from bytehouse_sqlalchemy.drivers.native.tracing import (
+    InMemorySpanExporter, Tracer
+)
+from bytehouse_sqlalchemy.exceptions import DatabaseException
+from tests.testcase import NativeSessionTestCase
+
+
+class TracerTestCase(TestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer = Tracer(self.exporter)
+
+    def test_span(self):
+        with self.tracer.start_span('test', {'a': 1}) as span:
+            span.set_attribute('b', 2)
+            self.assertEqual(self.exporter.get_finished_spans(), [])
+
+        span, = self.exporter.get_finished_spans()
+        self.assertEqual(span.name, 'test')
+        self.assertEqual(span.attributes, {'a': 1, 'b': 2})
+        self.assertGreaterEqual(span.end_time, span.start_time)
+        self.assertIsNone(span.exception)
+
+        self.exporter.clear()
+        self.assertEqual(self.exporter.get_finished_spans(), [])
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.start_span('test'):
+                raise ValueError('test')
+
+        span, = self.exporter.get_finished_spans()
+        self.assertIsInstance(span.exception, ValueError)
+
+
+class QueryTracingTestCase(NativeSessionTestCase):
+    def setUp(self):
+        super(QueryTracingTestCase, self).setUp()
+        self.exporter = InMemorySpanExporter()
+        self.connection = self.session.connection().execution_options(
+            tracer=Tracer(self.exporter)
+        )
+
+    def test_generated_query_id(self):
+        rv = self.connection.execute('SELECT 1')
+
+        span, = self.exporter.get_finished_spans()
+        self.assertEqual(span.name, 'bytehouse.select')
+        self.assertEqual(span.attributes['db.statement'], 'SELECT 1')
+        self.assertEqual(
+            span.attributes['db.bytehouse.query_id'], rv.cursor.query_id
+        )
+        self.assertEqual(span.attributes['db.bytehouse.rowcount'], 1)
+
+    def test_query_id(self):
+        rv = self.connection.execution_options(
+            query_id='test-query-id'
+        ).execute('SELECT 1')
+
+        self.assertEqual(rv.cursor.query_id, 'test-query-id')
+        span, = self.exporter.get_finished_spans()
+        self.assertEqual(
+            span.attributes['db.bytehouse.query_id'], 'test-query-id'
+        )
+
+    def test_error(self):
+        with self.assertRaises(DatabaseException):
+            self.connection.execute('SELECT unknown_column')
+
+        span, = self.exporter.get_finished_spans()
+        self.assertIsInstance(span.exception, DatabaseException)
@@ -0,0 +1,224 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+import pandas as pd
+from sqlalchemy import Column, func
+
+from bytehouse_sqlalchemy import types, engines, Table
+from bytehouse_sqlalchemy.drivers.native.base import dialect
+from bytehouse_sqlalchemy.ext.dataframe import (
+    column_to_series, insert_frame, insert_frame_columns, read_frame,
+    series_to_column
+)
+from tests.testcase import NativeSessionTestCase
+
+
+class ColumnToSeriesTestCase(TestCase):
+    def test_nullable_int(self):
+        rv = column_to_series([1, None, 3], 'Nullable(UInt16)')
+        self.assertEqual(str(rv.dtype), 'UInt16')
+        self.assertTrue(rv.isna()[1])
+
+    def test_low_cardinality(self):
+        rv = column_to_series(['a', 'b', 'a'], 'LowCardinality(String)')
+        self.assertEqual(str(rv.dtype), 'category')
+
+    def test_array_of_low_cardinality(self):
+        rv = column_to_series(
+            [['a', 'b'], ['a']], 'Array(LowCardinality(String))'
+        )
+        self.assertEqual(rv.dtype, object)
+        self.assertEqual(rv.tolist(), [['a', 'b'], ['a']])
+
+    def test_datetime64(self):
+        rv = column_to_series(
+            [datetime(2023, 1, 1), None], 'Nullable(DateTime64(3))'
+        )
+        self.assertEqual(rv.dtype.kind, 'M')
+        self.assertTrue(rv.isna()[1])
+
+    def test_date(self):
+        rv = column_to_series([date(2023, 1, 1)], 'Date')
+        self.assertEqual(rv[0], pd.Timestamp('2023-01-01'))
+
+    def test_decimal(self):
+        rv = column_to_series([Decimal('1.50')], 'Decimal(9, 2)')
+        self.assertEqual(rv[0], Decimal('1.50'))
+
+
+class SeriesToColumnTestCase(TestCase):
+    def test_nullable(self):
+        rv = series_to_column(
+            pd.Series([1, None], dtype='Int64'), 'Nullable(Int32)'
+        )
+        self.assertEqual(rv, [1, None])
+
+    def test_categorical(self):
+        rv = series_to_column(
+            pd.Series(['a', 'b'], dtype='category'), 'LowCardinality(String)'
+        )
+        self.assertEqual(rv, ['a', 'b'])
+
+    def test_tz_aware_datetime64(self):
+        series = pd.Series(
+            pd.to_datetime(['2020-01-01 00:00:01.5']).tz_localize('UTC')
+        )
+        self.assertEqual(
+            series_to_column(series, "DateTime64(3, 'UTC')"),
+            [1577836801500]
+        )
+        self.assertEqual(
+            series_to_column(series, "DateTime('UTC')"), [1577836801]
+        )
+
+
+class InsertFrameTestCase(TestCase):
+    types = {'x': 'Nullable(Int32)', 'y': 'LowCardinality(String)'}
+
+    def make_table(self, frame, index=None):
+        return SimpleNamespace(
+            name='test', schema=None, frame=frame, index=index
+        )
+
+    def make_connection(self, cursor):
+        connection = mock.Mock(dialect=dialect())
+        connection.connection.cursor.return_value = cursor
+        return connection
+
+    def test_typed_columns(self):
+        cursor = mock.Mock(rowcount=3)
+        connection = self.make_connection(cursor)
+        frame = pd.DataFrame({
+            'x': pd.array([1, None, 3], dtype='Int32'),
+            'y': pd.Categorical(['a', 'b', 'a'])
+        })
+        pd_table = self.make_table(frame)
+
+        with mock.patch(
+            'bytehouse_sqlalchemy.ext.dataframe._get_column_types',
+            return_value=self.types
+        ):
+            rv = insert_frame(
+                pd_table, connection, ['x', 'y'], iter([(1, 'a'), (2, 'b')])
+            )
+            self.assertEqual(rv, 3)
+            # Whole frame is sent once, later chunks are skipped.
+            rv = insert_frame(
+                pd_table, connection, ['x', 'y'], iter([(3, 'a')])
+            )
+            self.assertEqual(rv, 0)
+
+        cursor.insert_columns.assert_called_once_with(
+            'INSERT INTO test (x, y) VALUES',
+            [[1, None, 3], ['a', 'b', 'a']]
+        )
+        cursor.close.assert_called_once_with()
+
+    def test_index(self):
+        cursor = mock.Mock(rowcount=2)
+        connection = self.make_connection(cursor)
+        frame = pd.DataFrame({'y': ['a', 'b']}, index=pd.Index([1, 2]))
+        pd_table = self.make_table(frame, index=['x'])
+
+        with mock.patch(
+            'bytehouse_sqlalchemy.ext.dataframe._get_column_types',
+            return_value=self.types
+        ):
+            insert_frame(pd_table, connection, ['x', 'y'], iter([]))
+
+        cursor.insert_columns.assert_called_once_with(
+            'INSERT INTO test (x, y) VALUES', [[1, 2], ['a', 'b']]
+        )
+
+    def test_cursor_closed_on_error(self):
+        cursor = mock.Mock()
+        cursor.insert_columns.side_effect = ValueError
+        connection = self.make_connection(cursor)
+        pd_table = self.make_table(pd.DataFrame({'x': [1]}))
+
+        with mock.patch(
+            'bytehouse_sqlalchemy.ext.dataframe._get_column_types',
+            return_value=self.types
+        ):
+            with self.assertRaises(ValueError):
+                insert_frame(pd_table, connection, ['x'], iter([(1, )]))
+        cursor.close.assert_called_once_with()
+
+
+class DataFrameTestCase(NativeSessionTestCase):
+    table = Table(
+        'test', NativeSessionTestCase.metadata(),
+        Column('x', types.Nullable(types.Int32), primary_key=True),
+        Column('y', types.LowCardinality(types.String)),
+        Column('z', types.Decimal(9, 2)),
+        engines.CnchMergeTree(
+            order_by=func.tuple()
+        )
+    )
+
+    def test_insert_read(self):
+        frame = pd.DataFrame({
+            'x': pd.array([1, None], dtype='Int32'),
+            'y': pd.Categorical(['a', 'b']),
+            'z': [Decimal('1.5'), Decimal('2.25')]
+        })
+
+        with self.create_table(self.table):
+            connection = self.session.connection()
+            rv = insert_frame_columns(connection, 'test', frame)
+            self.assertEqual(rv, 2)
+
+            query = self.table.select().order_by(self.table.c.z)
+            rv = read_frame(query, connection)
+            self.assertEqual(list(rv.columns), ['x', 'y', 'z'])
+            self.assertEqual(str(rv['x'].dtype), 'Int32')
+            self.assertEqual(str(rv['y'].dtype), 'category')
+            self.assertEqual(
+                rv['z'].tolist(), [Decimal('1.5'), Decimal('2.25')]
+            )
+
+    def test_to_sql(self):
+        frame = pd.DataFrame({
+            'x': pd.array([1, 2, 3], dtype='Int32'),
+            'y': ['a', 'b', 'c'],
+            'z': [Decimal('1.5'), Decimal('2.25'), Decimal('3')]
+        })
+
+        with self.create_table(self.table):
+            connection = self.session.connection()
+            rv = frame.to_sql(
+                'test', connection, if_exists='append', index=False,
+                method=insert_frame, chunksize=2
+            )
+            self.assertEqual(rv, 3)
+
+            rv = read_frame(self.table.select(), connection)
+            self.assertEqual(sorted(rv['x'].tolist()), [1, 2, 3])
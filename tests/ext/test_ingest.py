@@ -0,0 +1,177 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Lock
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+from sqlalchemy import Column, MetaData, func
+from sqlalchemy.pool import NullPool, QueuePool, SingletonThreadPool
+
+from bytehouse_sqlalchemy import engines, types, Table
+from bytehouse_sqlalchemy.ext.ingest import parallel_insert
+from tests.testcase import NativeSessionTestCase
+
+
+class StubEngine(object):
+    """
+    Records executed blocks, blocks containing ``fail`` value raise.
+    """
+
+    def __init__(self, pool=None, fail=None):
+        self.pool = pool or NullPool(lambda: None)
+        self.fail = fail
+        self.blocks = []
+        self.lock = Lock()
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def execute(self, stmt, block):
+        values = block['x'] if isinstance(block, dict) else \
+            [row['x'] for row in block]
+        with self.lock:
+            self.blocks.append(values)
+        if self.fail in values:
+            raise ValueError(self.fail)
+        # Server may report fewer rows, e.g. deduplicated ones.
+        return SimpleNamespace(rowcount=len(set(values)))
+
+
+class ParallelInsertStubTestCase(TestCase):
+    table = Table(
+        'test', MetaData(),
+        Column('x', types.UInt32, primary_key=True),
+        engines.CnchMergeTree(
+            order_by=func.tuple()
+        )
+    )
+
+    def test_blocks(self):
+        engine = StubEngine()
+        rv = parallel_insert(
+            engine, self.table, {'x': list(range(10))}, block_size=4
+        )
+
+        self.assertEqual(sorted(engine.blocks), [
+            [0, 1, 2, 3], [4, 5, 6, 7], [8, 9]
+        ])
+        self.assertEqual([b.offset for b in rv.blocks], [0, 4, 8])
+        self.assertEqual([b.rows for b in rv.blocks], [4, 4, 2])
+        self.assertEqual(rv.rows_written, 10)
+
+    def test_rows_written(self):
+        engine = StubEngine(fail=-1)
+        data = [{'x': x} for x in [1, 1, 2, 3, -1]]
+        rv = parallel_insert(engine, self.table, data, block_size=2)
+
+        self.assertEqual([b.rowcount for b in rv.blocks], [1, 2, 0])
+        self.assertEqual(rv.rows_written, 3)
+
+    def test_errors(self):
+        engine = StubEngine(fail=5)
+        rv = parallel_insert(
+            engine, self.table, [{'x': x} for x in range(8)], block_size=3
+        )
+
+        self.assertEqual([b.index for b in rv.errors], [1])
+        self.assertIsInstance(rv.errors[0].error, ValueError)
+        self.assertEqual(rv.rows_written, 5)
+        with self.assertRaises(ValueError):
+            rv.raise_for_errors()
+
+    def assertWorkers(self, engine, expected, **kwargs):
+        with mock.patch(
+            'bytehouse_sqlalchemy.ext.ingest.ThreadPoolExecutor',
+            wraps=ThreadPoolExecutor
+        ) as executor:
+            parallel_insert(engine, self.table, [{'x': 1}], **kwargs)
+        executor.assert_called_once_with(max_workers=expected)
+
+    def test_workers(self):
+        def creator():
+            return None
+
+        self.assertWorkers(StubEngine(QueuePool(creator, pool_size=3)), 3)
+        self.assertWorkers(
+            StubEngine(SingletonThreadPool(creator, pool_size=4)), 4
+        )
+        self.assertWorkers(StubEngine(NullPool(creator)), 1)
+        self.assertWorkers(StubEngine(), 2, max_workers=2)
+
+
+class ParallelInsertTestCase(NativeSessionTestCase):
+    table = Table(
+        'test', NativeSessionTestCase.metadata(),
+        Column('x', types.UInt32, primary_key=True),
+        engines.CnchMergeTree(
+            order_by=func.tuple()
+        )
+    )
+
+    def count(self):
+        return self.session.query(func.count()).select_from(self.table) \
+            .scalar()
+
+    def test_rows(self):
+        with self.create_table(self.table):
+            rv = parallel_insert(
+                self.session.bind, self.table,
+                [{'x': x} for x in range(10)], block_size=3, max_workers=2
+            )
+
+            self.assertEqual(rv.rows_written, 10)
+            self.assertEqual([b.rows for b in rv.blocks], [3, 3, 3, 1])
+            self.assertEqual([b.offset for b in rv.blocks], [0, 3, 6, 9])
+            self.assertEqual(rv.errors, [])
+            self.assertEqual(self.count(), 10)
+
+    def test_columns(self):
+        with self.create_table(self.table):
+            rv = parallel_insert(
+                self.session.bind, self.table, {'x': list(range(10))},
+                block_size=4
+            )
+
+            self.assertEqual(rv.rows_written, 10)
+            self.assertEqual(len(rv.blocks), 3)
+            self.assertEqual(self.count(), 10)
+
+    def test_block_errors(self):
+        with self.create_table(self.table):
+            data = [{'x': x} for x in range(4)] + [{'x': -1}]
+            rv = parallel_insert(
+                self.session.bind, self.table, data, block_size=4
+            )
+
+            self.assertEqual(rv.rows_written, 4)
+            self.assertEqual([b.index for b in rv.errors], [1])
+            with self.assertRaises(Exception):
+                rv.raise_for_errors()
+            self.assertEqual(self.count(), 4)
@@ -0,0 +1,187 @@
+"""
+This is the MIT license: http://www.opensource.org/licenses/mit-license.php
+
+Copyright (c) 2017 by Konstantin Lebedev.
+
+Copyright 2022- 2023 Bytedance Ltd. and/or its affiliates
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import time
+from unittest import TestCase, mock
+
+from sqlalchemy import Column, func
+from sqlalchemy.orm import Session
+
+from bytehouse_sqlalchemy import engines, get_declarative_base, types
+from bytehouse_sqlalchemy.ext.timing import (
+    HydratingResult, QueryTiming, TimingListener, enable_timing
+)
+from bytehouse_sqlalchemy.orm.query import Query
+from tests.testcase import NativeSessionTestCase
+
+
+class Context(object):
+    statement = 'SELECT 1'
+    root_connection = 'conn'
+
+    def __init__(self, timing):
+        self.timing = timing
+
+
+class QueryTimingTestCase(TestCase):
+    def test_wire(self):
+        timing = QueryTiming(None)
+        rv = timing.timed(time.sleep)(0.05)
+
+        self.assertIsNone(rv)
+        self.assertGreaterEqual(timing.wire, 0.04)
+        self.assertLess(timing.decode, 0.04)
+
+    def test_decode(self):
+        timing = QueryTiming(None)
+
+        def decode():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        timing.timed(decode)()
+        self.assertGreaterEqual(timing.decode, 0.02)
+        self.assertLess(timing.wire, 0.03)
+
+    def test_total(self):
+        timing = QueryTiming(None, compile=1.0)
+        timing.hydrate = 0.5
+
+        self.assertEqual(timing.total, 1.5)
+
+    def test_hydrating_leaves_out_fetch(self):
+        timing = QueryTiming(None)
+
+        with timing.hydrating():
+            # Streamed block fetched while building objects.
+            timing.timed(time.sleep)(0.05)
+
+        self.assertGreaterEqual(timing.wire, 0.04)
+        self.assertLess(timing.hydrate, 0.02)
+
+
+class HydratingResultTestCase(TestCase):
+    def test_fetch_methods(self):
+        listener = mock.Mock()
+        context = Context(QueryTiming(listener))
+        result = mock.Mock()
+        result.first.side_effect = lambda: time.sleep(0.05) or 1
+        result.keys.return_value = ['x']
+
+        rv = HydratingResult(result, context)
+        self.assertEqual(rv.first(), 1)
+        self.assertGreaterEqual(context.timing.hydrate, 0.04)
+        listener.check.assert_called_once_with('conn', context)
+
+        self.assertEqual(rv.keys(), ['x'])
+        listener.check.assert_called_once_with('conn', context)
+
+
+class TimingListenerTestCase(TestCase):
+    def test_slow_query_once(self):
+        reported = []
+        listener = TimingListener(
+            slow_query_threshold=1.0,
+            on_slow_query=lambda *args: reported.append(args)
+        )
+        context = Context(QueryTiming(listener, compile=0.5))
+
+        listener.check('conn', context)
+        self.assertEqual(reported, [])
+
+        context.timing.hydrate = 1.0
+        listener.check('conn', context)
+        listener.check('conn', context)
+        self.assertEqual(reported, [('conn', context, context.timing)])
+
+    def test_no_threshold(self):
+        listener = TimingListener()
+        context = Context(QueryTiming(listener, compile=100.0))
+
+        listener.check('conn', context)
+        self.assertFalse(context.timing.reported)
+
+    def test_execute_start_dropped(self):
+        listener = TimingListener()
+        conn = mock.Mock(info={})
+
+        listener.before_execute(conn)
+        listener.after_execute(conn)
+        self.assertEqual(conn.info, {})
+
+        listener.before_execute(conn)
+        listener.handle_error(mock.Mock(connection=conn))
+        self.assertEqual(conn.info, {})
+        listener.handle_error(mock.Mock(connection=None))
+
+
+class TimingTestCase(NativeSessionTestCase):
+    def setUp(self):
+        super(TimingTestCase, self).setUp()
+        self.reported = []
+        self.listener = enable_timing(
+            self.session.bind, slow_query_threshold=0,
+            on_slow_query=lambda *args: self.reported.append(args)
+        )
+
+    def tearDown(self):
+        self.listener.remove(self.session.bind)
+        super(TimingTestCase, self).tearDown()
+
+    def test_core(self):
+        rv = self.session.execute(
+            'SELECT number FROM system.numbers LIMIT 1000'
+        )
+        timing = rv.context.timing
+
+        self.assertGreater(timing.wire, 0)
+        self.assertGreater(timing.decode, 0)
+        self.assertEqual(len(self.reported), 1)
+
+    def test_orm_hydrate(self):
+        Base = get_declarative_base()
+
+        class Model(Base):
+            __tablename__ = 'numbers'
+            __table_args__ = (
+                engines.CnchMergeTree(order_by=func.tuple()),
+                {'schema': 'system'}
+            )
+            number = Column(types.UInt64, primary_key=True)
+
+        session = Session(bind=self.session.bind, query_cls=Query)
+        rows = session.query(Model).limit(100).all()
+
+        self.assertEqual(len(rows), 100)
+        # Query is reported right after execution, timing object is
+        # updated with hydrate time later.
+        timing = self.reported[-1][2]
+        self.assertGreater(timing.compile, 0)
+        self.assertGreater(timing.hydrate, 0)
+
+        row = session.query(Model).first()
+        self.assertEqual(row.number, 0)
+        self.assertGreater(self.reported[-1][2].hydrate, 0)
@@ -27,11 +27,15 @@ SOFTWARE.
 import unittest
 from unittest import mock
 
-from sqlalchemy import Column, exc, func, literal, select, tuple_
+from sqlalchemy import Column, MetaData, exc, func, literal, select, tuple_
+from sqlalchemy.orm import Session
 
 from bytehouse_sqlalchemy import types, Table, engines
 from bytehouse_sqlalchemy.ext.clauses import Lambda
-from tests.testcase import NativeSessionTestCase, CompilationTestCase
+from bytehouse_sqlalchemy.orm.query import Query
+from tests.testcase import (
+    CompilationTestCase, CompiledCacheTestCase, NativeSessionTestCase
+)
 
 
 class SelectTestCase(CompilationTestCase):
@@ -322,3 +326,81 @@ class JoinTestCase(CompilationTestCase):
             "SELECT t1.x AS t1_x, t2.x AS t2_x FROM t1 "
             "ALL FULL OUTER JOIN t2 USING (x, y)"
         )
+
+
+class QueryCacheKeyTestCase(CompiledCacheTestCase):
+    t1, t2, t3 = [Table(
+        't{}'.format(i), MetaData(),
+        Column('x', types.Int32, primary_key=True),
+        Column('a', types.Array(types.Int32)),
+        engines.CnchMergeTree(order_by='x')
+    ) for i in range(1, 4)]
+
+    def setUp(self):
+        super(QueryCacheKeyTestCase, self).setUp()
+        self.session = Session(query_cls=Query)
+
+    def test_clauses(self):
+        query = self.session.query(self.t1.c.x)
+        hit = self.dialect.CACHE_HIT
+        miss = self.dialect.CACHE_MISS
+
+        self.assertCompiled(query, 'SELECT t1.x AS t1_x FROM t1', {}, miss)
+        self.assertCompiled(
+            query.final(), 'SELECT t1.x AS t1_x FROM t1 FINAL', {}, miss
+        )
+        self.assertCompiled(
+            query.array_join(self.t1.c.a),
+            'SELECT t1.x AS t1_x FROM t1 ARRAY JOIN t1.a', {}, miss
+        )
+        self.assertCompiled(
+            query.group_by(self.t1.c.x).with_totals(),
+            'SELECT t1.x AS t1_x FROM t1 GROUP BY t1.x WITH TOTALS', {}, miss
+        )
+        self.assertCompiled(
+            query.final(), 'SELECT t1.x AS t1_x FROM t1 FINAL', {}, hit
+        )
+
+    def test_parameters(self):
+        query = self.session.query(self.t1.c.x)
+        statement = (
+            'SELECT t1.x AS t1_x FROM t1 SAMPLE %(param_1)s '
+            'LIMIT %(param_2)s BY t1.x'
+        )
+
+        self.assertCompiled(
+            query.sample(0.1).limit_by([self.t1.c.x], 1), statement,
+            {'param_1': 0.1, 'param_2': 1}, self.dialect.CACHE_MISS
+        )
+        self.assertCompiled(
+            query.sample(0.5).limit_by([self.t1.c.x], 2), statement,
+            {'param_1': 0.5, 'param_2': 2}, self.dialect.CACHE_HIT
+        )
+
+    def test_join_flags(self):
+        t1, t2, t3 = self.t1, self.t2, self.t3
+        query = self.session.query(t1.c.x)
+        hit = self.dialect.CACHE_HIT
+        miss = self.dialect.CACHE_MISS
+
+        statement = 'SELECT t1.x AS t1_x FROM t1 {}JOIN t2 ON t1.x = t2.x'
+        self.assertCompiled(
+            query.join(t2, t1.c.x == t2.c.x),
+            statement.format('INNER '), {}, miss
+        )
+        self.assertCompiled(
+            query.join(t2, t1.c.x == t2.c.x, strictness='any'),
+            statement.format('ANY INNER '), {}, miss
+        )
+        self.assertCompiled(
+            query.join(t2, t1.c.x == t2.c.x, strictness='any'),
+            statement.format('ANY INNER '), {}, hit
+        )
+
+        # Flags of previous joins are kept.
+        self.assertCompiled(
+            query.join(t2, t1.c.x == t2.c.x, strictness='any')
+            .join(t3, t1.c.x == t3.c.x, type='left'),
+            statement.format('ANY INNER ') +
+            ' LEFT JOIN t3 ON t1.x = t3.x', {}, miss
+        )
@@ -24,12 +24,12 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from sqlalchemy import Column, and_, func
+from sqlalchemy import Column, MetaData, and_, func
 from sqlalchemy.exc import CompileError
 from sqlalchemy.sql import expression
 
 from bytehouse_sqlalchemy import types, select, Table, engines
-from tests.testcase import BaseTestCase
+from tests.testcase import BaseTestCase, CompiledCacheTestCase
 
 
 class SelectTestCase(BaseTestCase):
@@ -583,3 +583,98 @@ class SelectTestCase(BaseTestCase):
             self.compile(join),
             'table_1 INNER JOIN table_2 ON table_1.x = table_2.x'
         )
+
+
+class CacheKeyTestCase(CompiledCacheTestCase):
+    table = Table(
+        't1', MetaData(),
+        Column('x', types.Int32, primary_key=True),
+        Column('a', types.Array(types.Int32)),
+        engines.CnchMergeTree(order_by='x')
+    )
+    other = Table(
+        't2', MetaData(),
+        Column('x', types.Int32, primary_key=True),
+        engines.CnchMergeTree(order_by='x')
+    )
+
+    def test_clauses(self):
+        t = self.table
+        hit = self.dialect.CACHE_HIT
+        miss = self.dialect.CACHE_MISS
+
+        self.assertCompiled(select(t.c.x), 'SELECT t1.x FROM t1', {}, miss)
+        self.assertCompiled(
+            select(t.c.x).final(), 'SELECT t1.x FROM t1 FINAL', {}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).array_join(t.c.a),
+            'SELECT t1.x FROM t1 ARRAY JOIN t1.a', {}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).left_array_join(t.c.a),
+            'SELECT t1.x FROM t1 LEFT ARRAY JOIN t1.a', {}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).group_by(t.c.x),
+            'SELECT t1.x FROM t1 GROUP BY t1.x', {}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).group_by(t.c.x).with_totals(),
+            'SELECT t1.x FROM t1 GROUP BY t1.x WITH TOTALS', {}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).final(), 'SELECT t1.x FROM t1 FINAL', {}, hit
+        )
+
+    def test_parameters(self):
+        t = self.table
+        hit = self.dialect.CACHE_HIT
+        miss = self.dialect.CACHE_MISS
+
+        self.assertCompiled(
+            select(t.c.x).sample(0.1),
+            'SELECT t1.x FROM t1 SAMPLE %(param_1)s', {'param_1': 0.1}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).sample(0.5),
+            'SELECT t1.x FROM t1 SAMPLE %(param_1)s', {'param_1': 0.5}, hit
+        )
+
+        statement = 'SELECT t1.x FROM t1 LIMIT %(param_1)s, %(param_2)s BY '
+        self.assertCompiled(
+            select(t.c.x).limit_by([t.c.x], 1, offset=2),
+            statement + 't1.x', {'param_1': 2, 'param_2': 1}, miss
+        )
+        self.assertCompiled(
+            select(t.c.x).limit_by([t.c.x], 3, offset=4),
+            statement + 't1.x', {'param_1': 4, 'param_2': 3}, hit
+        )
+        self.assertCompiled(
+            select(t.c.x).limit_by([t.c.a], 3, offset=4),
+            statement + 't1.a', {'param_1': 4, 'param_2': 3}, miss
+        )
+
+    def test_join_flags(self):
+        t, other = self.table, self.other
+        hit = self.dialect.CACHE_HIT
+        miss = self.dialect.CACHE_MISS
+
+        def query(**kwargs):
+            join = t.join(other, t.c.x == other.c.x, **kwargs)
+            return select(t.c.x).select_from(join)
+
+        statement = 'SELECT t1.x FROM t1 {}JOIN t2 ON t1.x = t2.x'
+        self.assertCompiled(
+            query(), statement.format('INNER '), {}, miss
+        )
+        self.assertCompiled(
+            query(strictness='any'), statement.format('ANY INNER '), {}, miss
+        )
+        self.assertCompiled(
+            query(strictness='all', distribution='global'),
+            statement.format('GLOBAL ALL INNER '), {}, miss
+        )
+        self.assertCompiled(
+            query(strictness='any'), statement.format('ANY INNER '), {}, hit
+        )
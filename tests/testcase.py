@@ -31,6 +31,7 @@ from unittest import TestCase
 from sqlalchemy import MetaData
 from sqlalchemy.orm import Query
 
+from bytehouse_sqlalchemy.drivers.native.base import dialect
 from tests.config import database, region, user, password, account
 from tests.session import native_session, system_native_session
 from tests.util import skip_by_server_version
@@ -146,3 +147,29 @@ class CompilationTestCase(BaseTestCase):
         cls.session.connection = cls._session_connection
 
         super(CompilationTestCase, cls).tearDownClass()
+
+
+class CompiledCacheTestCase(TestCase):
+    """ Test Case compiling statements through the compiled cache """
+
+    def setUp(self):
+        super(CompiledCacheTestCase, self).setUp()
+        self.dialect = dialect()
+        self.cache = {}
+
+    def compile(self, statement):
+        # Same as on execution.
+        if isinstance(statement, Query):
+            statement = statement._statement_20()
+        compiled, extracted, cache_hit = statement._compile_w_cache(
+            self.dialect, compiled_cache=self.cache, column_keys=[]
+        )
+        parameters = compiled.construct_params(
+            extracted_parameters=extracted
+        )
+        return str(compiled).replace('\n', ''), parameters, cache_hit
+
+    def assertCompiled(self, statement, text, parameters, cache_hit):
+        self.assertEqual(
+            self.compile(statement), (text, parameters, cache_hit)
+        )
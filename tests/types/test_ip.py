@@ -25,10 +25,18 @@ SOFTWARE.
 """
 
 from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
+from unittest import TestCase
+
+import numpy
 from sqlalchemy import Column, and_, func
 from sqlalchemy.sql.ddl import CreateTable
 
 from bytehouse_sqlalchemy import types, engines, Table
+from bytehouse_sqlalchemy.drivers.native.base import ByteHouseDialect_native
+from bytehouse_sqlalchemy.types.ip import (
+    collapse_ranges, range_networks, ipv4_column, ipv4_to_int, ipv6_column,
+    ipv6_to_bytes
+)
 from tests.testcase import BaseTestCase
 from tests.util import with_native_sessions
 
@@ -64,6 +72,23 @@ class IPv4TestCase(BaseTestCase):
             self.assertEqual(self.session.query(self.table.c.x).scalar(),
                              IPv4Address('10.0.0.1'))
 
+    def test_select_insert_many(self):
+        rows = [
+            {'x': '10.0.0.1'}, {'x': IPv4Address('10.0.0.2')},
+            {'x': int(IPv4Address('10.0.0.3'))}
+        ]
+
+        with self.create_table(self.table):
+            self.session.execute(self.table.insert(), rows)
+            self.table.insert_columns(
+                {'x': ['10.0.0.4', '10.0.0.5']}, bind=self.session
+            )
+            self.assertEqual(
+                self.session.query(self.table.c.x)
+                .order_by(self.table.c.x).all(),
+                [(IPv4Address('10.0.0.%d' % i), ) for i in range(1, 6)]
+            )
+
     def test_select_where_address(self):
         a = IPv4Address('10.0.0.1')
 
@@ -99,6 +124,69 @@ class IPv4TestCase(BaseTestCase):
                              "SELECT test.x AS test_x FROM test "
                              "WHERE test.x = toIPv4('10.0.0.1')")
 
+    def test_compile_in_list_collapsed(self):
+        qs = self.session.query(self.table.c.x).filter(
+            self.table.c.x.in_([
+                '10.0.1.0/24', '10.0.0.0/24', '10.0.0.7', '192.168.0.1'
+            ])
+        )
+        self.assertEqual(
+            self.compile(qs, literal_binds=True),
+            "SELECT test.x AS test_x FROM test "
+            "WHERE test.x IN (toIPv4('192.168.0.1')) OR "
+            "test.x >= toIPv4('10.0.0.0') AND test.x <= toIPv4('10.0.1.255')"
+        )
+
+    def test_compile_in_list_lookup(self):
+        networks = ['10.%d.0.0/16' % i for i in range(0, 40, 2)]
+        qs = self.session.query(self.table.c.x).filter(
+            self.table.c.x.in_(networks + ['192.168.0.1'])
+        )
+        statement = self.compile(qs, literal_binds=True)
+        self.assertTrue(statement.startswith(
+            "SELECT test.x AS test_x FROM test "
+            "WHERE bitAnd(toUInt32(test.x), 4294901760) IN (167772160, "
+        ))
+        self.assertTrue(statement.endswith(
+            "170262528) OR toUInt32(test.x) IN (3232235521)"
+        ))
+
+        qs = self.session.query(self.table.c.x).filter(
+            self.table.c.x.notin_(networks)
+        )
+        self.assertEqual(
+            self.compile(qs),
+            "SELECT test.x AS test_x FROM test WHERE "
+            "(bitAnd(toUInt32(test.x), %(bitAnd_1)s) "
+            "NOT IN (__[POSTCOMPILE_bitAnd_2]))"
+        )
+
+    def test_select_in_list_lookup(self):
+        ips = [
+            IPv4Address('10.0.0.1'),
+            IPv4Address('10.1.0.3'),
+            IPv4Address('10.2.0.3'),
+            IPv4Address('192.168.0.1')
+        ]
+        networks = ['10.%d.0.0/16' % i for i in range(0, 40, 2)]
+
+        with self.create_table(self.table):
+            self.session.execute(self.table.insert(),
+                                 [{'x': ip} for ip in ips])
+
+            self.assertEqual(
+                self.session.query(self.table.c.x).filter(
+                    self.table.c.x.in_(networks)).all(), [
+                    (IPv4Address('10.0.0.1'),),
+                    (IPv4Address('10.2.0.3'),)
+                ])
+            self.assertEqual(
+                self.session.query(self.table.c.x).filter(
+                    self.table.c.x.notin_(networks)).all(), [
+                    (IPv4Address('10.1.0.3'),),
+                    (IPv4Address('192.168.0.1'),)
+                ])
+
     def test_select_in_network(self):
         ips = [
             IPv4Address('10.0.0.1'),
@@ -371,6 +459,133 @@ class IPv4TestCase(BaseTestCase):
                 ])
 
 
+class CollapseRangesTestCase(TestCase):
+    def test_collapse(self):
+        networks = [
+            IPv4Network('10.0.1.0/24'), IPv4Network('10.0.0.0/24'),
+            IPv4Network('10.0.0.128/25'), IPv4Network('10.0.3.0/24'),
+            IPv4Network('10.0.2.5/32')
+        ]
+        self.assertEqual(collapse_ranges(networks), [
+            [int(IPv4Address('10.0.0.0')), int(IPv4Address('10.0.1.255'))],
+            [int(IPv4Address('10.0.2.5'))] * 2,
+            [int(IPv4Address('10.0.3.0')), int(IPv4Address('10.0.3.255'))]
+        ])
+
+    def test_adjacent_addresses(self):
+        networks = [IPv6Network('::1/128'), IPv6Network('::2/128')]
+        self.assertEqual(collapse_ranges(networks), [[1, 2]])
+
+    def test_range_networks(self):
+        first = int(IPv4Address('10.0.0.1'))
+        last = int(IPv4Address('10.0.1.255'))
+        self.assertEqual(
+            [
+                (str(IPv4Address(address)), prefixlen)
+                for address, prefixlen in range_networks(first, last, 32)
+            ],
+            [('10.0.0.1', 32), ('10.0.0.2', 31), ('10.0.0.4', 30),
+             ('10.0.0.8', 29), ('10.0.0.16', 28), ('10.0.0.32', 27),
+             ('10.0.0.64', 26), ('10.0.0.128', 25), ('10.0.1.0', 24)]
+        )
+        self.assertEqual(list(range_networks(0, 2 ** 128 - 1, 128)), [(0, 0)])
+
+
+class IPColumnTestCase(TestCase):
+    def test_ipv4_to_int(self):
+        self.assertEqual(ipv4_to_int('10.0.0.1'), 167772161)
+        self.assertEqual(ipv4_to_int(IPv4Address('10.0.0.1')), 167772161)
+        self.assertEqual(ipv4_to_int(167772161), 167772161)
+        self.assertIsNone(ipv4_to_int(None))
+        with self.assertRaises(ValueError):
+            ipv4_to_int('10.0.0.256')
+
+    def test_ipv6_to_bytes(self):
+        a = IPv6Address('2001:db8::1')
+        self.assertEqual(ipv6_to_bytes('2001:db8::1'), a.packed)
+        self.assertEqual(ipv6_to_bytes(a), a.packed)
+        self.assertEqual(ipv6_to_bytes(a.packed), a.packed)
+        self.assertIsNone(ipv6_to_bytes(None))
+        with self.assertRaises(ValueError):
+            ipv6_to_bytes('2001:db8::g')
+
+    def test_ipv4_column(self):
+        self.assertEqual(
+            ipv4_column(['0.0.0.1', '10.0.0.1', '255.255.255.255']),
+            [1, 167772161, 2 ** 32 - 1]
+        )
+        self.assertEqual(
+            ipv4_column(['10.0.0.1', IPv4Address('10.0.0.2'), 3, None]),
+            [167772161, 167772162, 3, None]
+        )
+        self.assertEqual(ipv4_column([]), [])
+        self.assertEqual(
+            ipv4_column([None, '10.0.0.1', None]), [None, 167772161, None]
+        )
+
+        values = numpy.array([1, 2], dtype=numpy.uint32)
+        self.assertIs(ipv4_column(values), values)
+
+        with self.assertRaises(ValueError):
+            ipv4_column(['10.0.0.1', '10.0.0'])
+
+    def test_ipv6_column(self):
+        a = IPv6Address('2001:db8::1')
+        self.assertEqual(ipv6_column(['2001:db8::1', '::']), [
+            a.packed, bytes(16)
+        ])
+        self.assertEqual(ipv6_column([a, a.packed, None]), [
+            a.packed, a.packed, None
+        ])
+        self.assertEqual(ipv6_column([None, '2001:db8::1']), [
+            None, a.packed
+        ])
+
+    def test_nullable_column_processors(self):
+        table = Table(
+            'test', BaseTestCase.metadata(),
+            Column('x', types.Nullable(types.IPv4)),
+            Column('y', types.Nullable(types.IPv6)),
+            Column('z', types.Nullable(types.String)),
+            engines.CnchMergeTree(order_by=func.tuple())
+        )
+        dialect = ByteHouseDialect_native()
+
+        compiled = table.insert().compile(dialect=dialect)
+        processors = compiled._column_processors
+        self.assertEqual(sorted(processors), ['x', 'y'])
+        self.assertEqual(
+            processors['x'](['10.0.0.1', None]), [167772161, None]
+        )
+        self.assertEqual(
+            processors['y']([None, '::']), [None, bytes(16)]
+        )
+
+    def test_column_processors(self):
+        table = Table(
+            'test', BaseTestCase.metadata(),
+            Column('x', types.IPv4),
+            Column('y', types.IPv6),
+            Column('z', types.String),
+            engines.CnchMergeTree(order_by=func.tuple())
+        )
+        dialect = ByteHouseDialect_native()
+
+        compiled = table.insert().compile(dialect=dialect)
+        self.assertEqual(
+            sorted(compiled._column_processors), ['x', 'y']
+        )
+        self.assertNotIn('x', compiled._bind_processors)
+        self.assertNotIn('y', compiled._bind_processors)
+
+        # Values rendered into the query are converted by the server.
+        compiled = table.insert().values(x='10.0.0.1').compile(
+            dialect=dialect
+        )
+        self.assertEqual(compiled._column_processors, {})
+        self.assertIn('x', compiled._bind_processors)
+
+
 class IPv6TestCase(BaseTestCase):
     table = Table(
         'test', BaseTestCase.metadata(),
@@ -29,7 +29,10 @@ tests_require = [
     'sqlalchemy>=1.4,<1.5',
     'requests',
     'responses',
-    'parameterized'
+    'parameterized',
+    'numpy',
+    'pandas',
+    'pyarrow'
 ]
 
 try: